@@ -206,13 +206,10 @@ class Terrain:
             nearest_door.toggle() # Ouvre/ferme la porte
 
             # --- SYNCHRONISATION RÉSEAU ---
-            if hasattr(self.parent, "send_network"):
-                # Envoie un paquet au serveur pour synchroniser l'état de la porte
-                self.parent.send_network({
-                    "type": "door_toggle",
-                    "door_id": nearest_door.id,
-                    "state": nearest_door.is_open # État final de la porte
-                })
+            network = getattr(self.parent, "network_manager", None)
+            if network:
+                # Envoie l'état final de la porte au serveur par le canal fiable
+                network.send_door_toggle(nearest_door.id, nearest_door.is_open)
         else:
             print("[Terrain] Aucune porte proche à ouvrir.")
 
@@ -382,31 +379,38 @@ class Porte:
             print(f"[PORTE] ⚠️ Sens inconnu '{self.sens_ouverture}', ouverture par défaut droite.")
             return base_hpr + (0, 0, angle)
 
-    def ouvrir(self):
-        """Déclenche l'animation d'ouverture."""
+    def ouvrir(self, elapsed=0.0):
+        """
+        Déclenche l'animation d'ouverture.
+        :param elapsed: secondes déjà écoulées depuis l'ouverture (porte synchronisée par le réseau)
+        """
         if self.locked:
             return
         if not self.is_open:
             self.is_open = True
             # Animation de rotation de 'vitesse' secondes vers l'orientation ouverte
-            self.body_np.hprInterval(self.vitesse, self.open_hpr).start()
+            self.body_np.hprInterval(self.vitesse, self.open_hpr).start(startT=min(elapsed, self.vitesse))
 
 
-    def fermer(self):
-        """Déclenche l'animation de fermeture."""
+    def fermer(self, elapsed=0.0):
+        """
+        Déclenche l'animation de fermeture.
+        :param elapsed: secondes déjà écoulées depuis la fermeture (porte synchronisée par le réseau)
+        """
         if self.is_open:
+            start_t = min(elapsed, self.vitesse)
             # ⚠️ Logique non uniforme pour "spdroite"
             if not self.sens_ouverture.lower() == "spdroite":
                 self.is_open = False
                 # Fermeture normale : revient à l'orientation d'origine
-                self.body_np.hprInterval(self.vitesse, self.closed_hpr).start()
+                self.body_np.hprInterval(self.vitesse, self.closed_hpr).start(startT=start_t)
             else:
                 self.is_open = False
                 # Fermeture spéciale : revient à closed_hpr - 90 degrés (HACK)
                 # NOTE D'OPTIMISATION: Cela devrait être corrigé. La fermeture
                 # devrait toujours revenir à self.closed_hpr. La modélisation
                 # ou le calcul de closed_hpr est probablement erroné ici.
-                self.body_np.hprInterval(self.vitesse, self.closed_hpr - (90, 0, 0)).start()
+                self.body_np.hprInterval(self.vitesse, self.closed_hpr - (90, 0, 0)).start(startT=start_t)
 
 
     def toggle(self):
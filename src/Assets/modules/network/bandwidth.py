@@ -0,0 +1,132 @@
+"""
+Per-client bandwidth budget with a priority accumulator.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+from .protocol import HEADER, SNAPSHOT_HEAD, SERVER_CLOCK, ENTITY_DELTA, ENTITY_ID, DOOR_ENTRY, FIELDS_ALL
+
+DEFAULT_BUDGET = 8000  # octets/s de snapshots par client (~64 kbit/s)
+PRIORITY_FALLOFF = 16.0  # distance (m) à laquelle le poids d'une entité est divisé par 2
+
+_FIXED_COST = HEADER.size + SNAPSHOT_HEAD.size + SERVER_CLOCK.size
+_ENTITY_COST = ENTITY_DELTA[FIELDS_ALL].size  # pire cas d'une entrée d'entité
+
+
+class BandwidthBudget:
+    """
+    Byte budget of one client. Every tick, each entity's priority grows with
+    its staleness weighted by its proximity; entities are then sent by
+    decreasing priority until the budget is spent, and their priority resets.
+    Entities that do not fit keep their previous value and wait for a later tick.
+    """
+
+    def __init__(self, bytes_per_second=DEFAULT_BUDGET, tick_rate=30):
+        """
+        Initialize the budget.
+
+        Args:
+            bytes_per_second: Snapshot bandwidth allowed for the client.
+            tick_rate: Server tick rate in Hz.
+        """
+        self.priorities = {}  # { entity_id: priorité accumulée }
+        self.set_rate(bytes_per_second, tick_rate)
+
+        # Métriques
+        self.used = 0  # octets estimés du dernier snapshot
+        self.deferred = 0  # entités repoussées au dernier tick
+        self.total_used = 0
+        self.total_budget = 0
+
+    def set_rate(self, bytes_per_second, tick_rate):
+        """
+        Change the bandwidth allowed for the client.
+
+        Args:
+            bytes_per_second: Snapshot bandwidth allowed for the client.
+            tick_rate: Server tick rate in Hz.
+        """
+        self.bytes_per_second = bytes_per_second
+        self.bytes_per_tick = max(int(bytes_per_second / tick_rate), _FIXED_COST + _ENTITY_COST)
+
+    def select(self, viewer_id, pos, candidates, positions, previous, base_entities, doors, base_doors):
+        """
+        Choose the entity values sent to the client this tick.
+
+        Args:
+            viewer_id: Entity id of the client (always sent).
+            pos: (x, y, z) world position of the client.
+            candidates: Dict {entity_id: qpos} chosen by the area of interest.
+            positions: Dict {entity_id: ((x, y, z), qpos)} of every entity.
+            previous: Entities of the last snapshot sent to the client.
+            base_entities: Entities of the baseline the delta is encoded against.
+            doors: Current door states.
+            base_doors: Door states of the baseline.
+
+        Returns:
+            dict: {entity_id: qpos} to encode for this client.
+        """
+        priorities = self.priorities
+        budget = self.bytes_per_tick
+        used = _FIXED_COST
+        used += sum(DOOR_ENTRY.size for door_id, state in doors.items() if base_doors.get(door_id) != state)
+        used += sum(ENTITY_ID.size for eid in base_entities if eid not in candidates)
+
+        entities = {}
+        pending = []
+        x, y, z = pos
+        for eid, qpos in candidates.items():
+            base = base_entities.get(eid)
+            if base == qpos:
+                entities[eid] = qpos  # rien à envoyer
+                priorities.pop(eid, None)
+                continue
+            if eid == viewer_id:
+                entities[eid] = qpos
+                used += _ENTITY_COST
+                continue
+            world = positions[eid][0]
+            dx, dy, dz = world[0] - x, world[1] - y, world[2] - z
+            dist = (dx * dx + dy * dy + dz * dz) ** 0.5
+            priority = priorities.get(eid, 0.0) + 1.0 / (1.0 + dist / PRIORITY_FALLOFF)
+            priorities[eid] = priority
+            pending.append((priority, eid, qpos))
+
+        pending.sort(reverse=True)
+        deferred = 0
+        for priority, eid, qpos in pending:
+            if used + _ENTITY_COST <= budget:
+                entities[eid] = qpos
+                used += _ENTITY_COST
+                del priorities[eid]
+                continue
+            # La valeur de la baseline ne coûte rien ; une entité pas encore
+            # acquittée garde la dernière valeur envoyée, une entité jamais
+            # envoyée reste absente jusqu'à ce qu'elle passe.
+            old = base_entities.get(eid)
+            if old is None:
+                old = previous.get(eid)
+                if old is not None:
+                    used += _ENTITY_COST
+            if old is not None:
+                entities[eid] = old
+            deferred += 1
+
+        for eid in [e for e in priorities if e not in candidates]:
+            del priorities[eid]
+
+        self.used = used
+        self.deferred = deferred
+        self.total_used += used
+        self.total_budget += budget
+        return entities
+
+    def usage(self):
+        """
+        Fraction of the budget used since the client joined.
+
+        Returns:
+            float: Used bytes divided by allowed bytes.
+        """
+        return self.total_used / self.total_budget if self.total_budget else 0.0
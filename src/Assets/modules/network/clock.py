@@ -0,0 +1,120 @@
+"""
+Client-side estimate of the server clock, from ping/pong exchanges.
+
+Each pong gives one sample: the round-trip time, and the offset between the
+server clock and the local one assuming the path is symmetric. Queueing only
+ever delays a packet, so the samples with the smallest RTT are the most
+accurate: the offset is taken from the best sample of a sliding window, then
+applied gradually so the estimated server time moves smoothly and never goes
+back.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+from collections import deque
+
+from .metrics import RTT_SMOOTHING
+
+PING_INTERVAL_FAST = 0.1  # secondes entre deux pings tant que la fenêtre n'est pas pleine
+PING_INTERVAL = 1.0
+SAMPLE_WINDOW = 16  # pings gardés pour choisir celui au plus petit RTT
+OFFSET_SLEW = 0.1  # part de l'écart d'offset rattrapée à chaque pong
+OFFSET_SNAP = 0.25  # secondes d'écart au-delà desquelles l'offset est remplacé d'un coup
+
+
+class ClockSync:
+    """
+    Smoothed offset and round-trip time to the server.
+    """
+
+    def __init__(self, window=SAMPLE_WINDOW, slew=OFFSET_SLEW, snap=OFFSET_SNAP):
+        """
+        Initialize the estimator.
+
+        Args:
+            window: Number of recent samples the best one is chosen from.
+            slew: Fraction of the offset error corrected at each pong.
+            snap: Offset error in seconds above which the estimate jumps
+                instead of slewing (first sync, server restart).
+        """
+        self.samples = deque(maxlen=window)  # [(rtt, offset)]
+        self.slew = slew
+        self.snap = snap
+        self.offset = None  # temps serveur - temps local, en secondes
+        self.rtt = 0.0  # RTT lissé
+        self.min_rtt = 0.0  # plus petit RTT de la fenêtre
+        self._last_ping = None
+        self._last_time = None  # dernière estimation rendue, jamais dépassée à rebours
+
+    @property
+    def synced(self):
+        """bool: True once a pong was received."""
+        return self.offset is not None
+
+    def ping_due(self, now):
+        """
+        Tell whether a ping should be sent now, and if so count it as sent.
+
+        Pings are sent quickly until the window is full, then at a slower pace.
+
+        Args:
+            now: Current local time.
+
+        Returns:
+            bool: True if a ping must be sent.
+        """
+        interval = PING_INTERVAL if len(self.samples) == self.samples.maxlen else PING_INTERVAL_FAST
+        if self._last_ping is not None and now - self._last_ping < interval:
+            return False
+        self._last_ping = now
+        return True
+
+    def on_pong(self, sent, server_time, now):
+        """
+        Record the answer to a ping.
+
+        Args:
+            sent: Local time the ping was sent at, echoed by the server.
+            server_time: Server time when it answered.
+            now: Local time of reception.
+        """
+        rtt = now - sent
+        if rtt < 0.0:
+            return  # pong d'une autre horloge locale (client redémarré)
+        self.samples.append((rtt, server_time + rtt / 2.0 - now))
+        self.rtt = rtt if self.rtt == 0.0 else self.rtt + RTT_SMOOTHING * (rtt - self.rtt)
+        self.min_rtt, target = min(self.samples)
+        if self.offset is None or abs(target - self.offset) > self.snap:
+            self.offset = target
+            self._last_time = None
+        else:
+            self.offset += self.slew * (target - self.offset)
+
+    def reset(self):
+        """Forget every sample, e.g. when connecting to another server."""
+        self.samples.clear()
+        self.offset = None
+        self.rtt = 0.0
+        self.min_rtt = 0.0
+        self._last_ping = None
+        self._last_time = None
+
+    def server_time(self, now):
+        """
+        Estimate the current server time.
+
+        Args:
+            now: Current local time.
+
+        Returns:
+            float: The estimated server time in seconds, or None before the
+            first pong.
+        """
+        if self.offset is None:
+            return None
+        estimate = now + self.offset
+        if self._last_time is not None and estimate < self._last_time:
+            estimate = self._last_time
+        self._last_time = estimate
+        return estimate
@@ -0,0 +1,357 @@
+"""
+Multi-process sharded server: a front router maps each room to a worker process.
+
+Every worker runs its own GameServer on a loopback port. The router owns the
+public port; for each client it opens one upstream socket towards the worker
+hosting the client's room, so workers see every client under a distinct
+address and need no change. Rooms are mapped with a stable hash, so all the
+players of a match always end up on the same worker. Only a join or a connect
+opens a session (and its socket): a client must send one before anything else.
+
+Relays are not supported: the router only sees the relay's address, not the
+rooms of the clients it serves, so those rooms would be split between the
+relay's worker and the others. Workers trust no relay and drop relayed
+packets; run relays in front of a single-process server.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import multiprocessing
+import queue
+import time
+import zlib
+
+from . import protocol
+from .server import GameServer
+
+WORKER_HOST = "127.0.0.1"
+REPORT_INTERVAL = 2.0  # secondes entre deux envois de stats par worker
+MAX_SESSIONS = 4096  # une socket par session : à garder sous la limite de descripteurs (ulimit -n)
+MAX_PENDING = 32  # paquets gardés par session pendant l'ouverture de sa socket
+
+
+def worker_for(room, workers):
+    """
+    Pick the worker hosting a room.
+
+    Args:
+        room: The room name.
+        workers: Number of worker processes.
+
+    Returns:
+        int: The worker index.
+    """
+    return zlib.crc32(room.encode("utf-8")) % workers
+
+
+def run_worker(index, port, stats_queue, server_options):
+    """
+    Worker process entry point: run a GameServer and report its stats.
+
+    Args:
+        index: The worker index.
+        port: Loopback port of the worker.
+        stats_queue: multiprocessing.Queue receiving (index, stats dict).
+        server_options: Keyword arguments for GameServer.
+    """
+    server_options = dict(server_options)
+    # Chaque worker a ses propres métriques et son journal : port décalé, fichiers suffixés.
+    if server_options.get("metrics_port") is not None:
+        server_options["metrics_port"] += index
+    for key in ("metrics_file", "record_path"):
+        if server_options.get(key) is not None:
+            server_options[key] = f"{server_options[key]}.{index}"
+    # Un worker est un processus démon, qui ne peut pas lancer de pool : ses
+    # ennemis calculent leurs chemins sur place, les salles étant déjà réparties par cœur.
+    server_options["ai_workers"] = 0
+    server = GameServer(WORKER_HOST, port, stats_interval=0, **server_options)
+
+    async def report():
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            stats_queue.put((index, server.stats_summary()))
+
+    async def main():
+        task = asyncio.create_task(report())
+        try:
+            await server.serve()
+        finally:
+            task.cancel()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+class _Session:
+    """
+    One client seen by the router and its upstream socket to a worker.
+    """
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.upstream = None  # transport vers le worker, None tant qu'il s'ouvre
+        self.pending = []  # paquets reçus pendant l'ouverture
+        self.last_seen = time.monotonic()
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    """
+    Receives a worker's replies for one client and sends them back to it.
+    """
+
+    def __init__(self, router, client_addr):
+        self.router = router
+        self.client_addr = client_addr
+
+    def datagram_received(self, data, addr):
+        self.router.send_to_client(data, self.client_addr)
+
+
+class _FrontProtocol(asyncio.DatagramProtocol):
+    """
+    Public socket of the router.
+    """
+
+    def __init__(self, router):
+        self.router = router
+
+    def connection_made(self, transport):
+        self.router.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.router.handle_datagram(data, addr)
+
+    def error_received(self, exc):
+        pass  # client injoignable : sa session expirera
+
+
+class ShardRouter:
+    """
+    Front router forwarding client datagrams to the worker hosting their room.
+    """
+
+    def __init__(self, host, port, worker_ports, session_timeout=10.0, max_sessions=MAX_SESSIONS):
+        """
+        Initialize the router.
+
+        Args:
+            host: Public address to bind.
+            port: Public UDP port.
+            worker_ports: Loopback port of each worker, by index.
+            session_timeout: Seconds without packets before a session is closed.
+            max_sessions: Sessions open at once; new clients are dropped beyond.
+        """
+        self.host = host
+        self.port = port
+        self.worker_ports = worker_ports
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}  # { client_addr: _Session }
+        self.transport = None
+        self.packets_routed = 0
+
+    def handle_datagram(self, data, addr):
+        """
+        Route one client datagram to its worker, opening the session if needed.
+
+        A session is only opened by a join or a connect, and only while fewer
+        than max_sessions are open; other packets from unknown addresses are
+        dropped.
+
+        Args:
+            data: The raw datagram.
+            addr: The client address.
+        """
+        session = self.sessions.get(addr)
+        room = protocol.peek_room(data)
+        if room is not None:
+            worker = worker_for(room, len(self.worker_ports))
+            if session is None or worker != session.worker:
+                # Nouvelle session, ou changement de salle hébergée ailleurs :
+                # le client est routé vers son nouveau worker, l'ancien le fera expirer.
+                if session is not None:
+                    self._close(addr)
+                elif len(self.sessions) >= self.max_sessions:
+                    return  # routeur plein
+                session = self.sessions[addr] = _Session(worker)
+                asyncio.get_running_loop().create_task(self._open(addr, session))
+        elif session is None:
+            return  # pas de socket ouverte pour une adresse (peut-être usurpée) qui n'a pas rejoint de salle
+
+        session.last_seen = time.monotonic()
+        self.packets_routed += 1
+        if session.upstream is None:
+            if len(session.pending) < MAX_PENDING:
+                session.pending.append(data)
+        else:
+            session.upstream.sendto(data)
+
+    async def _open(self, addr, session):
+        loop = asyncio.get_running_loop()
+        try:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UpstreamProtocol(self, addr),
+                remote_addr=(WORKER_HOST, self.worker_ports[session.worker]),
+            )
+        except OSError as e:
+            # Plus de descripteur libre (EMFILE) par exemple : le client renverra son join
+            if self.sessions.get(addr) is session:
+                del self.sessions[addr]
+            print("Erreur socket routeur:", e)
+            return
+        if self.sessions.get(addr) is not session:
+            transport.close()  # session remplacée pendant l'ouverture
+            return
+        session.upstream = transport
+        for data in session.pending:
+            transport.sendto(data)
+        session.pending = []
+
+    def send_to_client(self, data, addr):
+        """Send a worker reply to a client through the public socket."""
+        if self.transport is not None:
+            self.transport.sendto(data, addr)
+
+    def _close(self, addr):
+        session = self.sessions.pop(addr, None)
+        if session is not None and session.upstream is not None:
+            session.upstream.close()
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for addr in [a for a, s in self.sessions.items() if now - s.last_seen > self.session_timeout]:
+                self._close(addr)
+
+    async def serve(self):
+        """Bind the public socket and route until cancelled."""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _FrontProtocol(self), local_addr=(self.host, self.port)
+        )
+        expire = asyncio.create_task(self._expire_loop())
+        try:
+            await asyncio.Future()
+        finally:
+            expire.cancel()
+            for addr in list(self.sessions):
+                self._close(addr)
+            transport.close()
+
+
+class ClusterStats:
+    """
+    Aggregates the stats reported by every worker.
+    """
+
+    def __init__(self, workers):
+        """
+        Initialize the aggregate.
+
+        Args:
+            workers: Number of worker processes.
+        """
+        self.latest = [None] * workers
+        self._previous_total = None
+        self._previous_time = time.monotonic()
+
+    def update(self, index, stats):
+        """Store the last stats reported by a worker."""
+        self.latest[index] = stats
+
+    def total(self):
+        """
+        Sum the counters of every worker that reported.
+
+        Returns:
+            dict: Summed counters, the worst tick duration and the per-second
+            packet rates since the previous call.
+        """
+        reports = [s for s in self.latest if s is not None]
+        total = {key: sum(r[key] for r in reports)
+                 for key in ("clients", "packets_in", "packets_out", "bytes_in", "bytes_out", "ticks", "overruns", "skipped",
+                             "dropped", "compress_bytes_in", "compress_bytes_out", "compress_packets", "compress_seconds")}
+        total["tick_max"] = max((r["tick_max"] for r in reports), default=0.0)
+        total["workers"] = len(reports)
+
+        now = time.monotonic()
+        elapsed = max(now - self._previous_time, 1e-6)
+        previous = self._previous_total or total
+        total["pps_in"] = (total["packets_in"] - previous["packets_in"]) / elapsed
+        total["pps_out"] = (total["packets_out"] - previous["packets_out"]) / elapsed
+        self._previous_total = total
+        self._previous_time = now
+        return total
+
+
+async def _collect_stats(stats_queue, cluster_stats, interval):
+    elapsed = 0.0
+    while True:
+        await asyncio.sleep(0.25)
+        elapsed += 0.25
+        while True:
+            try:
+                index, stats = stats_queue.get_nowait()
+            except queue.Empty:
+                break
+            cluster_stats.update(index, stats)
+        if interval > 0 and elapsed >= interval:
+            elapsed = 0.0
+            t = cluster_stats.total()
+            print(f"📊 {t['workers']} workers | {t['clients']} clients | {t['pps_in']:.0f} paquets/s reçus"
+                  f" | {t['pps_out']:.0f} paquets/s envoyés | tick max {t['tick_max'] * 1000:.2f} ms"
+                  f" | {t['overruns']} dépassements | {t['dropped']} paquets ignorés")
+            if t["compress_packets"]:
+                print(f"🗜️ compression {t['compress_bytes_out'] / t['compress_bytes_in']:.0%} de la taille"
+                      f" | {t['compress_seconds'] / t['compress_packets'] * 1e6:.0f} µs/datagramme")
+
+
+def run_cluster(host, port, workers, server_options=None, stats_interval=10.0):
+    """
+    Start the worker processes and run the router in the current process.
+
+    Args:
+        host: Public address to bind.
+        port: Public UDP port; workers use the following loopback ports.
+        workers: Number of worker processes (usually the number of cores).
+        server_options: Keyword arguments for each worker's GameServer.
+        stats_interval: Seconds between two aggregated stats reports (0 disables).
+
+    Raises:
+        ValueError: If server_options allows relays (see the module docstring).
+    """
+    server_options = server_options or {}
+    if server_options.get("relays"):
+        raise ValueError("relays need a single-process server: the router cannot route their clients by room")
+    worker_ports = [port + 1 + i for i in range(workers)]
+    stats_queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(i, p, stats_queue, server_options), daemon=True)
+        for i, p in enumerate(worker_ports)
+    ]
+    for process in processes:
+        process.start()
+
+    router = ShardRouter(host, port, worker_ports,
+                         session_timeout=server_options.get("client_timeout", 10.0))
+    cluster_stats = ClusterStats(workers)
+
+    async def main():
+        collector = asyncio.create_task(_collect_stats(stats_queue, cluster_stats, stats_interval))
+        try:
+            await router.serve()
+        finally:
+            collector.cancel()
+
+    try:
+        asyncio.run(main())
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -0,0 +1,199 @@
+"""
+Optional per-datagram compression of the server's packets.
+
+Snapshots repeat the same structure from one packet to the next (headers,
+entity ids, field masks) but a single datagram is too short for deflate to
+find much on its own. Both sides therefore load the same preset dictionary,
+trained on recorded traffic (train_dictionary.py), and each datagram above a
+size threshold is compressed independently against it, so a lost packet never
+prevents decoding the next ones. A datagram that would not shrink is sent as
+is. The dictionary is identified by its CRC-32, exchanged in the connect
+handshake: compression is only used when both sides have the same one.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import os
+import time
+import zlib
+from collections import Counter
+
+from . import protocol
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(__file__), "snapshots.zdict")
+DICTIONARY_SIZE = 4096  # octets ; fenêtre de 8 Kio = dictionnaire + plus gros datagramme
+COMPRESS_THRESHOLD = 128  # octets ; en dessous, l'en-tête deflate mange le gain
+COMPRESS_LEVEL = 6
+WBITS = -13  # deflate brut (sans en-tête zlib), fenêtre de 8 Kio
+MEM_LEVEL = 4  # moins de mémoire à initialiser pour chaque datagramme
+MAX_DECOMPRESSED = 65535  # un datagramme décompressé ne dépasse pas la taille d'un datagramme UDP
+TRAIN_SEGMENT = 4  # octets des motifs comptés pour l'entraînement
+
+
+def dictionary_id(zdict):
+    """
+    Identify a dictionary in the handshake.
+
+    Args:
+        zdict: The dictionary bytes.
+
+    Returns:
+        int: Its non-zero CRC-32 (0 means "no compression" on the wire).
+    """
+    return zlib.crc32(zdict) or 1
+
+
+def load_dictionary(path=DICTIONARY_PATH):
+    """
+    Read a preset dictionary.
+
+    Args:
+        path: The dictionary file.
+
+    Returns:
+        bytes: The dictionary, or None if the file does not exist.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE, segment=TRAIN_SEGMENT):
+    """
+    Build a preset dictionary from sample datagrams.
+
+    Counts in how many samples each segment of a few bytes appears and keeps
+    the most common ones; the most common end up last in the dictionary,
+    where deflate reaches them with the shortest distances.
+
+    Args:
+        samples: Iterable of datagrams (bytes) as they are sent uncompressed.
+        size: Maximum dictionary size in bytes.
+        segment: Length of the counted segments.
+
+    Returns:
+        bytes: The dictionary (empty if there is no usable sample).
+    """
+    counts = Counter()
+    for sample in samples:
+        counts.update({bytes(sample[i:i + segment]) for i in range(len(sample) - segment + 1)})
+    chosen = []
+    total = 0
+    for chunk, seen in counts.most_common():
+        if seen < 2 or total + len(chunk) > size:
+            break
+        chosen.append(chunk)
+        total += len(chunk)
+    return b"".join(reversed(chosen))
+
+
+class CompressionStats:
+    """
+    Gain and CPU cost of the compression, over every datagram it looked at.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.packets = 0  # datagrammes au-dessus du seuil
+        self.compressed = 0  # datagrammes envoyés compressés
+        self.bytes_in = 0  # octets avant compression (datagrammes au-dessus du seuil)
+        self.bytes_out = 0  # octets réellement envoyés pour ces datagrammes
+        self.seconds = 0.0  # temps CPU passé à compresser
+
+    def ratio(self):
+        """float: Sent bytes over original bytes (1.0 without gain)."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    def cost(self):
+        """float: Mean compression time per datagram, in seconds."""
+        return self.seconds / self.packets if self.packets else 0.0
+
+
+class PacketCompressor:
+    """
+    Compresses outgoing datagrams against a preset dictionary.
+    """
+
+    def __init__(self, zdict, threshold=COMPRESS_THRESHOLD, level=COMPRESS_LEVEL, stats=None):
+        """
+        Initialize the compressor.
+
+        Args:
+            zdict: The preset dictionary.
+            threshold: Size in bytes from which a datagram is compressed.
+            level: zlib compression level.
+            stats: CompressionStats to update (a private one if None).
+        """
+        self.zdict = zdict
+        self.dictionary_id = dictionary_id(zdict)
+        self.threshold = threshold
+        self.level = level
+        self.stats = stats or CompressionStats()
+
+    def compress(self, datagram):
+        """
+        Compress one datagram if it is large enough and shrinks.
+
+        Args:
+            datagram: The encoded datagram.
+
+        Returns:
+            bytes: A MSG_COMPRESSED packet, or the datagram unchanged.
+        """
+        if len(datagram) < self.threshold:
+            return datagram
+        stats = self.stats
+        start = time.perf_counter()
+        # Un contexte par datagramme : chacun se décompresse seul, même si les précédents sont perdus
+        deflate = zlib.compressobj(self.level, zlib.DEFLATED, WBITS, MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, self.zdict)
+        packet = protocol.encode_compressed(deflate.compress(datagram) + deflate.flush())
+        stats.seconds += time.perf_counter() - start
+        stats.packets += 1
+        stats.bytes_in += len(datagram)
+        if len(packet) >= len(datagram):
+            stats.bytes_out += len(datagram)
+            return datagram
+        stats.compressed += 1
+        stats.bytes_out += len(packet)
+        return packet
+
+
+class PacketDecompressor:
+    """
+    Restores the datagrams compressed by a PacketCompressor.
+    """
+
+    def __init__(self, zdict):
+        """
+        Initialize the decompressor.
+
+        Args:
+            zdict: The preset dictionary, the same as the sender's.
+        """
+        self.zdict = zdict
+        self.dictionary_id = dictionary_id(zdict)
+
+    def decompress(self, packet):
+        """
+        Decompress a MSG_COMPRESSED packet.
+
+        Args:
+            packet: The received packet (bytes or memoryview).
+
+        Returns:
+            bytes: The original datagram.
+
+        Raises:
+            ProtocolError: If the payload is not valid deflate data or is too large.
+        """
+        inflate = zlib.decompressobj(WBITS, self.zdict)
+        try:
+            datagram = inflate.decompress(packet[protocol.HEADER.size:], MAX_DECOMPRESSED)
+        except zlib.error as e:
+            raise protocol.ProtocolError(f"invalid compressed packet: {e}") from e
+        if inflate.unconsumed_tail or not inflate.eof:
+            raise protocol.ProtocolError("truncated or oversized compressed packet")
+        return datagram
@@ -0,0 +1,127 @@
+"""
+Position history of the entities of a room, for lag compensation.
+
+Every tick copies the current position table into one slot of a ring of
+preallocated NumPy arrays, so rewinding to any recent tick is a slot lookup
+and recording a tick allocates nothing.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import numpy as np
+
+HISTORY_TICKS = 64  # ~1 s à 60 Hz, ~2 s à 30 Hz
+INITIAL_CAPACITY = 64  # entités ; doublée quand un id la dépasse
+
+
+class PositionHistory:
+    """
+    Ring buffer of the positions of every entity, indexed by tick number.
+    """
+
+    def __init__(self, ticks=HISTORY_TICKS, capacity=INITIAL_CAPACITY):
+        """
+        Preallocate the history.
+
+        Args:
+            ticks: Number of ticks kept.
+            capacity: Initial number of entity ids (grown when exceeded).
+        """
+        self.ticks = ticks
+        self.current = np.zeros((capacity, 3), dtype=np.float32)  # positions reçues depuis la dernière tick
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.positions = np.zeros((ticks, capacity, 3), dtype=np.float32)
+        self.present = np.zeros((ticks, capacity), dtype=bool)
+        self.tick_of_slot = np.full(ticks, -1, dtype=np.int64)
+        self.latest = -1
+
+    @property
+    def capacity(self):
+        """int: Number of entity ids the arrays can hold."""
+        return self.alive.shape[0]
+
+    def _grow(self, entity_id):
+        capacity = self.capacity
+        while capacity <= entity_id:
+            capacity *= 2
+        extra = capacity - self.capacity
+        self.current = np.concatenate((self.current, np.zeros((extra, 3), dtype=np.float32)))
+        self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+        self.positions = np.concatenate((self.positions, np.zeros((self.ticks, extra, 3), dtype=np.float32)), axis=1)
+        self.present = np.concatenate((self.present, np.zeros((self.ticks, extra), dtype=bool)), axis=1)
+
+    def update(self, entity_id, x, y, z):
+        """
+        Set the current position of an entity.
+
+        Args:
+            entity_id: The entity id.
+            x, y, z: Its world position.
+        """
+        if entity_id >= self.capacity:
+            self._grow(entity_id)
+        row = self.current[entity_id]
+        row[0] = x
+        row[1] = y
+        row[2] = z
+        self.alive[entity_id] = True
+
+    def remove(self, entity_id):
+        """
+        Forget an entity from the next tick on.
+
+        Args:
+            entity_id: The entity id.
+        """
+        if entity_id < self.capacity:
+            self.alive[entity_id] = False
+
+    def record(self, tick):
+        """
+        Store the current positions as the state of a tick.
+
+        Args:
+            tick: The tick number, increasing by one per tick.
+        """
+        slot = tick % self.ticks
+        np.copyto(self.positions[slot], self.current)
+        np.copyto(self.present[slot], self.alive)
+        self.tick_of_slot[slot] = tick
+        self.latest = tick
+
+    def rewind(self, tick):
+        """
+        Get the positions of every entity at a recorded tick.
+
+        Args:
+            tick: The tick number.
+
+        Returns:
+            tuple: (positions, present) views of shape (capacity, 3) and
+            (capacity,), or None if the tick is not in the history.
+        """
+        slot = tick % self.ticks
+        if tick < 0 or self.tick_of_slot[slot] != tick:
+            return None
+        return self.positions[slot], self.present[slot]
+
+    def at(self, tick, entity_id):
+        """
+        Get the position of one entity at a recorded tick.
+
+        Args:
+            tick: The tick number; clamped to the oldest tick still kept.
+            entity_id: The entity id.
+
+        Returns:
+            tuple: (x, y, z), or None if the entity did not exist then.
+        """
+        if self.latest < 0 or entity_id >= self.capacity:
+            return None
+        tick = min(max(tick, self.latest - self.ticks + 1, 0), self.latest)
+        slot = tick % self.ticks
+        if not self.present[slot, entity_id]:
+            return None
+        x, y, z = self.positions[slot, entity_id]
+        return float(x), float(y), float(z)
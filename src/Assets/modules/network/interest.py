@@ -0,0 +1,144 @@
+"""
+Area of interest: uniform spatial grid used to pick the entities each client receives.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import math
+
+
+class SpatialGrid:
+    """
+    Uniform 2D grid (x, y) indexing entities by cell.
+    """
+
+    def __init__(self, cell_size=8.0):
+        """
+        Initialize the grid.
+
+        Args:
+            cell_size: Side of a cell in world units.
+        """
+        self.cell_size = float(cell_size)
+        self.cells = {}  # { (cx, cy): set(entity_id) }
+        self.entity_cells = {}  # { entity_id: (cx, cy) }
+
+    def cell_of(self, x, y):
+        """Return the (cx, cy) cell containing a world position."""
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def update(self, entity_id, x, y):
+        """
+        Insert an entity or move it to the cell of its new position.
+
+        Args:
+            entity_id: The entity id.
+            x, y: The world position.
+        """
+        cell = self.cell_of(x, y)
+        old = self.entity_cells.get(entity_id)
+        if old == cell:
+            return
+        if old is not None:
+            self._discard(entity_id, old)
+        self.entity_cells[entity_id] = cell
+        self.cells.setdefault(cell, set()).add(entity_id)
+
+    def remove(self, entity_id):
+        """
+        Remove an entity from the grid.
+
+        Args:
+            entity_id: The entity id.
+        """
+        cell = self.entity_cells.pop(entity_id, None)
+        if cell is not None:
+            self._discard(entity_id, cell)
+
+    def _discard(self, entity_id, cell):
+        members = self.cells[cell]
+        members.discard(entity_id)
+        if not members:
+            del self.cells[cell]
+
+    def query(self, x, y, radius):
+        """
+        Yield the entities in the cells overlapping a square around a position.
+
+        Args:
+            x, y: The center of the query.
+            radius: Half side of the square, in world units.
+
+        Yields:
+            int: Entity ids (cell granularity, no exact distance test).
+        """
+        cx0, cy0 = self.cell_of(x - radius, y - radius)
+        cx1, cy1 = self.cell_of(x + radius, y + radius)
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                members = cells.get((cx, cy))
+                if members:
+                    yield from members
+
+
+class InterestManager:
+    """
+    Chooses, for each client, which entities go in its snapshot this tick.
+
+    Entities within near_radius are sent every tick, entities up to far_radius
+    every far_interval ticks, and the rest are not sent at all.
+    """
+
+    def __init__(self, near_radius=24.0, far_radius=64.0, far_interval=4, cell_size=8.0):
+        """
+        Initialize the manager.
+
+        Args:
+            near_radius: Distance under which entities are updated every tick.
+            far_radius: Distance beyond which entities are not sent.
+            far_interval: Update period, in ticks, of the entities between both radii.
+            cell_size: Side of a grid cell in world units.
+        """
+        self.near_radius = near_radius
+        self.far_radius = far_radius
+        self.far_interval = max(1, int(far_interval))
+        self.grid = SpatialGrid(cell_size)
+        self._near_sq = near_radius * near_radius
+        self._far_sq = far_radius * far_radius
+
+    def visible(self, viewer_id, pos, positions, previous_entities, tick):
+        """
+        Build the entity state seen by one client.
+
+        Args:
+            viewer_id: Entity id of the client (always included).
+            pos: (x, y, z) world position of the client.
+            positions: Dict {entity_id: ((x, y, z), qpos)} of every entity.
+            previous_entities: Entities of the last snapshot sent to the client,
+                used to repeat the value of far entities on the ticks they are skipped.
+            tick: The current tick number.
+
+        Returns:
+            dict: {entity_id: qpos} to encode for this client.
+        """
+        x, y = pos[0], pos[1]
+        far_tick = (tick + viewer_id) % self.far_interval == 0  # étale la charge entre clients
+        entities = {}
+        for eid in self.grid.query(x, y, self.far_radius):
+            world, qpos = positions[eid]
+            dx = world[0] - x
+            dy = world[1] - y
+            dist_sq = dx * dx + dy * dy
+            if dist_sq <= self._near_sq or eid == viewer_id:
+                entities[eid] = qpos
+            elif dist_sq <= self._far_sq:
+                if far_tick:
+                    entities[eid] = qpos
+                else:
+                    old = previous_entities.get(eid)
+                    entities[eid] = qpos if old is None else old
+        if viewer_id not in entities and viewer_id in positions:
+            entities[viewer_id] = positions[viewer_id][1]
+        return entities
@@ -0,0 +1,139 @@
+"""
+Client-side jitter buffer of the remote entities' positions.
+
+Snapshots arrive at the server tick rate, with jitter and sometimes not at
+all. Each entity keeps its last few positions with the server time they were
+sent at, and the client renders every entity a little in the past, at a time
+two snapshots usually bracket: the position is then interpolated between
+them, whatever the frame rate. When the newest snapshot is late or lost, the
+last movement is extrapolated for a short while, then the entity holds still.
+Distant entities are only updated every few ticks and repeat their previous
+value in between: an unchanged position is therefore only recorded once it
+has not moved for a while, so it does not turn the motion into steps.
+
+Every sample and every query covers all the entities in one NumPy pass.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import numpy as np
+
+INTERPOLATION_DELAY = 0.1  # secondes de retard de l'affichage : 3 snapshots à 30 Hz, un perdu reste couvert
+MAX_EXTRAPOLATION = 0.25  # secondes de mouvement prolongé au-delà du dernier snapshot
+REPEAT_INTERVAL = 0.2  # secondes avant d'enregistrer une position inchangée (entités lointaines : une tick sur 4)
+BUFFER_SAMPLES = 8  # positions gardées par entité
+INITIAL_CAPACITY = 64  # entités ; doublée quand un id la dépasse
+
+
+class JitterBuffer:
+    """
+    Last timestamped positions of every remote entity, indexed by entity id.
+    """
+
+    def __init__(self, samples=BUFFER_SAMPLES, capacity=INITIAL_CAPACITY, max_extrapolation=MAX_EXTRAPOLATION,
+                 repeat_interval=REPEAT_INTERVAL):
+        """
+        Preallocate the buffer.
+
+        Args:
+            samples: Number of positions kept per entity.
+            capacity: Initial number of entity ids (grown when exceeded).
+            max_extrapolation: Seconds an entity keeps moving past its newest
+                position.
+            repeat_interval: Seconds after which an unchanged position is
+                recorded again, so a stopped entity stops being extrapolated.
+        """
+        self.samples = samples
+        self.max_extrapolation = max_extrapolation
+        self.repeat_interval = repeat_interval
+        # Échantillons du plus ancien au plus récent ; -inf marque une case vide
+        self.times = np.full((capacity, samples), -np.inf)
+        self.positions = np.zeros((capacity, samples, 3), dtype=np.float32)
+
+    @property
+    def capacity(self):
+        """int: Number of entity ids the arrays can hold."""
+        return self.times.shape[0]
+
+    def _grow(self, entity_id):
+        capacity = self.capacity
+        while capacity <= entity_id:
+            capacity *= 2
+        extra = capacity - self.capacity
+        self.times = np.concatenate((self.times, np.full((extra, self.samples), -np.inf)))
+        self.positions = np.concatenate((self.positions, np.zeros((extra, self.samples, 3), dtype=np.float32)))
+
+    def push(self, time, ids, positions):
+        """
+        Record the positions of several entities at one server time.
+
+        Entities whose newest sample is not older than time (snapshot
+        received out of order), or that did not move since a recent sample,
+        are left unchanged.
+
+        Args:
+            time: Server time of the snapshot, in seconds.
+            ids: Array of entity ids.
+            positions: Array of shape (len(ids), 3).
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        if ids.size == 0:
+            return
+        top = int(ids.max())
+        if top >= self.capacity:
+            self._grow(top)
+        positions = np.asarray(positions, dtype=np.float32)
+        newest = self.times[ids, -1]
+        moved = (positions != self.positions[ids, -1]).any(axis=1)
+        keep = (newest < time) & (moved | (time - newest >= self.repeat_interval))
+        ids = ids[keep]
+        # Décalage d'une case vers le passé, pour toutes les entités du snapshot à la fois
+        self.times[ids, :-1] = self.times[ids, 1:]
+        self.times[ids, -1] = time
+        self.positions[ids, :-1] = self.positions[ids, 1:]
+        self.positions[ids, -1] = positions[keep]
+
+    def remove(self, entity_id):
+        """
+        Forget the samples of an entity.
+
+        Args:
+            entity_id: The entity id.
+        """
+        if entity_id < self.capacity:
+            self.times[entity_id] = -np.inf
+
+    def clear(self):
+        """Forget every sample, e.g. when the server clock restarts."""
+        self.times.fill(-np.inf)
+
+    def sample(self, time, ids):
+        """
+        Compute the positions of several entities at a server time.
+
+        Between two samples the position is interpolated; before the oldest
+        one it is the oldest; after the newest it follows the last movement
+        for at most max_extrapolation seconds.
+
+        Args:
+            time: Server time to render, in seconds.
+            ids: Array of entity ids, each with at least one sample.
+
+        Returns:
+            numpy.ndarray: Positions of shape (len(ids), 3).
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        times = self.times[ids]
+        # Paire d'échantillons qui encadre time (ou les deux plus récents pour extrapoler)
+        first = np.clip((times <= time).sum(axis=1) - 1, 0, self.samples - 2)
+        rows = np.arange(ids.size)
+        t0 = times[rows, first]
+        t1 = times[rows, first + 1]
+        p0 = self.positions[ids, first]
+        p1 = self.positions[ids, first + 1]
+        known = np.isfinite(t0)
+        span = np.where(known, t1 - t0, 1.0)
+        alpha = np.where(known, (time - np.where(known, t0, 0.0)) / span, 1.0)
+        alpha = np.clip(alpha, 0.0, 1.0 + self.max_extrapolation / span)
+        return p0 + (p1 - p0) * alpha[:, None].astype(np.float32)
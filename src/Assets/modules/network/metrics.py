@@ -0,0 +1,300 @@
+"""
+Server metrics: per-type packet counters, byte rates, link quality of every
+client and tick duration histograms.
+
+Metrics are rendered in the plain-text exposition format read by Prometheus
+and most scrapers, served on a local HTTP port and/or dumped to a file.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import bisect
+import os
+import time
+
+from . import protocol
+
+TICK_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.010, 0.0167, 0.0333, 0.050, 0.100)  # secondes
+RTT_SMOOTHING = 0.125  # poids d'un nouvel échantillon dans le RTT lissé (comme TCP)
+RATE_SMOOTHING = 0.5  # poids d'une nouvelle mesure dans les débits lissés
+METRICS_DUMP_INTERVAL = 10.0  # secondes entre deux écritures du fichier de métriques
+HTTP_TIMEOUT = 2.0  # secondes pour lire la requête d'un client HTTP
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds.
+    """
+
+    def __init__(self, bounds):
+        """
+        Initialize the histogram.
+
+        Args:
+            bounds: Sorted upper bounds of the buckets; larger values go to +Inf.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        """
+        Record one value.
+
+        Args:
+            value: The observed value.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def lines(self, name):
+        """
+        Render the histogram.
+
+        Args:
+            name: The metric name.
+
+        Returns:
+            list: The exposition lines.
+        """
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.total:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class LinkStats:
+    """
+    Round-trip time and snapshot loss of one client, measured from its acks.
+    """
+
+    __slots__ = ("rtt", "rtt_samples", "acked", "missed")
+
+    def __init__(self):
+        """Initialize the link statistics."""
+        self.rtt = 0.0  # RTT lissé en secondes
+        self.rtt_samples = 0
+        self.acked = 0  # snapshots acquittés
+        self.missed = 0  # snapshots sautés entre deux acquittements
+
+    def on_ack(self, rtt, gap):
+        """
+        Record a new acknowledgement.
+
+        Args:
+            rtt: Seconds between the snapshot send and its ack.
+            gap: Snapshots sent between the previous acked one and this one,
+                which the client never acknowledged.
+        """
+        if self.rtt_samples == 0:
+            self.rtt = rtt
+        else:
+            self.rtt += RTT_SMOOTHING * (rtt - self.rtt)
+        self.rtt_samples += 1
+        self.acked += 1
+        self.missed += gap
+
+    def loss(self):
+        """float: Fraction of the snapshots that were never acknowledged."""
+        total = self.acked + self.missed
+        return self.missed / total if total else 0.0
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class ServerMetrics:
+    """
+    Counters fed by a GameServer, and their text rendering.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.packets_in = {}  # { type de message: paquets reçus }
+        self.bytes_in = {}
+        self.packets_out = {}  # { type de datagramme: paquets envoyés }
+        self.bytes_out = {}
+        self.tick_duration = Histogram(TICK_BUCKETS)
+        self.started = time.monotonic()
+        self.bytes_in_rate = 0.0
+        self.bytes_out_rate = 0.0
+        self._sample_time = self.started
+        self._sample_in = 0
+        self._sample_out = 0
+
+    def count_in(self, msg_type, size):
+        """
+        Count one received message.
+
+        Args:
+            msg_type: The decoded message type.
+            size: Its size in bytes.
+        """
+        self.packets_in[msg_type] = self.packets_in.get(msg_type, 0) + 1
+        self.bytes_in[msg_type] = self.bytes_in.get(msg_type, 0) + size
+
+    def count_out(self, packet):
+        """
+        Count one sent datagram under the type of its first message.
+
+        Args:
+            packet: The sent bytes.
+        """
+        if protocol.is_binary(packet):
+            msg_type = protocol.MSG_NAMES.get(packet[2], "unknown")
+        else:
+            msg_type = "json"
+        self.packets_out[msg_type] = self.packets_out.get(msg_type, 0) + 1
+        self.bytes_out[msg_type] = self.bytes_out.get(msg_type, 0) + len(packet)
+
+    def sample(self, stats, now=None):
+        """
+        Update the smoothed byte rates from the server counters.
+
+        Args:
+            stats: The ServerStats of the server.
+            now: Current time.monotonic(), looked up if None.
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._sample_time
+        if elapsed <= 0:
+            return
+        rate_in = (stats.bytes_in - self._sample_in) / elapsed
+        rate_out = (stats.bytes_out - self._sample_out) / elapsed
+        self.bytes_in_rate += RATE_SMOOTHING * (rate_in - self.bytes_in_rate)
+        self.bytes_out_rate += RATE_SMOOTHING * (rate_out - self.bytes_out_rate)
+        self._sample_time = now
+        self._sample_in = stats.bytes_in
+        self._sample_out = stats.bytes_out
+
+    def render(self, server):
+        """
+        Render every metric of a server.
+
+        Args:
+            server: The GameServer to describe.
+
+        Returns:
+            str: The metrics in the plain-text exposition format.
+        """
+        lines = [f"server_uptime_seconds {time.monotonic() - self.started:.1f}"]
+
+        lines.append("# TYPE server_packets_in_total counter")
+        lines += [f'server_packets_in_total{{type="{_label(t)}"}} {n}' for t, n in sorted(self.packets_in.items())]
+        lines.append("# TYPE server_bytes_in_total counter")
+        lines += [f'server_bytes_in_total{{type="{_label(t)}"}} {n}' for t, n in sorted(self.bytes_in.items())]
+        lines.append("# TYPE server_packets_out_total counter")
+        lines += [f'server_packets_out_total{{type="{t}"}} {n}' for t, n in sorted(self.packets_out.items())]
+        lines.append("# TYPE server_bytes_out_total counter")
+        lines += [f'server_bytes_out_total{{type="{t}"}} {n}' for t, n in sorted(self.bytes_out.items())]
+        limiter = server.limiter
+        if limiter is not None:
+            lines.append("# TYPE server_rate_limited_packets_total counter")
+            lines.append(f"server_rate_limited_packets_total {limiter.dropped}")
+            lines.append(f"server_rate_limited_bytes_total {limiter.dropped_bytes}")
+            lines.append(f"server_rate_limit_buckets {len(limiter.buckets)}")
+        lines.append(f"server_bytes_in_per_second {self.bytes_in_rate:.1f}")
+        lines.append(f"server_bytes_out_per_second {self.bytes_out_rate:.1f}")
+
+        lines.append("# TYPE server_tick_duration_seconds histogram")
+        lines += self.tick_duration.lines("server_tick_duration_seconds")
+        summary = server.stats_summary()
+        lines.append(f"server_tick_overruns_total {summary['overruns']}")
+        lines.append(f"server_tick_skipped_total {summary['skipped']}")
+
+        lines.append(f"server_clients {len(server.clients)}")
+        lines.append(f"server_rooms {len(server.rooms)}")
+        lines.append(f"server_relays {len(server.relays)}")
+        lines.append(f"server_relayed_clients {sum(len(link.clients) for link in server.relays.values())}")
+        for room in server.rooms.values():
+            lines.append(f'server_room_members{{room="{_label(room.name)}"}} {len(room.members)}')
+
+        framing = server.framing_stats
+        lines.append(f"server_messages_fragmented_total {framing.fragmented}")
+        lines.append(f"server_messages_bundled_total {framing.bundled}")
+        lines.append(f"server_messages_incomplete_total {framing.incomplete}")
+        lines.append(f"server_moves_clamped_total {server.moves_clamped}")
+        lines.append(f"server_move_corrections_total {server.corrections_sent}")
+        compression = server.compression_stats
+        lines.append(f"server_compress_datagrams_total {compression.packets}")
+        lines.append(f"server_compress_reduced_total {compression.compressed}")
+        lines.append(f"server_compress_bytes_in_total {compression.bytes_in}")
+        lines.append(f"server_compress_bytes_out_total {compression.bytes_out}")
+        lines.append(f"server_compress_seconds_total {compression.seconds:.6f}")
+
+        # Files d'attente : messages en attente d'envoi, réassemblages en cours,
+        # datagrammes abandonnés quand le tampon d'émission du noyau est plein.
+        pending = [len(client.writer.pending) for client in server.clients.values()]
+        lines.append(f"server_writer_queue_messages {sum(pending)}")
+        lines.append(f"server_writer_queue_max {max(pending, default=0)}")
+        lines.append(f"server_reassembly_pending {len(server.reassembler.partials)}")
+        channels = [client.reliable for client in server.clients.values() if client.binary]
+        lines.append(f"server_reliable_in_flight {sum(c.in_flight for c in channels)}")
+        lines.append(f"server_reliable_sent_total {sum(c.sent for c in channels)}")
+        lines.append(f"server_reliable_resends_total {sum(c.resends for c in channels)}")
+        if server.transport is not None:
+            lines.append(f"server_socket_send_dropped_total {server.transport.dropped}")
+
+        lines.append("# TYPE server_client_rtt_seconds gauge")
+        for client in server.clients.values():
+            if not client.binary:
+                continue
+            labels = f'player="{_label(client.player)}",id="{client.entity_id}",room="{_label(client.room.name)}"'
+            link = client.link
+            lines.append(f"server_client_rtt_seconds{{{labels}}} {link.rtt:.4f}")
+            lines.append(f"server_client_loss_ratio{{{labels}}} {link.loss():.4f}")
+            lines.append(f"server_client_budget_usage_ratio{{{labels}}} {client.budget.usage():.4f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, server, path):
+        """
+        Write the metrics of a server to a file, replaced atomically.
+
+        Args:
+            server: The GameServer to describe.
+            path: The destination file.
+        """
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(self.render(server))
+        os.replace(temp, path)
+
+
+async def start_http(render, host, port):
+    """
+    Serve metrics over HTTP: every request gets the current rendering.
+
+    Args:
+        render: Callable returning the metrics text.
+        host: Address to bind (keep it local, the endpoint has no auth).
+        port: TCP port to bind.
+
+    Returns:
+        asyncio.Server: The running server, to close on shutdown.
+    """
+    async def handle(reader, writer):
+        try:
+            # Une seule page : la requête est lue puis ignorée.
+            while (await asyncio.wait_for(reader.readline(), HTTP_TIMEOUT)).strip():
+                pass
+            body = render().encode("utf-8")
+            writer.write(b"HTTP/1.0 200 OK\r\n"
+                         b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,196 @@
+"""
+Server-authoritative movement of the players, with client-side prediction.
+
+The client moves its player at once with its own physics and sends every
+frame as a numbered input command: how long the frame lasted and where the
+player ended up. The server has no collision world, so it cannot replay the
+physics; it checks the move instead. A command is only given as much time as
+really went by since the previous ones, and the move on the ground plane
+cannot exceed the maximum speed over that time. A move that does not fit is
+clamped, and the position the server kept is sent back with the number of
+the last command applied: the client restarts from there and replays the
+moves of the commands the server has not seen yet. The height still comes
+from the client, whose physics alone knows the ground, but it cannot rise
+faster than a jump (plus one step) nor fall faster than the physics allows.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import math
+from collections import deque
+
+from . import protocol
+
+MAX_SPEED = 3.0  # m/s, course debout (Player.DEFAULT_RUN_SPEED)
+SPEED_TOLERANCE = 1.25  # marge pour les poussées de la physique et les arrondis
+MAX_RISE_SPEED = 4.0  # m/s, vitesse de saut (Player.JUMP_SPEED)
+STEP_HEIGHT = 0.4  # m, marche franchie d'un coup par le contrôleur du joueur
+MAX_FALL_SPEED = 55.0  # m/s, vitesse de chute maximale du contrôleur de personnage de Bullet
+MAX_MOVE_CREDIT = 0.5  # secondes de déplacement que des commandes retardées peuvent rattraper
+CORRECTION_INTERVAL = 0.1  # secondes minimum entre deux corrections envoyées à un client
+INPUT_HISTORY = 128  # commandes gardées par le client pour le rejeu (~1,3 s à 100 Hz)
+
+
+class MoveCheck:
+    """
+    Server side: last command applied and time credit of one player.
+    """
+
+    __slots__ = ("max_speed", "credit", "rise", "updated", "placed", "seq", "last_correction")
+
+    def __init__(self, max_speed=MAX_SPEED):
+        """
+        Initialize the check.
+
+        Args:
+            max_speed: Ground speed allowed, in m/s.
+        """
+        self.max_speed = max_speed
+        self.credit = 0.0  # secondes de déplacement encore dues au joueur
+        self.rise = STEP_HEIGHT  # mètres de montée disponibles tout de suite (une marche)
+        self.updated = None
+        self.placed = False  # première position (apparition) acceptée telle quelle
+        self.seq = protocol.NO_SEQ  # dernière commande appliquée
+        self.last_correction = None
+
+    def reset(self):
+        """Accept the next position as is, e.g. after spawning in another room."""
+        self.placed = False
+        self.seq = protocol.NO_SEQ
+        self.rise = STEP_HEIGHT
+
+    def apply(self, position, target, now, dt=None, seq=protocol.NO_SEQ):
+        """
+        Check the move of one command.
+
+        Args:
+            position: The (x, y, z) position kept by the server.
+            target: The (x, y, z) position the client predicted.
+            now: Current server time.
+            dt: Seconds the command covers, or None for all the time elapsed
+                since the previous one (position without a command number).
+            seq: Number of the command, or NO_SEQ.
+
+        Returns:
+            tuple: The (x, y, z) position to keep and True if the move was
+            clamped, or None if the command is older than one already applied.
+        """
+        if seq != protocol.NO_SEQ:
+            if self.seq != protocol.NO_SEQ and not protocol.seq_newer(seq, self.seq):
+                return None  # arrivée dans le désordre : le déplacement est déjà compté
+            self.seq = seq  # gardé à travers les positions sans numéro
+        if self.updated is not None:
+            self.credit = min(self.credit + now - self.updated, MAX_MOVE_CREDIT)
+        self.updated = now
+        if not self.placed:
+            self.placed = True
+            return target, False
+
+        # Pas plus de temps de jeu que de temps réel : pas d'accélération par des dt gonflés
+        dt = self.credit if dt is None else min(dt, self.credit)
+        self.credit -= dt
+        x, y, z = position
+        tx, ty, tz = target
+        clamped = False
+        dx = tx - x
+        dy = ty - y
+        distance = math.hypot(dx, dy)
+        allowed = self.max_speed * SPEED_TOLERANCE * dt
+        if distance > allowed:
+            scale = allowed / distance
+            tx = x + dx * scale
+            ty = y + dy * scale
+            clamped = True
+
+        # Montée : vitesse de saut, avec une marche d'avance ; chute : celle de la physique
+        self.rise = min(self.rise + MAX_RISE_SPEED * SPEED_TOLERANCE * dt, STEP_HEIGHT)
+        dz = tz - z
+        if dz > self.rise:
+            tz = z + self.rise
+            clamped = True
+        elif dz < -MAX_FALL_SPEED * SPEED_TOLERANCE * dt:
+            tz = z - MAX_FALL_SPEED * SPEED_TOLERANCE * dt
+            clamped = True
+        self.rise -= max(tz - z, 0.0)
+        return (tx, ty, tz), clamped
+
+    def correction_due(self, now):
+        """
+        Tell whether a correction may be sent now, and if so count it as sent.
+
+        Args:
+            now: Current server time.
+
+        Returns:
+            bool: True if the client must be corrected.
+        """
+        if self.last_correction is not None and now - self.last_correction < CORRECTION_INTERVAL:
+            return False
+        self.last_correction = now
+        return True
+
+
+class InputHistory:
+    """
+    Client side: numbers the input commands and keeps their moves for replay.
+    """
+
+    def __init__(self, size=INPUT_HISTORY):
+        """
+        Initialize the history.
+
+        Args:
+            size: Number of commands kept; older ones cannot be replayed.
+        """
+        self.pending = deque(maxlen=size)  # [(seq, dx, dy, dz)] pas encore confirmées
+        self.next_seq = 0
+        self.position = None  # position envoyée avec la dernière commande
+        self.corrected = protocol.NO_SEQ  # commande de la dernière correction appliquée
+
+    def record(self, x, y, z):
+        """
+        Number the command of one frame and remember its move.
+
+        Args:
+            x, y, z: The predicted position at the end of the frame.
+
+        Returns:
+            int: The command number to send.
+        """
+        seq = self.next_seq
+        self.next_seq = (seq + 1) % protocol.SEQ_MOD
+        if self.position is not None:
+            px, py, pz = self.position
+            self.pending.append((seq, x - px, y - py, z - pz))
+        self.position = (x, y, z)
+        return seq
+
+    def reconcile(self, seq, x, y, z):
+        """
+        Apply a correction from the server.
+
+        Args:
+            seq: Last command the server applied, or NO_SEQ.
+            x, y, z: The position the server kept after it.
+
+        Returns:
+            tuple: The (x, y, z) position to move the player to, or None if
+            the correction is older than one already applied.
+        """
+        if seq != protocol.NO_SEQ:
+            if self.corrected != protocol.NO_SEQ and not protocol.seq_newer(seq, self.corrected):
+                return None
+            self.corrected = seq
+        pending = self.pending
+        if seq == protocol.NO_SEQ:
+            pending.clear()
+        while pending and not protocol.seq_newer(pending[0][0], seq):
+            pending.popleft()
+        # Rejeu des commandes que le serveur n'a pas encore vues
+        for _, dx, dy, dz in pending:
+            x += dx
+            y += dy
+            z += dz
+        self.position = (x, y, z)
+        return x, y, z
@@ -0,0 +1,738 @@
+"""
+Binary wire protocol shared by the server and the client.
+
+Every binary packet starts with a 3 byte header (magic, version, message type).
+Positions are 16-bit fixed-point values relative to the level bounds and
+entities are small integer ids. Packets that do not start with the magic byte
+are decoded as the legacy JSON protocol, so old clients keep working.
+
+A binary client opens its session with a connect/accept handshake: the server
+answers with a 64-bit session token and the client's 16-bit entity id. A
+client whose address changed (NAT rebinding) is asked to connect again and
+gets its session back by presenting its token. The handshake also agrees on
+the compression of the server's datagrams (see compression.py): the client
+names the preset dictionary it has and the server echoes it if it has the
+same one.
+
+Clients estimate the server clock with ping/pong exchanges: the server echoes
+the client's send time with its own, which gives the round-trip time and the
+offset between the two clocks. Snapshots carry the server tick and time they
+were built at, so the client can place them on the server timeline.
+
+The local player moves on the client as soon as a key is pressed: every
+frame is sent as a numbered input command carrying its duration and the
+position the client predicted. The server stays in charge of the position:
+it only accepts a move its speed limit allows, and when it has to clamp one
+it sends back a correction naming the last command it applied, on top of
+which the client replays the commands sent since.
+
+Snapshots are deltas: each one names the baseline snapshot (the last one the
+client acknowledged) and only carries the fields that changed since then.
+Discrete events (doors, player removal, entity kinds) travel on a reliable
+ordered channel instead: they are wrapped in numbered messages that are
+resent until acked.
+
+Relays sit between the server and some of the clients: the server sends them
+the full state of a room once per tick and they build the clients' snapshots;
+every other message of a relayed client is wrapped with its slot on the relay.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import json
+import struct
+
+MAGIC = 0xB5  # ne peut pas être confondu avec le '{' d'un paquet JSON
+PROTOCOL_VERSION = 7
+
+# Types de messages
+MSG_POS = 1
+MSG_SNAPSHOT = 2
+MSG_DOOR_TOGGLE = 3
+MSG_DOOR_SYNC = 4
+MSG_REMOVE_PLAYER = 5
+MSG_JOIN = 6
+MSG_BUNDLE = 7  # plusieurs messages dans un datagramme
+MSG_FRAGMENT = 8  # morceau d'un message plus grand que le MTU
+MSG_RELIABLE = 9  # message du canal fiable, renvoyé jusqu'à acquittement
+MSG_ACK = 10  # acquittement cumulatif du canal fiable
+MSG_ENTITY_KIND = 11  # nature d'une entité des snapshots (joueur, ennemi)
+MSG_RELAYED = 12  # message d'un client derrière un relais, ou pour lui
+MSG_STATE = 13  # état complet d'une salle, envoyé aux relais à chaque tick
+MSG_CONNECT = 14  # ouverture (ou reprise) de session
+MSG_ACCEPT = 15  # jeton de session et id d'entité attribués
+MSG_RECONNECT = 16  # adresse inconnue du serveur : le client doit renvoyer son connect
+MSG_PING = 17  # demande de synchronisation d'horloge (client → serveur)
+MSG_PONG = 18  # réponse au ping, avec l'heure du serveur
+MSG_COMPRESSED = 19  # datagramme compressé avec le dictionnaire négocié au connect
+MSG_INPUT = 20  # commande de déplacement numérotée du joueur local (client → serveur)
+MSG_CORRECTION = 21  # position imposée par le serveur après une commande refusée
+
+MSG_NAMES = {
+    MSG_POS: "pos",
+    MSG_SNAPSHOT: "snapshot",
+    MSG_DOOR_TOGGLE: "door_toggle",
+    MSG_DOOR_SYNC: "door_sync",
+    MSG_REMOVE_PLAYER: "remove_player",
+    MSG_JOIN: "join",
+    MSG_BUNDLE: "bundle",
+    MSG_FRAGMENT: "fragment",
+    MSG_RELIABLE: "reliable",
+    MSG_ACK: "ack",
+    MSG_ENTITY_KIND: "entity_kind",
+    MSG_RELAYED: "relayed",
+    MSG_STATE: "state",
+    MSG_CONNECT: "connect",
+    MSG_ACCEPT: "accept",
+    MSG_RECONNECT: "reconnect",
+    MSG_PING: "ping",
+    MSG_PONG: "pong",
+    MSG_COMPRESSED: "compressed",
+    MSG_INPUT: "input",
+    MSG_CORRECTION: "correction",
+}
+
+NO_ENTITY = 0xFFFF  # id réservé : "aucune entité"
+
+# Natures d'entité ; une entité sans MSG_ENTITY_KIND est un joueur
+KIND_PLAYER = 0
+KIND_ENEMY = 1
+DEFAULT_ROOM = "default"
+
+# Numéros de snapshot (et de commande) sur 16 bits, 0xFFFF étant réservé à "aucun" (ack absent, snapshot complet)
+SEQ_MOD = 0xFFFF
+NO_SEQ = 0xFFFF
+
+# Champs d'une entité dans un delta
+FIELD_X = 1
+FIELD_Y = 2
+FIELD_Z = 4
+FIELDS_ALL = FIELD_X | FIELD_Y | FIELD_Z
+
+# Bornes par défaut des niveaux (x, y, z) : ~8 mm de précision en x/y sur 16 bits
+DEFAULT_BOUNDS = ((-256.0, -256.0, -32.0), (256.0, 256.0, 32.0))
+
+HEADER = struct.Struct("<BBB")
+POS = struct.Struct("<HHHH")  # ack, x, y, z
+SNAPSHOT_HEAD = struct.Struct("<HHHHHB")  # seq, baseline, destinataire, nb modifiées, nb supprimées, nb portes
+ENTITY_ID = struct.Struct("<H")
+ENTITY_DELTA = {  # id, masque des champs, puis les champs présents
+    mask: struct.Struct("<HB" + "H" * bin(mask).count("1")) for mask in range(1, FIELDS_ALL + 1)
+}
+DOOR_ENTRY = struct.Struct("<HB")  # id porte, état
+NAME_HEAD = struct.Struct("<B")
+BUNDLE_ENTRY = struct.Struct("<H")  # taille du message qui suit
+FRAGMENT_HEAD = struct.Struct("<HBB")  # id du message, index, nombre de morceaux
+RELIABLE_HEAD = struct.Struct("<HH")  # seq, âge de l'événement en ms
+ACK = struct.Struct("<H")  # dernier seq fiable reçu dans l'ordre
+ENTITY_KIND = struct.Struct("<HB")  # id d'entité, nature
+RELAYED_HEAD = struct.Struct("<H")  # emplacement du client sur le relais
+STATE_HEAD = struct.Struct("<HHH")  # seq, nb entités, nb clients du relais
+ENTITY_STATE = struct.Struct("<HHHH")  # id, x, y, z
+BINDING = struct.Struct("<HH")  # emplacement sur le relais, id d'entité
+CONNECT_HEAD = struct.Struct("<QI")  # jeton de session (0 : nouvelle session), dictionnaire proposé (0 : aucun)
+ACCEPT = struct.Struct("<QHI")  # jeton de session, id d'entité, dictionnaire retenu (0 : pas de compression)
+SERVER_CLOCK = struct.Struct("<II")  # tick de la salle, temps serveur en ms (modulo 2**32)
+PING = struct.Struct("<d")  # heure d'envoi du client, en secondes sur son horloge
+PONG = struct.Struct("<dd")  # heure d'envoi du ping renvoyée telle quelle, temps serveur en secondes
+INPUT = struct.Struct("<HHHHHH")  # ack, seq de la commande, durée en ms, x, y, z prédits
+CORRECTION = struct.Struct("<HHHH")  # seq de la dernière commande appliquée, x, y, z
+
+
+class ProtocolError(ValueError):
+    """Raised when a packet cannot be decoded."""
+
+
+class Quantizer:
+    """
+    Converts world coordinates to 16-bit fixed-point values within the level bounds.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        """
+        Initialize the quantizer.
+
+        Args:
+            bounds: ((min_x, min_y, min_z), (max_x, max_y, max_z)) of the level.
+        """
+        self.mins = tuple(float(v) for v in bounds[0])
+        self.maxs = tuple(float(v) for v in bounds[1])
+        self.scales = tuple(65535.0 / (hi - lo) for lo, hi in zip(self.mins, self.maxs))
+        self.steps = tuple(1.0 / s for s in self.scales)
+
+    def quantize(self, x, y, z):
+        """
+        Quantize a world position.
+
+        Returns:
+            tuple: Three ints in [0, 65535], clamped to the bounds.
+        """
+        mx, my, mz = self.mins
+        sx, sy, sz = self.scales
+        qx = int((x - mx) * sx + 0.5)
+        qy = int((y - my) * sy + 0.5)
+        qz = int((z - mz) * sz + 0.5)
+        return (
+            0 if qx < 0 else 65535 if qx > 65535 else qx,
+            0 if qy < 0 else 65535 if qy > 65535 else qy,
+            0 if qz < 0 else 65535 if qz > 65535 else qz,
+        )
+
+    def dequantize(self, qx, qy, qz):
+        """
+        Convert a quantized position back to world coordinates.
+
+        Returns:
+            tuple: (x, y, z) floats.
+        """
+        mx, my, mz = self.mins
+        dx, dy, dz = self.steps
+        return mx + qx * dx, my + qy * dy, mz + qz * dz
+
+
+def seq_newer(a, b):
+    """
+    Tell whether snapshot number a is more recent than b, handling wrap-around.
+
+    Returns:
+        bool: True if a comes after b.
+    """
+    diff = (a - b) % SEQ_MOD
+    return 0 < diff < SEQ_MOD // 2
+
+
+def is_binary(data):
+    """
+    Tell whether a packet uses the binary protocol.
+
+    Args:
+        data: The raw datagram.
+
+    Returns:
+        bool: True for a binary packet, False for legacy JSON.
+    """
+    return len(data) >= HEADER.size and data[0] == MAGIC
+
+
+def _header(msg_type):
+    return HEADER.pack(MAGIC, PROTOCOL_VERSION, msg_type)
+
+
+# ----------------------------------------------------------------------
+# ENCODAGE
+# ----------------------------------------------------------------------
+def encode_pos(quantizer, x, y, z, ack=NO_SEQ):
+    """
+    Encode the local player position (client → server).
+
+    Args:
+        quantizer: The Quantizer of the level.
+        x, y, z: The world position.
+        ack: Number of the last snapshot the client applied, or NO_SEQ.
+    """
+    return _header(MSG_POS) + POS.pack(ack, *quantizer.quantize(x, y, z))
+
+
+def encode_input(quantizer, seq, dt, x, y, z, ack=NO_SEQ):
+    """
+    Encode one input command of the local player (client → server).
+
+    Args:
+        quantizer: The Quantizer of the level.
+        seq: Number of the command, below SEQ_MOD.
+        dt: Seconds of movement the command covers.
+        x, y, z: The world position the client predicted at its end.
+        ack: Number of the last snapshot the client applied, or NO_SEQ.
+    """
+    dt_ms = min(max(int(dt * 1000.0 + 0.5), 0), 0xFFFF)
+    return _header(MSG_INPUT) + INPUT.pack(ack, seq, dt_ms, *quantizer.quantize(x, y, z))
+
+
+def encode_correction(seq, qpos):
+    """
+    Encode the position the server kept for a client (server → client).
+
+    Args:
+        seq: Number of the last input command applied, or NO_SEQ.
+        qpos: The quantized (x, y, z) position.
+    """
+    return _header(MSG_CORRECTION) + CORRECTION.pack(seq, *qpos)
+
+
+def encode_snapshot_body(entities, doors, base_entities, base_doors):
+    """
+    Encode the changes between a baseline and the current state.
+
+    The body only depends on the two states, so clients sharing the same
+    baseline can share it.
+
+    Args:
+        entities: Dict {entity_id: (qx, qy, qz)} of the current state.
+        doors: Dict {door_id: state} of the current state.
+        base_entities: Entities of the baseline ({} for a full snapshot).
+        base_doors: Doors of the baseline ({} for a full snapshot).
+
+    Returns:
+        tuple: (changed count, removed count, door count, body bytes).
+    """
+    entries = []
+    for eid, q in entities.items():
+        base = base_entities.get(eid)
+        if base is None:
+            entries.append(ENTITY_DELTA[FIELDS_ALL].pack(eid, FIELDS_ALL, *q))
+        elif base != q:
+            mask = ((q[0] != base[0]) * FIELD_X) | ((q[1] != base[1]) * FIELD_Y) | ((q[2] != base[2]) * FIELD_Z)
+            fields = [v for v, bit in zip(q, (FIELD_X, FIELD_Y, FIELD_Z)) if mask & bit]
+            entries.append(ENTITY_DELTA[mask].pack(eid, mask, *fields))
+    n_changed = len(entries)
+
+    for eid in base_entities:
+        if eid not in entities:
+            entries.append(ENTITY_ID.pack(eid))
+    n_removed = len(entries) - n_changed
+
+    n_doors = 0
+    for door_id, state in doors.items():
+        if base_doors.get(door_id) != state:
+            entries.append(DOOR_ENTRY.pack(int(door_id), bool(state)))
+            n_doors += 1
+
+    return n_changed, n_removed, n_doors, b"".join(entries)
+
+
+def encode_server_clock(tick, server_time):
+    """
+    Encode the server tick and time a snapshot or state was built at.
+
+    Args:
+        tick: The room's tick number.
+        server_time: Server time in seconds.
+
+    Returns:
+        bytes: The encoded clock, shared by every packet of the tick.
+    """
+    return SERVER_CLOCK.pack(tick & 0xFFFFFFFF, int(server_time * 1000.0) & 0xFFFFFFFF)
+
+
+def encode_snapshot(seq, baseline, recipient_id, body, clock):
+    """
+    Prefix a snapshot body with the header of one recipient.
+
+    Args:
+        seq: Number of this snapshot.
+        baseline: Number of the snapshot the body is relative to, or NO_SEQ.
+        recipient_id: Entity id of the client receiving the packet.
+        body: The tuple returned by encode_snapshot_body.
+        clock: The bytes returned by encode_server_clock.
+
+    Returns:
+        bytes: The full packet.
+    """
+    n_changed, n_removed, n_doors, payload = body
+    head = SNAPSHOT_HEAD.pack(seq, baseline, recipient_id, n_changed, n_removed, n_doors)
+    return _header(MSG_SNAPSHOT) + head + clock + payload
+
+
+def encode_door(msg_type, door_id, state):
+    """Encode a door_toggle (client → server) or door_sync (server → client)."""
+    return _header(msg_type) + DOOR_ENTRY.pack(int(door_id), bool(state))
+
+
+def _encode_name(msg_type, text):
+    name = text.encode("utf-8")[:255]
+    return _header(msg_type) + NAME_HEAD.pack(len(name)) + name
+
+
+def _decode_name(data, offset):
+    (length,) = NAME_HEAD.unpack_from(data, offset)
+    offset += NAME_HEAD.size
+    if offset + length > len(data):
+        raise ProtocolError("truncated name")
+    return bytes(data[offset:offset + length]).decode("utf-8", errors="replace")
+
+
+def encode_remove_player(entity_id):
+    """Encode a request to remove a player by entity id."""
+    return _header(MSG_REMOVE_PLAYER) + ENTITY_ID.pack(entity_id)
+
+
+def encode_join(room):
+    """Encode a request to join a game room (client → server)."""
+    return _encode_name(MSG_JOIN, room)
+
+
+def encode_connect(room, player, token=0, dictionary=0):
+    """
+    Encode a session request (client → server).
+
+    Args:
+        room: The room to join.
+        player: The player name.
+        token: The token of the session to resume, 0 for a new one.
+        dictionary: Id of the compression dictionary of the client, 0 to
+            receive uncompressed datagrams.
+
+    Returns:
+        bytes: The connect packet.
+    """
+    room_name = room.encode("utf-8")[:255]
+    player_name = player.encode("utf-8")[:255]
+    return b"".join((
+        _header(MSG_CONNECT), CONNECT_HEAD.pack(token, dictionary),
+        NAME_HEAD.pack(len(room_name)), room_name, NAME_HEAD.pack(len(player_name)), player_name,
+    ))
+
+
+def encode_accept(token, entity_id, dictionary=0):
+    """
+    Encode the answer to a connect (server → client).
+
+    Args:
+        token: The session token.
+        entity_id: The client's entity id.
+        dictionary: Id of the compression dictionary the server will use,
+            0 if its datagrams stay uncompressed.
+
+    Returns:
+        bytes: The accept packet.
+    """
+    return _header(MSG_ACCEPT) + ACCEPT.pack(token, entity_id, dictionary)
+
+
+def encode_reconnect():
+    """Encode a request to connect again (server → client whose address is unknown)."""
+    return _header(MSG_RECONNECT)
+
+
+def encode_ping(client_time):
+    """Encode a clock synchronization request with the client's send time (client → server)."""
+    return _header(MSG_PING) + PING.pack(client_time)
+
+
+def encode_pong(client_time, server_time):
+    """Encode the answer to a ping: its send time echoed and the server time (server → client)."""
+    return _header(MSG_PONG) + PONG.pack(client_time, server_time)
+
+
+def encode_compressed(payload):
+    """Wrap a datagram compressed by a PacketCompressor."""
+    return _header(MSG_COMPRESSED) + payload
+
+
+def encode_bundle(messages):
+    """
+    Pack several binary messages into one datagram.
+
+    Args:
+        messages: List of encoded binary messages.
+
+    Returns:
+        bytes: The bundle packet.
+    """
+    parts = [_header(MSG_BUNDLE)]
+    for message in messages:
+        parts.append(BUNDLE_ENTRY.pack(len(message)))
+        parts.append(message)
+    return b"".join(parts)
+
+
+def encode_fragment(message_id, index, count, chunk):
+    """
+    Encode one fragment of a message too large for a datagram.
+
+    Args:
+        message_id: Id shared by every fragment of the message.
+        index: Index of this fragment.
+        count: Total number of fragments.
+        chunk: The bytes of this fragment.
+
+    Returns:
+        bytes: The fragment packet.
+    """
+    return _header(MSG_FRAGMENT) + FRAGMENT_HEAD.pack(message_id, index, count) + chunk
+
+
+def encode_reliable(seq, age_ms, message):
+    """
+    Wrap a binary message for the reliable channel.
+
+    Args:
+        seq: Sequence number of the message on the channel.
+        age_ms: Milliseconds elapsed since the event, capped to 16 bits, so
+            the receiver can tell when it started even after resends.
+        message: The encoded message.
+
+    Returns:
+        bytes: The reliable packet.
+    """
+    return _header(MSG_RELIABLE) + RELIABLE_HEAD.pack(seq, min(int(age_ms), 0xFFFF)) + message
+
+
+def encode_ack(seq):
+    """Encode a cumulative acknowledgement of the reliable channel."""
+    return _header(MSG_ACK) + ACK.pack(seq)
+
+
+def encode_entity_kind(entity_id, kind):
+    """Encode the kind of a snapshot entity (server → client)."""
+    return _header(MSG_ENTITY_KIND) + ENTITY_KIND.pack(entity_id, kind)
+
+
+def encode_relayed(slot, message):
+    """
+    Wrap a message exchanged between the server and one client of a relay.
+
+    Args:
+        slot: The client's slot on the relay.
+        message: A datagram of the client (relay → server) or a binary
+            message for it (server → relay).
+
+    Returns:
+        bytes: The relayed packet.
+    """
+    return _header(MSG_RELAYED) + RELAYED_HEAD.pack(slot) + message
+
+
+def encode_state_entities(entities):
+    """
+    Encode the entity list of a room state, shared by every relay.
+
+    Args:
+        entities: Dict {entity_id: (qx, qy, qz)}.
+
+    Returns:
+        tuple: (entity count, entries bytes).
+    """
+    return len(entities), b"".join(ENTITY_STATE.pack(eid, *q) for eid, q in entities.items())
+
+
+def encode_state(room, seq, clock, entities, bindings):
+    """
+    Encode the full state of a room for one relay.
+
+    Args:
+        room: The room name.
+        seq: Number of the snapshot this state stands for.
+        clock: The bytes returned by encode_server_clock, copied into the
+            relay's snapshots.
+        entities: The tuple returned by encode_state_entities.
+        bindings: List of (slot, entity_id) of the relay's clients in the room.
+
+    Returns:
+        bytes: The state packet.
+    """
+    count, payload = entities
+    name = room.encode("utf-8")[:255]
+    return b"".join((
+        _header(MSG_STATE), NAME_HEAD.pack(len(name)), name,
+        STATE_HEAD.pack(seq, count, len(bindings)), clock, payload,
+        b"".join(BINDING.pack(slot, eid) for slot, eid in bindings),
+    ))
+
+
+def peek_room(data):
+    """
+    Read the room of a join or connect packet without decoding anything else.
+
+    Used by the shard router, which only needs to route packets.
+
+    Args:
+        data: The raw datagram.
+
+    Returns:
+        str: The room name, or None if the packet is not a valid join or connect.
+    """
+    try:
+        if is_binary(data):
+            if data[1] != PROTOCOL_VERSION:
+                return None
+            if data[2] == MSG_CONNECT:
+                return _decode_name(data, HEADER.size + CONNECT_HEAD.size)
+            if data[2] != MSG_JOIN:
+                return None
+            return _decode_name(data, HEADER.size)
+        if b'"join"' not in data:
+            return None
+        msg = json.loads(data.decode())
+        return str(msg.get("room", DEFAULT_ROOM)) if msg.get("type") == "join" else None
+    except (ProtocolError, struct.error, UnicodeDecodeError, ValueError, AttributeError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# DÉCODAGE
+# ----------------------------------------------------------------------
+def decode(data, quantizer):
+    """
+    Decode a binary or legacy JSON packet into a message dict.
+
+    Binary messages are decoded to the same dict shape as their JSON
+    counterparts (e.g. {"type": "pos", "x": ..., "y": ..., "z": ...}), with
+    entity ids as ints instead of "ip:port" strings. Snapshots keep their
+    quantized delta form and must go through a SnapshotReceiver.
+
+    The packet can be a memoryview of a receive buffer: fields are unpacked in
+    place and the nested messages (reliable, relayed) are copied, so the
+    result stays valid once the buffer is reused.
+
+    Args:
+        data: The raw datagram (bytes or memoryview).
+        quantizer: The Quantizer matching the sender's level bounds.
+
+    Returns:
+        dict: The decoded message.
+
+    Raises:
+        ProtocolError: If the packet is malformed.
+    """
+    if not is_binary(data):
+        try:
+            msg = json.loads(bytes(data).decode())
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ProtocolError(f"invalid JSON packet: {e}") from e
+        if not isinstance(msg, dict):
+            raise ProtocolError("JSON packet is not an object")
+        return msg
+
+    _, version, msg_type = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+
+    offset = HEADER.size
+    try:
+        if msg_type == MSG_POS:
+            ack, qx, qy, qz = POS.unpack_from(data, offset)
+            x, y, z = quantizer.dequantize(qx, qy, qz)
+            return {"type": "pos", "ack": ack, "x": x, "y": y, "z": z}
+
+        if msg_type == MSG_INPUT:
+            ack, seq, dt_ms, qx, qy, qz = INPUT.unpack_from(data, offset)
+            x, y, z = quantizer.dequantize(qx, qy, qz)
+            return {"type": "input", "ack": ack, "seq": seq, "dt": dt_ms / 1000.0, "x": x, "y": y, "z": z}
+
+        if msg_type == MSG_CORRECTION:
+            seq, qx, qy, qz = CORRECTION.unpack_from(data, offset)
+            x, y, z = quantizer.dequantize(qx, qy, qz)
+            return {"type": "correction", "seq": seq, "x": x, "y": y, "z": z}
+
+        if msg_type == MSG_SNAPSHOT:
+            return _decode_snapshot(data, offset)
+
+        if msg_type in (MSG_DOOR_TOGGLE, MSG_DOOR_SYNC):
+            door_id, state = DOOR_ENTRY.unpack_from(data, offset)
+            return {"type": MSG_NAMES[msg_type], "door_id": door_id, "state": bool(state)}
+
+        if msg_type == MSG_REMOVE_PLAYER:
+            (entity_id,) = ENTITY_ID.unpack_from(data, offset)
+            return {"type": "remove_player", "id": entity_id}
+
+        if msg_type == MSG_CONNECT:
+            token, dictionary = CONNECT_HEAD.unpack_from(data, offset)
+            offset += CONNECT_HEAD.size
+            room = _decode_name(data, offset)
+            offset += NAME_HEAD.size + data[offset]
+            return {"type": "connect", "token": token, "dictionary": dictionary, "room": room,
+                    "player": _decode_name(data, offset)}
+
+        if msg_type == MSG_ACCEPT:
+            token, entity_id, dictionary = ACCEPT.unpack_from(data, offset)
+            return {"type": "accept", "token": token, "id": entity_id, "dictionary": dictionary}
+
+        if msg_type == MSG_RECONNECT:
+            return {"type": "reconnect"}
+
+        if msg_type == MSG_PING:
+            (client_time,) = PING.unpack_from(data, offset)
+            return {"type": "ping", "time": client_time}
+
+        if msg_type == MSG_PONG:
+            client_time, server_time = PONG.unpack_from(data, offset)
+            return {"type": "pong", "time": client_time, "server_time": server_time}
+
+        if msg_type == MSG_JOIN:
+            return {"type": "join", "room": _decode_name(data, offset)}
+
+        if msg_type == MSG_RELIABLE:
+            seq, age_ms = RELIABLE_HEAD.unpack_from(data, offset)
+            message = bytes(data[offset + RELIABLE_HEAD.size:])
+            if not is_binary(message) or message[2] in (MSG_RELIABLE, MSG_BUNDLE, MSG_FRAGMENT):
+                raise ProtocolError("invalid reliable payload")
+            return {"type": "reliable", "seq": seq, "age": age_ms / 1000.0, "message": message}
+
+        if msg_type == MSG_ACK:
+            (ack,) = ACK.unpack_from(data, offset)
+            return {"type": "ack", "ack": ack}
+
+        if msg_type == MSG_ENTITY_KIND:
+            entity_id, kind = ENTITY_KIND.unpack_from(data, offset)
+            return {"type": "entity_kind", "id": entity_id, "kind": kind}
+
+        if msg_type == MSG_RELAYED:
+            (slot,) = RELAYED_HEAD.unpack_from(data, offset)
+            message = bytes(data[offset + RELAYED_HEAD.size:])
+            if is_binary(message) and message[2] in (MSG_RELAYED, MSG_STATE):
+                raise ProtocolError("nested relayed payload")
+            return {"type": "relayed", "slot": slot, "message": message}
+
+        if msg_type == MSG_STATE:
+            return _decode_state(data, offset)
+    except struct.error as e:
+        raise ProtocolError(f"truncated packet: {e}") from e
+
+    raise ProtocolError(f"unknown message type {msg_type}")
+
+
+def _decode_state(data, offset):
+    room = _decode_name(data, offset)
+    offset += NAME_HEAD.size + data[offset]
+    seq, n_entities, n_bindings = STATE_HEAD.unpack_from(data, offset)
+    offset += STATE_HEAD.size
+    clock = bytes(data[offset:offset + SERVER_CLOCK.size])
+    tick, time_ms = SERVER_CLOCK.unpack_from(data, offset)
+    offset += SERVER_CLOCK.size
+    end = offset + n_entities * ENTITY_STATE.size
+    if end + n_bindings * BINDING.size > len(data):
+        raise ProtocolError("truncated state")
+    entities = {eid: (qx, qy, qz) for eid, qx, qy, qz in ENTITY_STATE.iter_unpack(data[offset:end])}
+    bindings = list(BINDING.iter_unpack(data[end:end + n_bindings * BINDING.size]))
+    return {"type": "state", "room": room, "seq": seq, "tick": tick, "time": time_ms / 1000.0, "clock": clock,
+            "entities": entities, "bindings": bindings}
+
+
+def _decode_snapshot(data, offset):
+    seq, baseline, recipient, n_changed, n_removed, n_doors = SNAPSHOT_HEAD.unpack_from(data, offset)
+    offset += SNAPSHOT_HEAD.size
+    tick, time_ms = SERVER_CLOCK.unpack_from(data, offset)
+    offset += SERVER_CLOCK.size
+
+    changed = []
+    for _ in range(n_changed):
+        mask = data[offset + 2] if offset + 2 < len(data) else 0
+        fmt = ENTITY_DELTA.get(mask)
+        if fmt is None:
+            raise ProtocolError(f"invalid field mask {mask}")
+        changed.append(fmt.unpack_from(data, offset))
+        offset += fmt.size
+    if offset + n_removed * ENTITY_ID.size + n_doors * DOOR_ENTRY.size > len(data):
+        # Appliqué puis acquitté, un snapshot incomplet fausserait toutes les baselines suivantes
+        raise ProtocolError("truncated snapshot")
+
+    removed = [eid for (eid,) in ENTITY_ID.iter_unpack(data[offset:offset + n_removed * ENTITY_ID.size])]
+    offset += n_removed * ENTITY_ID.size
+
+    doors = {
+        door_id: bool(state)
+        for door_id, state in DOOR_ENTRY.iter_unpack(data[offset:offset + n_doors * DOOR_ENTRY.size])
+    }
+    return {
+        "type": "snapshot",
+        "seq": seq,
+        "baseline": baseline,
+        "you": None if recipient == NO_ENTITY else recipient,
+        "tick": tick,
+        "time": time_ms / 1000.0,  # temps serveur de la tick, modulo 2**32 ms (~49 jours)
+        "changed": changed,  # [(id, masque, champ, ...)]
+        "removed": removed,
+        "doors": doors,
+    }
@@ -0,0 +1,98 @@
+"""
+Per-address token buckets applied before any decoding.
+
+Each sender may send `rate` packets per second on average, with bursts up to
+`burst` packets; the excess is dropped at the cost of one dict lookup, so a
+client spamming packets cannot make the server decode them all.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+DEFAULT_RATE = 150.0  # paquets/s ; le client envoie sa position jusqu'à 100 fois par seconde
+DEFAULT_BURST = 60.0  # paquets acceptés d'affilée après un silence
+
+
+class TokenBucket:
+    """
+    Packet allowance of one address.
+    """
+
+    __slots__ = ("tokens", "updated", "dropped")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.dropped = 0
+
+
+class RateLimiter:
+    """
+    Token buckets of every address sending to the server.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Packets per second refilled in each bucket.
+            burst: Capacity of each bucket.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}  # { (ip, port): TokenBucket }
+        self.dropped = 0
+        self.dropped_bytes = 0
+
+    def allow(self, addr, size, now):
+        """
+        Take one token from an address's bucket.
+
+        Args:
+            addr: The sender address.
+            size: The packet size, counted when dropped.
+            now: Current time.
+
+        Returns:
+            bool: True if the packet may be processed, False if it must be dropped.
+        """
+        bucket = self.buckets.get(addr)
+        if bucket is None:
+            bucket = self.buckets[addr] = TokenBucket(self.burst, now)
+        else:
+            tokens = bucket.tokens + (now - bucket.updated) * self.rate
+            bucket.tokens = tokens if tokens < self.burst else self.burst
+            bucket.updated = now
+        if bucket.tokens >= 1.0:
+            bucket.tokens -= 1.0
+            return True
+        bucket.dropped += 1
+        self.dropped += 1
+        self.dropped_bytes += size
+        return False
+
+    def sweep(self, now):
+        """
+        Forget the buckets that have refilled completely: a new bucket would
+        be identical.
+
+        Args:
+            now: Current time.
+        """
+        full_after = self.burst / self.rate
+        for addr in [a for a, b in self.buckets.items() if now - b.updated >= full_after]:
+            del self.buckets[addr]
+
+    def offenders(self, count=5):
+        """
+        List the addresses with the most dropped packets.
+
+        Args:
+            count: Maximum number of addresses returned.
+
+        Returns:
+            list: (address, dropped packets) pairs, worst first.
+        """
+        ranked = sorted(((a, b.dropped) for a, b in self.buckets.items() if b.dropped), key=lambda item: -item[1])
+        return ranked[:count]
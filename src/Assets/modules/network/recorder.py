@@ -0,0 +1,101 @@
+"""
+Append-only binary log of the datagrams received and sent by a server.
+
+A log starts with a fixed header, followed by one record per datagram:
+monotonic timestamp relative to the start of the recording, direction,
+peer address and raw payload. replay.py reads it back to rerun a session.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import struct
+import time
+
+LOG_MAGIC = b"PMRC"
+LOG_VERSION = 1
+DIRECTION_IN = 0  # reçu par le serveur
+DIRECTION_OUT = 1  # envoyé par le serveur
+
+LOG_HEAD = struct.Struct("<4sHd")  # magic, version, heure murale du début (time.time())
+RECORD_HEAD = struct.Struct("<dBBHI")  # instant, direction, taille de l'hôte, port, taille du paquet
+
+
+class PacketRecorder:
+    """
+    Writes datagrams to a log file as they go through the server.
+    """
+
+    def __init__(self, path):
+        """
+        Create the log (an existing file is replaced).
+
+        Args:
+            path: The log file.
+        """
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(LOG_HEAD.pack(LOG_MAGIC, LOG_VERSION, time.time()))
+        self.started = time.monotonic()
+        self.records = 0
+
+    def record(self, direction, addr, data):
+        """
+        Append one datagram.
+
+        Args:
+            direction: DIRECTION_IN or DIRECTION_OUT.
+            addr: The (ip, port) peer address.
+            data: The raw datagram.
+        """
+        host = addr[0].encode("ascii")
+        self.file.write(RECORD_HEAD.pack(time.monotonic() - self.started, direction, len(host), addr[1], len(data)))
+        self.file.write(host)
+        self.file.write(data)
+        self.records += 1
+
+    def flush(self):
+        """Push the buffered records to the file."""
+        self.file.flush()
+
+    def close(self):
+        """Flush and close the log."""
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_records(path):
+    """
+    Read the records of a log.
+
+    A truncated last record (server killed while writing) is ignored.
+
+    Args:
+        path: The log file.
+
+    Yields:
+        tuple: (seconds since the start, direction, (ip, port), payload bytes).
+
+    Raises:
+        ValueError: If the file is not a packet log.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < LOG_HEAD.size:
+        raise ValueError(f"{path}: fichier trop court")
+    magic, version, _ = LOG_HEAD.unpack_from(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path}: pas un journal de paquets (version {LOG_VERSION})")
+
+    offset = LOG_HEAD.size
+    end = len(data)
+    while offset + RECORD_HEAD.size <= end:
+        t, direction, host_len, port, size = RECORD_HEAD.unpack_from(data, offset)
+        offset += RECORD_HEAD.size
+        if offset + host_len + size > end:
+            break
+        host = data[offset:offset + host_len].decode("ascii")
+        offset += host_len
+        payload = data[offset:offset + size]
+        offset += size
+        yield t, direction, (host, port), payload
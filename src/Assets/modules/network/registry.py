@@ -0,0 +1,290 @@
+"""
+Client registry: indexed client records with timing-wheel expiry.
+
+Clients are keyed by their 16-bit entity id; the address only maps incoming
+datagrams to a client and can change when a client reconnects with its
+session token (e.g. after a NAT rebinding). Receiving a packet only stamps
+the client's last_seen; inactive clients are found by a timing wheel that
+looks at one slot per step, so neither the receive path nor the expiry sweep
+scans the whole client table.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import math
+import secrets
+
+MAX_ENTITY_ID = 0xFFFE  # 0xFFFF est protocol.NO_ENTITY
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel of keys, with a fixed slot resolution.
+    """
+
+    def __init__(self, resolution=0.5, slots=64):
+        """
+        Initialize the wheel.
+
+        Args:
+            resolution: Duration of one slot in seconds.
+            slots: Number of slots; delays beyond slots * resolution are
+                capped and simply checked again when they come up.
+        """
+        self.resolution = resolution
+        self.buckets = [set() for _ in range(slots)]
+        self.position = 0
+        self._slot_of = {}  # { clé: index du slot }
+
+    def schedule(self, key, delay):
+        """
+        Schedule (or reschedule) a key to come up after a delay.
+
+        Args:
+            key: A hashable key.
+            delay: Delay in seconds.
+        """
+        self.cancel(key)
+        steps = min(max(1, math.ceil(delay / self.resolution)), len(self.buckets) - 1)
+        slot = (self.position + steps) % len(self.buckets)
+        self.buckets[slot].add(key)
+        self._slot_of[key] = slot
+
+    def cancel(self, key):
+        """
+        Remove a key from the wheel.
+
+        Args:
+            key: The key to remove.
+        """
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self.buckets[slot].discard(key)
+
+    def advance(self):
+        """
+        Move the wheel one slot forward.
+
+        Returns:
+            set: The keys that came up.
+        """
+        self.position = (self.position + 1) % len(self.buckets)
+        due = self.buckets[self.position]
+        self.buckets[self.position] = set()
+        for key in due:
+            del self._slot_of[key]
+        return due
+
+
+class ClientRegistry:
+    """
+    Clients indexed by entity id, address, session token and player name.
+    """
+
+    def __init__(self, timeout=10.0, resolution=0.5, rng=None):
+        """
+        Initialize the registry.
+
+        Args:
+            timeout: Seconds without packets before a client expires.
+            resolution: Step of the expiry wheel in seconds.
+            rng: random.Random drawing the session tokens; a seeded one makes
+                them reproducible (replays), secrets.SystemRandom if None.
+        """
+        self.timeout = timeout
+        self.by_id = {}  # { entity_id: Client }
+        self.by_addr = {}  # { (ip, port): Client }
+        self.by_token = {}  # { jeton de session: Client }
+        self.by_name = {}  # { nom du joueur: {entity_id, ...} }
+        self.wheel = TimingWheel(resolution, slots=max(2, math.ceil(timeout / resolution) + 2))
+        self.rng = rng or secrets.SystemRandom()
+        self._free_ids = []
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.by_addr)
+
+    def __contains__(self, addr):
+        return addr in self.by_addr
+
+    def __iter__(self):
+        return iter(self.by_addr)
+
+    def get(self, addr):
+        """Return the client at an address, or None."""
+        return self.by_addr.get(addr)
+
+    def values(self):
+        """Return a view of every client."""
+        return self.by_addr.values()
+
+    def items(self):
+        """Return a view of (address, client) pairs."""
+        return self.by_addr.items()
+
+    def allocate_id(self):
+        """
+        Reserve a free entity id.
+
+        Returns:
+            int: The entity id.
+
+        Raises:
+            ValueError: If every 16-bit id is taken.
+        """
+        if self._free_ids:
+            return self._free_ids.pop()
+        entity_id = self._next_id
+        if entity_id > MAX_ENTITY_ID:
+            raise ValueError("plus d'id d'entité libre")
+        self._next_id += 1
+        return entity_id
+
+    def new_token(self):
+        """
+        Draw an unused session token.
+
+        Returns:
+            int: A non-zero 64-bit token.
+        """
+        while True:
+            token = self.rng.getrandbits(64)
+            if token and token not in self.by_token:
+                return token
+
+    def release_id(self, entity_id):
+        """
+        Give back an entity id reserved with allocate_id and not (or no
+        longer) used by a registered client, e.g. a server-side enemy.
+
+        Args:
+            entity_id: The entity id.
+        """
+        self._free_ids.append(entity_id)
+
+    def add(self, client):
+        """
+        Register a client built with an id from allocate_id.
+
+        Args:
+            client: The Client record; a token of 0 (legacy JSON client)
+                is not indexed.
+        """
+        self.by_id[client.entity_id] = client
+        self.by_addr[client.addr] = client
+        if client.token:
+            self.by_token[client.token] = client
+        self.by_name.setdefault(client.player, set()).add(client.entity_id)
+        self.wheel.schedule(client.entity_id, self.timeout)
+
+    def remove(self, addr):
+        """
+        Unregister a client and release its entity id.
+
+        Args:
+            addr: The client address.
+
+        Returns:
+            Client: The removed client, or None if unknown.
+        """
+        client = self.by_addr.pop(addr, None)
+        if client is None:
+            return None
+        del self.by_id[client.entity_id]
+        if client.token:
+            del self.by_token[client.token]
+        self._unindex_name(client)
+        self.wheel.cancel(client.entity_id)
+        self.release_id(client.entity_id)
+        return client
+
+    def rebind(self, client, addr):
+        """
+        Move a client to a new address, e.g. when it reconnects with its
+        session token from another port.
+
+        Args:
+            client: The Client record.
+            addr: Its new address.
+
+        Raises:
+            ValueError: If another client holds the address; remove it first.
+        """
+        owner = self.by_addr.get(addr)
+        if owner is not None and owner is not client:
+            raise ValueError("adresse déjà prise par un autre client")
+        del self.by_addr[client.addr]
+        client.addr = addr
+        self.by_addr[addr] = client
+
+    def rename(self, client, player):
+        """
+        Change a client's player name and keep the name index up to date.
+
+        Args:
+            client: The Client record.
+            player: The new player name.
+
+        Raises:
+            TypeError: If player is not a string; nothing is changed.
+        """
+        if not isinstance(player, str):
+            raise TypeError("le nom du joueur doit être une chaîne")
+        if client.player == player:
+            return
+        self._unindex_name(client)
+        client.player = player
+        self.by_name.setdefault(player, set()).add(client.entity_id)
+
+    def _unindex_name(self, client):
+        ids = self.by_name.get(client.player)
+        if ids is not None:
+            ids.discard(client.entity_id)
+            if not ids:
+                del self.by_name[client.player]
+
+    def by_entity(self, entity_id):
+        """Return the client with an entity id, or None."""
+        return self.by_id.get(entity_id)
+
+    def by_session(self, token):
+        """Return the client holding a session token, or None."""
+        return self.by_token.get(token) if token else None
+
+    def named(self, player):
+        """
+        Find the clients using a player name.
+
+        Args:
+            player: The player name.
+
+        Returns:
+            list: The matching Client records.
+        """
+        return [self.by_id[eid] for eid in self.by_name.get(player, ())]
+
+    def expired(self, now):
+        """
+        Advance the expiry wheel by one step.
+
+        Clients seen since they were scheduled are rescheduled for the rest of
+        their timeout; the others are returned (but not removed).
+
+        Args:
+            now: Current time, on the same clock as Client.last_seen.
+
+        Returns:
+            list: The Client records that timed out.
+        """
+        timed_out = []
+        for entity_id in self.wheel.advance():
+            client = self.by_id.get(entity_id)
+            if client is None:
+                continue
+            remaining = client.last_seen + self.timeout - now
+            if remaining > 0:
+                self.wheel.schedule(entity_id, remaining)
+            else:
+                timed_out.append(client)
+        return timed_out
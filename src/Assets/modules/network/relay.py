@@ -0,0 +1,372 @@
+"""
+Relay (edge) tier: re-broadcasts the snapshots of one authoritative server
+to a subset of its clients.
+
+The server sends each relay the full state of a room once per tick instead
+of one snapshot per client; the relay runs the per-client work (area of
+interest, bandwidth budget, delta encoding, framing) and forwards its clients'
+packets upstream, wrapped with their slot. Several relays, on one machine or
+several, split the fan-out cost of a big session.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import time
+
+from . import protocol
+from .snapshot import SnapshotHistory
+from .bandwidth import BandwidthBudget, DEFAULT_BUDGET
+from .interest import InterestManager
+from .transport import FramingStats, PacketWriter, Reassembler, DatagramSocket
+from .ratelimit import RateLimiter, DEFAULT_RATE, DEFAULT_BURST
+from .compression import PacketCompressor, CompressionStats, COMPRESS_THRESHOLD
+
+
+class RelayClient:
+    """
+    State kept by a relay for one of its clients.
+    """
+
+    __slots__ = ("addr", "slot", "entity_id", "room", "snapshots", "budget", "writer", "last_seen", "compress")
+
+    def __init__(self, addr, slot, budget, writer, now):
+        """
+        Initialize a client record.
+
+        Args:
+            addr: The (ip, port) address of the client.
+            slot: Its slot on the relay, which the server sees in its address.
+            budget: The BandwidthBudget limiting the client's snapshots.
+            writer: The PacketWriter coalescing the client's messages.
+            now: Time of the first packet.
+        """
+        self.addr = addr
+        self.slot = slot
+        self.entity_id = protocol.NO_ENTITY  # connu au premier état où le serveur le place
+        self.room = None  # RelayRoom où le serveur l'a placé
+        self.snapshots = SnapshotHistory()
+        self.budget = budget
+        self.writer = writer
+        self.last_seen = now
+        self.compress = False  # lu dans l'accept que le serveur lui envoie
+
+
+class RelayRoom:
+    """
+    Last state of one server room, indexed for the area of interest.
+    """
+
+    def __init__(self, name, quantizer, interest_options=None):
+        """
+        Initialize the room.
+
+        Args:
+            name: The room name on the server.
+            quantizer: The Quantizer matching the server's level bounds.
+            interest_options: Keyword arguments for the room's InterestManager.
+        """
+        self.name = name
+        self.quantizer = quantizer
+        self.interest = InterestManager(**(interest_options or {}))
+        self.positions = {}  # { entity_id: ((x, y, z), qpos) }
+        self.last_state = 0.0
+
+    def update(self, entities):
+        """
+        Replace the room's entities by those of a new state.
+
+        Args:
+            entities: Dict {entity_id: qpos} of the state.
+        """
+        positions = self.positions
+        grid = self.interest.grid
+        dequantize = self.quantizer.dequantize
+        for eid in [e for e in positions if e not in entities]:
+            del positions[eid]
+            grid.remove(eid)
+        for eid, q in entities.items():
+            old = positions.get(eid)
+            if old is None or old[1] != q:
+                world = dequantize(*q)
+                positions[eid] = (world, q)
+                grid.update(eid, world[0], world[1])
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    """
+    Socket of the relay connected to the server.
+    """
+
+    def __init__(self, relay):
+        self.relay = relay
+
+    def datagram_received(self, data, addr):
+        self.relay.handle_upstream(data)
+
+    def error_received(self, exc):
+        print("Erreur socket serveur:", exc)
+
+
+class Relay:
+    """
+    Edge process serving some clients of one GameServer.
+    """
+
+    def __init__(self, host, port, server_addr, tick_rate=30, client_timeout=10.0, stats_interval=10.0,
+                 bounds=protocol.DEFAULT_BOUNDS, interest_options=None, client_budget=DEFAULT_BUDGET,
+                 rate_limit=DEFAULT_RATE, rate_burst=DEFAULT_BURST, dictionary=None,
+                 compress_threshold=COMPRESS_THRESHOLD, upstream_port=0):
+        """
+        Initialize the relay.
+
+        Args:
+            host: Address to bind for the clients.
+            port: UDP port to bind for the clients.
+            server_addr: (ip, port) of the authoritative server.
+            tick_rate: Tick rate of the server, for the clients' budgets.
+            client_timeout: Seconds without packets before a client is forgotten.
+            stats_interval: Seconds between two reports (0 disables).
+            bounds: Level bounds used by the server to quantize positions.
+            interest_options: Keyword arguments for the InterestManager of each room.
+            client_budget: Snapshot bytes/second allowed for each client.
+            rate_limit: Packets/second accepted from one client (0 disables).
+            rate_burst: Packets accepted in a row from one client.
+            dictionary: Preset dictionary compressing the datagrams of the
+                clients the server agreed to compress for; it must be the
+                server's (None disables compression).
+            compress_threshold: Size in bytes from which a datagram is compressed.
+            upstream_port: UDP port the relay talks to the server from; the
+                server only accepts relays whose address it was given (0
+                picks a free port, e.g. for tests).
+        """
+        self.host = host
+        self.port = port
+        self.server_addr = server_addr
+        self.upstream_port = upstream_port
+        self.tick_rate = tick_rate
+        self.client_timeout = client_timeout
+        self.stats_interval = stats_interval
+        self.interest_options = interest_options or {}
+        self.client_budget = client_budget
+        self.quantizer = protocol.Quantizer(bounds)
+        self.limiter = RateLimiter(rate_limit, rate_burst) if rate_limit else None
+        self.framing_stats = FramingStats()
+        self.reassembler = Reassembler(self.framing_stats)
+        self.compression_stats = CompressionStats()
+        self.compressor = (PacketCompressor(dictionary, compress_threshold, stats=self.compression_stats)
+                           if dictionary else None)
+        self.clients = {}  # { (ip, port): RelayClient }
+        self.by_slot = {}  # { emplacement: RelayClient }
+        self.rooms = {}  # { nom: RelayRoom }
+        self._next_slot = 0
+        self.transport = None
+        self.upstream = None
+
+        # Compteurs
+        self.packets_in = 0
+        self.packets_out = 0
+        self.bytes_out = 0
+        self.forwarded = 0
+        self.states = 0
+        self.snapshots_sent = 0
+
+    # ------------------------------------------------------------------
+    # CLIENTS → SERVEUR
+    # ------------------------------------------------------------------
+    def handle_datagram(self, data, addr):
+        """
+        Forward a client datagram to the server, wrapped with the client's slot.
+
+        Only binary clients are served; acknowledgements of the relay's
+        snapshots are read on the way.
+
+        Args:
+            data: The raw datagram, a memoryview of the receive buffer.
+            addr: The client address.
+        """
+        self.packets_in += 1
+        now = time.monotonic()
+        if self.limiter is not None and not self.limiter.allow(addr, len(data), now):
+            return
+        if not protocol.is_binary(data) or self.upstream is None:
+            return  # les clients JSON se connectent directement au serveur
+        client = self.clients.get(addr)
+        if client is None:
+            client = self._add_client(addr, now)
+            if client is None:
+                return
+        client.last_seen = now
+        # L'ack des snapshots est le premier champ des positions et des commandes
+        if data[2] in (protocol.MSG_POS, protocol.MSG_INPUT) and len(data) >= protocol.HEADER.size + protocol.POS.size:
+            client.snapshots.ack(protocol.POS.unpack_from(data, protocol.HEADER.size)[0])
+        self.upstream.sendto(protocol.encode_relayed(client.slot, data))
+        self.forwarded += 1
+
+    def _add_client(self, addr, now):
+        if len(self.by_slot) >= protocol.NO_ENTITY:
+            return None
+        # Emplacements attribués en tourniquet : un emplacement libéré ne
+        # resservira pas avant que le serveur ait oublié son ancien client.
+        slot = self._next_slot
+        while slot in self.by_slot:
+            slot = (slot + 1) % protocol.NO_ENTITY
+        self._next_slot = (slot + 1) % protocol.NO_ENTITY
+        budget = BandwidthBudget(self.client_budget, self.tick_rate)
+        client = RelayClient(addr, slot, budget, PacketWriter(self.framing_stats), now)
+        self.clients[addr] = client
+        self.by_slot[slot] = client
+        return client
+
+    def _remove_client(self, client):
+        del self.clients[client.addr]
+        del self.by_slot[client.slot]
+
+    # ------------------------------------------------------------------
+    # SERVEUR → CLIENTS
+    # ------------------------------------------------------------------
+    def handle_upstream(self, data):
+        """
+        Process one datagram from the server: pass the relayed messages on to
+        their client and turn the room states into snapshots.
+
+        Args:
+            data: The raw datagram.
+        """
+        touched = []
+        for message in self.reassembler.feed(data, self.server_addr):
+            try:
+                msg = protocol.decode(message, self.quantizer)
+            except protocol.ProtocolError:
+                print("⚠️ Paquet non valide reçu du serveur.")
+                continue
+            msg_type = msg.get("type")
+            if msg_type == "relayed":
+                client = self.by_slot.get(msg["slot"])
+                if client is not None:
+                    message = msg["message"]
+                    if protocol.is_binary(message) and message[2] == protocol.MSG_ACCEPT:
+                        self._on_accept(client, message)
+                    client.writer.queue(message)
+                    touched.append(client)
+            elif msg_type == "state":
+                self._on_state(msg)
+        # Messages sans état dans ce datagramme : envoyés tout de suite
+        for client in touched:
+            self._flush(client)
+
+    def _on_accept(self, client, message):
+        try:
+            accept = protocol.decode(message, self.quantizer)
+        except protocol.ProtocolError:
+            return
+        # Le serveur n'accepte que son propre dictionnaire, qui doit être le nôtre
+        client.compress = (self.compressor is not None
+                           and accept["dictionary"] == self.compressor.dictionary_id)
+
+    def _on_state(self, msg):
+        self.states += 1
+        room = self.rooms.get(msg["room"])
+        if room is None:
+            room = self.rooms[msg["room"]] = RelayRoom(msg["room"], self.quantizer, self.interest_options)
+        room.update(msg["entities"])
+        room.last_state = time.monotonic()
+
+        seq = msg["seq"]
+        clock = msg["clock"]  # tick et temps du serveur, recopiés tels quels
+        positions = room.positions
+        doors = {}  # les portes passent par le canal fiable, relayé tel quel
+        for slot, entity_id in msg["bindings"]:
+            client = self.by_slot.get(slot)
+            if client is None:
+                continue
+            if client.room is not room or client.entity_id != entity_id:
+                # Nouvelle salle (ou nouveau client derrière l'emplacement) : snapshot complet
+                client.room = room
+                client.entity_id = entity_id
+                client.snapshots = SnapshotHistory()
+            history = client.snapshots
+            own = positions.get(entity_id)
+            pos = own[0] if own is not None else (0.0, 0.0, 0.0)
+            previous = history.latest()[0]
+            baseline, base_state = history.baseline()
+            candidates = room.interest.visible(entity_id, pos, positions, previous, seq)
+            entities = client.budget.select(
+                entity_id, pos, candidates, positions, previous, base_state[0], doors, base_state[1]
+            )
+            state = (entities, doors)
+            body = protocol.encode_snapshot_body(*state, *base_state)
+            client.writer.queue(protocol.encode_snapshot(seq, baseline, entity_id, body, clock))
+            self._flush(client)
+            history.sent(seq, state)
+            self.snapshots_sent += 1
+
+    def _flush(self, client):
+        if self.transport is None:
+            return
+        for datagram in client.writer.flush():
+            if client.compress:
+                datagram = self.compressor.compress(datagram)
+            self.transport.sendto(datagram, client.addr)
+            self.packets_out += 1
+            self.bytes_out += len(datagram)
+
+    # ------------------------------------------------------------------
+    # TÂCHES PÉRIODIQUES
+    # ------------------------------------------------------------------
+    def expire(self, now=None):
+        """
+        Forget the silent clients and the rooms the server stopped sending.
+
+        Args:
+            now: Current time.monotonic(), looked up if None.
+        """
+        now = time.monotonic() if now is None else now
+        for client in [c for c in self.clients.values() if now - c.last_seen > self.client_timeout]:
+            self._remove_client(client)
+        for name in [n for n, r in self.rooms.items() if now - r.last_state > self.client_timeout]:
+            del self.rooms[name]
+        self.reassembler.expire(now)
+        if self.limiter is not None:
+            self.limiter.sweep(now)
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(1.0)
+            self.expire()
+
+    async def _stats_loop(self):
+        previous = (self.packets_in, self.packets_out, self.states)
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            current = (self.packets_in, self.packets_out, self.states)
+            pps_in, pps_out, states = ((c - p) / self.stats_interval for c, p in zip(current, previous))
+            previous = current
+            print(f"🛰️ {len(self.clients)} clients | {len(self.rooms)} salles | {states:.0f} états/s reçus"
+                  f" | {pps_in:.0f} paquets/s reçus | {pps_out:.0f} paquets/s envoyés")
+            compression = self.compression_stats
+            if compression.packets:
+                print(f"🗜️ compression {compression.ratio():.0%} de la taille"
+                      f" | {compression.cost() * 1e6:.0f} µs/datagramme")
+
+    async def serve(self):
+        """Bind the client socket, connect to the server and relay until cancelled."""
+        loop = asyncio.get_running_loop()
+        upstream, _ = await loop.create_datagram_endpoint(
+            lambda: _UpstreamProtocol(self), local_addr=(self.host, self.upstream_port), remote_addr=self.server_addr
+        )
+        self.upstream = upstream
+        # Client injoignable : pas d'erreur à traiter, il expirera
+        transport = self.transport = DatagramSocket.bind(self.host, self.port, self.handle_datagram)
+        transport.start()
+        tasks = [asyncio.create_task(self._expire_loop())]
+        if self.stats_interval > 0:
+            tasks.append(asyncio.create_task(self._stats_loop()))
+        try:
+            await asyncio.Future()
+        finally:
+            for task in tasks:
+                task.cancel()
+            transport.close()
+            upstream.close()
@@ -0,0 +1,149 @@
+"""
+Reliable ordered channel over UDP for discrete events.
+
+Events such as door changes are numbered, resent until the peer acknowledges
+them and delivered in order. Each message carries the age of its event, so a
+receiver can replay an animation from its real start even after resends.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import time
+
+from . import protocol
+from .protocol import NO_SEQ, SEQ_MOD, seq_newer
+
+RESEND_MIN = 0.1  # secondes minimum avant de renvoyer un message non acquitté
+RESEND_MAX = 1.0
+DEFAULT_RTT = 0.2  # RTT supposé tant qu'aucune mesure n'existe
+MAX_OUT_OF_ORDER = 256  # messages gardés en attente d'un trou dans la séquence
+
+
+class _Pending:
+    """
+    A sent message waiting for its acknowledgement.
+    """
+
+    __slots__ = ("message", "created", "last_sent")
+
+    def __init__(self, message, created):
+        self.message = message
+        self.created = created
+        self.last_sent = None  # jamais envoyé
+
+
+class ReliableChannel:
+    """
+    Both directions of the reliable channel with one peer.
+    """
+
+    def __init__(self):
+        """Initialize the channel."""
+        self.next_seq = 0
+        self.unacked = {}  # { seq: _Pending }, dans l'ordre d'envoi
+        self.received = NO_SEQ  # dernier seq délivré dans l'ordre (ack cumulatif)
+        self.out_of_order = {}  # { seq: (message, instant de l'événement) }
+        self.ack_due = False
+        self.sent = 0
+        self.resends = 0
+
+    # ------------------------------------------------------------------
+    # ÉMISSION
+    # ------------------------------------------------------------------
+    def send(self, message, created=None):
+        """
+        Queue a binary message for reliable delivery.
+
+        Args:
+            message: The encoded message.
+            created: time.monotonic() of the event (now if None).
+        """
+        seq = self.next_seq
+        self.next_seq = (seq + 1) % SEQ_MOD
+        self.unacked[seq] = _Pending(message, time.monotonic() if created is None else created)
+
+    def poll(self, now=None, rtt=None):
+        """
+        Build the packets due now: new messages, resends and the pending ack.
+
+        Args:
+            now: Current time.monotonic(), looked up if None.
+            rtt: Measured round-trip time of the peer in seconds, if known.
+
+        Returns:
+            list: The packets to send.
+        """
+        now = time.monotonic() if now is None else now
+        timeout = min(max(2.0 * (rtt or DEFAULT_RTT), RESEND_MIN), RESEND_MAX)
+        packets = []
+        if self.ack_due:
+            packets.append(protocol.encode_ack(self.received))
+            self.ack_due = False
+        for seq, pending in self.unacked.items():
+            if pending.last_sent is None:
+                self.sent += 1
+            elif now - pending.last_sent >= timeout:
+                self.resends += 1
+            else:
+                continue
+            pending.last_sent = now
+            packets.append(protocol.encode_reliable(seq, (now - pending.created) * 1000, pending.message))
+        return packets
+
+    def on_ack(self, ack):
+        """
+        Drop the messages acknowledged by the peer.
+
+        Args:
+            ack: The last seq the peer received in order.
+        """
+        if ack == NO_SEQ:
+            return
+        for seq in list(self.unacked):
+            if seq_newer(seq, ack):
+                break
+            del self.unacked[seq]
+
+    # ------------------------------------------------------------------
+    # RÉCEPTION
+    # ------------------------------------------------------------------
+    def receive(self, seq, age, message, now=None):
+        """
+        Accept a reliable message and deliver the ones now in order.
+
+        Args:
+            seq: Sequence number of the message.
+            age: Seconds elapsed since the event when it was sent.
+            message: The wrapped binary message.
+            now: Current time.monotonic(), looked up if None.
+
+        Returns:
+            list: (message, seconds elapsed since the event) pairs, in order;
+            empty for duplicates and for messages waiting for a gap.
+        """
+        now = time.monotonic() if now is None else now
+        self.ack_due = True  # les doublons sont réacquittés : l'ack a pu se perdre
+        expected = 0 if self.received == NO_SEQ else (self.received + 1) % SEQ_MOD
+        if seq != expected:
+            if self.received != NO_SEQ and not seq_newer(seq, self.received):
+                return []  # doublon déjà délivré
+            if len(self.out_of_order) < MAX_OUT_OF_ORDER:
+                self.out_of_order.setdefault(seq, (message, now - age))
+            return []
+
+        delivered = [(message, age)]
+        self.received = seq
+        while True:
+            expected = (self.received + 1) % SEQ_MOD
+            waiting = self.out_of_order.pop(expected, None)
+            if waiting is None:
+                break
+            delivered.append((waiting[0], now - waiting[1]))
+            self.received = expected
+        return delivered
+
+    @property
+    def in_flight(self):
+        """int: Number of messages sent and not yet acknowledged."""
+        return len(self.unacked)
@@ -0,0 +1,384 @@
+"""
+Game room: one isolated match inside the server process.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import json
+
+from . import protocol
+from .interest import InterestManager
+from .history import PositionHistory
+from .snapshot import EMPTY_STATE
+
+DOOR_REACH = 2.0  # mètres ; le client ouvre à 1 m, marge pour l'interpolation et la quantification
+
+
+class TickStats:
+    """
+    Duration and overrun metrics of the fixed-rate tick loop.
+    """
+
+    def __init__(self, tick_rate):
+        """
+        Initialize the metrics.
+
+        Args:
+            tick_rate: The target tick rate in Hz.
+        """
+        self.interval = 1.0 / tick_rate
+        self.ticks = 0
+        self.overruns = 0  # ticks plus longues que leur créneau
+        self.skipped = 0  # créneaux sautés pour rattraper le retard
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def record(self, duration):
+        """
+        Record the duration of one tick.
+
+        Args:
+            duration: The tick duration in seconds.
+        """
+        self.ticks += 1
+        self.last_duration = duration
+        self.total_duration += duration
+        if duration > self.max_duration:
+            self.max_duration = duration
+        if duration > self.interval:
+            self.overruns += 1
+
+    @property
+    def mean_duration(self):
+        """float: Mean tick duration in seconds."""
+        return self.total_duration / self.ticks if self.ticks else 0.0
+
+
+class Room:
+    """
+    Player table, door states, enemies, tick loop and broadcast set of one match.
+    """
+
+    def __init__(self, server, name, tick_rate=30, interest_options=None, door_positions=None, enemies=None):
+        """
+        Initialize the room.
+
+        Args:
+            server: The GameServer sending the room's packets.
+            name: The room name.
+            tick_rate: Snapshots sent per second to every member (e.g. 20, 30 or 60).
+            interest_options: Keyword arguments for the room's InterestManager.
+            door_positions: Dict {door_id: (x, y, z)} used to check that a player
+                was close enough to a door it toggles (None: not checked).
+            enemies: The EnemySimulation of the room's enemies, already
+                spawned (None: no server-side enemies).
+        """
+        self.server = server
+        self.name = name
+        self.tick_rate = tick_rate
+        self.members = {}  # { entity_id: Client }
+        self.door_states = {}  # { door_id: True/False }
+        self.door_changed = {}  # { door_id: instant du dernier changement, horloge du serveur }
+        self.interest = InterestManager(**(interest_options or {}))
+        self.door_positions = door_positions or {}
+        self.snapshot_seq = 0
+        self.tick_count = 0  # numéro de tick non borné, snapshot_seq en est le reste modulo SEQ_MOD
+        self.history = PositionHistory()
+        self.tick_stats = TickStats(tick_rate)
+        self.enemies = enemies
+        self._task = None
+        if enemies is not None:
+            self._place_enemies()
+
+    # ------------------------------------------------------------------
+    # MEMBRES
+    # ------------------------------------------------------------------
+    def add(self, client):
+        """
+        Add a client to the room.
+
+        Args:
+            client: The Client joining the room.
+        """
+        self.members[client.entity_id] = client
+        client.room = self
+        client.budget.set_rate(client.budget.bytes_per_second, self.tick_rate)
+        self.interest.grid.update(client.entity_id, client.x, client.y)
+        self.history.update(client.entity_id, client.x, client.y, client.z)
+        if client.binary:
+            # Les portes ne sont plus dans les snapshots : état initial par le canal fiable
+            for door_id, state in self.door_states.items():
+                client.reliable.send(protocol.encode_door(protocol.MSG_DOOR_SYNC, door_id, state),
+                                     self.door_changed[door_id])
+            if self.enemies is not None:
+                now = self.server.clock()
+                for enemy in self.enemies.enemies:
+                    client.reliable.send(protocol.encode_entity_kind(enemy.entity_id, protocol.KIND_ENEMY), now)
+
+    def remove(self, client):
+        """
+        Remove a client from the room.
+
+        Args:
+            client: The Client leaving the room.
+        """
+        if self.members.pop(client.entity_id, None) is not None:
+            self.interest.grid.remove(client.entity_id)
+            self.history.remove(client.entity_id)
+
+    def moved(self, client):
+        """
+        Reindex a client after a position update.
+
+        Args:
+            client: The Client that moved.
+        """
+        self.interest.grid.update(client.entity_id, client.x, client.y)
+        self.history.update(client.entity_id, client.x, client.y, client.z)
+
+    def seen_tick(self, client, age=0.0):
+        """
+        Estimate the tick a client was looking at when it acted.
+
+        Args:
+            client: The Client that acted.
+            age: Seconds between the action and its reception.
+
+        Returns:
+            int: The tick of the last snapshot the client acknowledged, moved
+            back by the age of the action.
+        """
+        latest = self.tick_count - 1
+        acked = client.snapshots.acked
+        if client.binary and acked != protocol.NO_SEQ:
+            latest -= (self.snapshot_seq - 1 - acked) % protocol.SEQ_MOD
+        return latest - round(age * self.tick_rate)
+
+    def can_reach_door(self, client, door_id, age=0.0):
+        """
+        Check that a client was next to a door when it toggled it, using its
+        position at the tick it saw (lag compensation).
+
+        Args:
+            client: The Client toggling the door.
+            door_id: The door id.
+            age: Seconds between the toggle and its reception.
+
+        Returns:
+            bool: False if the door position is known and the client was out of reach.
+        """
+        door = self.door_positions.get(door_id)
+        if door is None:
+            return True
+        pos = self.history.at(self.seen_tick(client, age), client.entity_id)
+        if pos is None:
+            pos = (client.x, client.y, client.z)
+        dx, dy, dz = pos[0] - door[0], pos[1] - door[1], pos[2] - door[2]
+        return dx * dx + dy * dy + dz * dz <= DOOR_REACH * DOOR_REACH
+
+    # ------------------------------------------------------------------
+    # ÉVÉNEMENTS
+    # ------------------------------------------------------------------
+    def set_door(self, door_id, state):
+        """
+        Change a door state and broadcast it to the room.
+
+        Args:
+            door_id: The door id.
+            state: True for open, False for closed.
+        """
+        # Encodé avant d'être stocké : une porte non encodable casserait chaque arrivée (voir add)
+        binary_packet = protocol.encode_door(protocol.MSG_DOOR_SYNC, door_id, state)
+        now = self.server.clock()
+        self.door_states[door_id] = state
+        self.door_changed[door_id] = now
+
+        packet = json.dumps({
+            "type": "door_sync",
+            "door_id": door_id,
+            "state": state
+        }).encode()
+        self.broadcast(packet, binary_packet, now)
+
+    def broadcast(self, packet, binary_packet, created=None):
+        """
+        Send an event to every member, in the format each one speaks.
+
+        Binary members get it on their reliable channel, sent with the next
+        snapshot and resent until acknowledged; legacy JSON members get it
+        right away, once.
+
+        Args:
+            packet: The legacy JSON encoding of the event.
+            binary_packet: The binary encoding of the event.
+            created: Server clock time of the event (now if None).
+        """
+        sendto = self.server.sendto
+        if created is None:
+            created = self.server.clock()
+        for client in self.members.values():
+            if client.binary:
+                client.reliable.send(binary_packet, created)
+            else:
+                sendto(packet, client.addr)
+
+    # ------------------------------------------------------------------
+    # ENNEMIS
+    # ------------------------------------------------------------------
+    def _place_enemies(self):
+        """Index the enemies' current positions in the grid and the history."""
+        quantize = self.server.quantizer.quantize
+        grid = self.interest.grid
+        history = self.history
+        for enemy in self.enemies.enemies:
+            enemy.qpos = quantize(enemy.x, enemy.y, enemy.z)
+            grid.update(enemy.entity_id, enemy.x, enemy.y)
+            history.update(enemy.entity_id, enemy.x, enemy.y, enemy.z)
+
+    def _step_enemies(self, now):
+        """
+        Advance the enemies by one tick, chasing the room's players.
+
+        Args:
+            now: Current server clock time.
+        """
+        players = [(c.x, c.y, c.z) for c in self.members.values()]
+        self.enemies.step(self.tick_stats.interval, now, players)
+        self._place_enemies()
+
+    # ------------------------------------------------------------------
+    # SNAPSHOTS
+    # ------------------------------------------------------------------
+    def _players_packet(self):
+        """
+        Build the legacy JSON players list packet, including door states.
+
+        Returns:
+            bytes: The encoded packet.
+        """
+        others = [{
+            "id": ":".join(map(str, client.addr)),
+            "player": client.player,
+            "model": client.model,
+            "x": client.x,
+            "y": client.y,
+            "z": client.z
+        } for client in self.members.values()]
+
+        return json.dumps({
+            "type": "players",
+            "players": others,
+            "doors": self.door_states
+        }).encode()
+
+    def tick(self):
+        """
+        Move the enemies, then send one snapshot of the latest positions to
+        every member.
+
+        Binary clients only get the entities in their area of interest, as a
+        delta against the last snapshot they acknowledged, so idle players and
+        distant players cost nothing; enemies are entities like the players
+        (legacy JSON clients only get the players). Every snapshot carries
+        the tick number and the server time it was built at. The entities that do not
+        fit in the client's byte budget wait for a later tick. Doors are not
+        part of their snapshots: door events go through the reliable channel,
+        whose pending messages and acks are sent along with the snapshot.
+
+        Clients behind a relay get no snapshot from here: each relay receives
+        the full state of the room once and builds its clients' snapshots.
+        """
+        if not self.members:
+            return
+
+        now = self.server.clock()
+        if self.enemies is not None:
+            self._step_enemies(now)
+        seq = self.snapshot_seq
+        self.snapshot_seq = (seq + 1) % protocol.SEQ_MOD
+        clock = protocol.encode_server_clock(self.tick_count, self.server.server_time(now))
+        self.history.record(self.tick_count)
+        self.tick_count += 1
+        positions = {c.entity_id: ((c.x, c.y, c.z), c.qpos) for c in self.members.values()}
+        if self.enemies is not None:
+            for enemy in self.enemies.enemies:
+                positions[enemy.entity_id] = ((enemy.x, enemy.y, enemy.z), enemy.qpos)
+        doors = {}  # les portes passent par le canal fiable
+        sendto = self.server.sendto
+        flush = self.server.flush
+
+        legacy_packet = None
+        bindings = {}  # { adresse du relais: [(emplacement, id d'entité)] }
+        for client in self.members.values():
+            if client.relay is not None:
+                relay_writer = self.server.relays[client.relay].writer
+                for packet in client.reliable.poll(now, client.link.rtt or None):
+                    relay_writer.queue(protocol.encode_relayed(client.slot, packet))
+                bindings.setdefault(client.relay, []).append((client.slot, client.entity_id))
+                # Le relais numérote ses snapshots comme nous : seul l'instant d'envoi sert, au RTT
+                client.snapshots.sent(seq, EMPTY_STATE, now)
+            elif client.binary:
+                history = client.snapshots
+                pos = (client.x, client.y, client.z)
+                previous = history.latest()[0]
+                baseline, base_state = history.baseline()
+                candidates = self.interest.visible(client.entity_id, pos, positions, previous, seq)
+                entities = client.budget.select(
+                    client.entity_id, pos, candidates, positions, previous, base_state[0], doors, base_state[1]
+                )
+                state = (entities, doors)
+                body = protocol.encode_snapshot_body(*state, *base_state)
+                writer = client.writer
+                writer.queue(protocol.encode_snapshot(seq, baseline, client.entity_id, body, clock))
+                for packet in client.reliable.poll(now, client.link.rtt or None):
+                    writer.queue(packet)
+                flush(client)
+                history.sent(seq, state, now)
+            else:
+                if legacy_packet is None:
+                    legacy_packet = self._players_packet()
+                sendto(legacy_packet, client.addr)
+
+        if bindings:
+            entities = protocol.encode_state_entities({eid: q for eid, (_, q) in positions.items()})
+            for relay, relayed in bindings.items():
+                self.server.relays[relay].writer.queue(protocol.encode_state(self.name, seq, clock, entities, relayed))
+                self.server.flush_relay(relay)
+
+    async def _tick_loop(self):
+        """
+        Run tick() at a fixed rate. Deadlines are absolute so the rate does not
+        drift; when a tick overruns, the missed slots are skipped instead of
+        being replayed in a burst.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.tick_stats.interval
+        next_tick = loop.time()
+        while True:
+            start = loop.time()
+            self.tick()
+            duration = loop.time() - start
+            self.tick_stats.record(duration)
+            self.server.metrics.tick_duration.observe(duration)
+
+            next_tick += interval
+            now = loop.time()
+            if now > next_tick:
+                missed = int((now - next_tick) / interval) + 1
+                self.tick_stats.skipped += missed
+                next_tick += missed * interval
+            await asyncio.sleep(next_tick - now)
+
+    def start(self):
+        """Start the room's tick loop on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._tick_loop())
+
+    def close(self):
+        """Stop the room's tick loop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
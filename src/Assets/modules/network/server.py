@@ -0,0 +1,813 @@
+"""
+Asyncio UDP game server engine.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import math
+import random
+import struct
+import time
+import zlib
+
+from . import protocol
+from .snapshot import SnapshotHistory
+from .bandwidth import BandwidthBudget, DEFAULT_BUDGET
+from .room import Room
+from .registry import ClientRegistry
+from .transport import FramingStats, PacketWriter, Reassembler, DatagramSocket
+from .reliable import ReliableChannel
+from .metrics import ServerMetrics, LinkStats, METRICS_DUMP_INTERVAL, start_http
+from .recorder import PacketRecorder, DIRECTION_IN, DIRECTION_OUT
+from .ratelimit import RateLimiter, DEFAULT_RATE, DEFAULT_BURST
+from .compression import PacketCompressor, CompressionStats, COMPRESS_THRESHOLD
+from .movement import MoveCheck
+from ..pathfinding.headless import NavGraph, PathfinderPool, EnemySimulation
+
+MAX_RELAY_CLIENTS = 1024  # clients servis au plus par un relais (ids d'entité et emplacements)
+
+
+class Client:
+    """
+    State kept by the server for one connected client.
+    """
+
+    __slots__ = (
+        "addr", "entity_id", "binary", "player", "model", "room",
+        "x", "y", "z", "qpos", "snapshots", "budget", "writer", "reliable", "link", "last_seen",
+        "relay", "slot", "token", "compress", "movement",
+    )
+
+    def __init__(self, addr, entity_id, binary, budget, writer, now, relay=None, token=0):
+        """
+        Initialize a client record.
+
+        Args:
+            addr: The (ip, port) address of the client.
+            entity_id: Small integer id used on the binary protocol.
+            binary: True if the client speaks the binary protocol, False for legacy JSON.
+            budget: The BandwidthBudget limiting the client's snapshots.
+            writer: The PacketWriter coalescing the client's binary messages.
+            now: Current time on the server clock, the client's first last_seen.
+            relay: Address of the relay the client is connected to, or None
+                for a direct client. A relayed client's addr is
+                (relay ip, relay port, slot on the relay).
+            token: Session token of a binary client, 0 for a legacy JSON client.
+        """
+        self.addr = addr
+        self.entity_id = entity_id
+        self.binary = binary
+        self.player = "Player"
+        self.model = "default"
+        self.room = None  # Room dont le client est membre
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+        self.qpos = (0, 0, 0)  # position quantifiée, calculée à la réception
+        self.snapshots = SnapshotHistory()  # baselines pour les snapshots delta
+        self.budget = budget
+        self.writer = writer
+        self.reliable = ReliableChannel()  # événements discrets (portes, retraits)
+        self.link = LinkStats()  # RTT et pertes, mesurés sur les acquittements
+        self.last_seen = now
+        self.relay = relay
+        self.slot = addr[2] if relay is not None else None
+        self.token = token
+        self.compress = False  # datagrammes compressés, négocié au connect
+        self.movement = MoveCheck()  # vitesse et commandes du joueur, vérifiées par le serveur
+
+
+class RelayLink:
+    """
+    Server side of one relay: its writer and the clients it serves.
+    """
+
+    def __init__(self, writer):
+        """
+        Initialize the link.
+
+        Args:
+            writer: The PacketWriter coalescing the relay's messages.
+        """
+        self.writer = writer
+        self.clients = set()  # adresses virtuelles (ip, port, emplacement)
+
+
+class ServerStats:
+    """
+    Packet counters with a sustained packets/second rate.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.packets_in = 0
+        self.packets_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._window_start = time.monotonic()
+        self._window_in = 0
+        self._window_out = 0
+
+    def rates(self):
+        """
+        Compute the packet rates since the last call and start a new window.
+
+        Returns:
+            tuple: (packets in per second, packets out per second).
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-6)
+        pps_in = (self.packets_in - self._window_in) / elapsed
+        pps_out = (self.packets_out - self._window_out) / elapsed
+        self._window_start = now
+        self._window_in = self.packets_in
+        self._window_out = self.packets_out
+        return pps_in, pps_out
+
+
+class GameServer:
+    """
+    Single-threaded UDP server: every receive, timeout and broadcast runs on
+    the asyncio event loop, so the client table is never shared between threads.
+
+    Clients are spread over isolated rooms (one match each) that share the
+    socket; a room is created by its first join and freed when it empties.
+    """
+
+    def __init__(self, host="0.0.0.0", port=9999, tick_rate=30, client_timeout=10.0,
+                 expire_interval=1.0, stats_interval=10.0, bounds=protocol.DEFAULT_BOUNDS,
+                 interest_options=None, client_budget=DEFAULT_BUDGET, metrics_host="127.0.0.1",
+                 metrics_port=None, metrics_file=None, record_path=None, clock=time.monotonic,
+                 manual_tick=False, door_positions=None, rate_limit=DEFAULT_RATE, rate_burst=DEFAULT_BURST,
+                 pfs_path=None, enemy_count=0, ai_workers=None, session_seed=None, dictionary=None,
+                 compress_threshold=COMPRESS_THRESHOLD, relays=(), relay_clients=MAX_RELAY_CLIENTS):
+        """
+        Initialize the server.
+
+        Args:
+            host: Address to bind.
+            port: UDP port to bind.
+            tick_rate: Default snapshots per second of a room (e.g. 20, 30 or 60).
+            client_timeout: Seconds without packets before a client is removed.
+            expire_interval: Seconds between two inactive client sweeps.
+            stats_interval: Seconds between two packets/second reports (0 disables).
+            bounds: Level bounds used to quantize positions on the binary protocol.
+            interest_options: Keyword arguments for the InterestManager of each room.
+            client_budget: Snapshot bytes/second allowed for each client.
+            metrics_host: Address of the metrics HTTP endpoint.
+            metrics_port: TCP port of the metrics HTTP endpoint (None disables).
+            metrics_file: File the metrics are regularly dumped to (None disables).
+            record_path: Log file every received and sent datagram is appended
+                to, for replay.py (None disables).
+            clock: Time source of the game logic; the replay tool passes a
+                virtual clock to run a log faster than real time.
+            manual_tick: If True, rooms do not start their tick loop and the
+                caller runs Room.tick() itself.
+            door_positions: Dict {door_id: (x, y, z)} of the level's doors, to
+                reject toggles from players who were out of reach.
+            rate_limit: Packets/second accepted from one address (0 disables).
+            rate_burst: Packets accepted in a row from one address.
+            pfs_path: The level's .pfs navgraph, needed for server-side enemies.
+            enemy_count: Enemies simulated in every room (0 disables).
+            ai_workers: Processes computing the enemies' paths (os.cpu_count()
+                if None, 0 computes them inline in the tick); with manual_tick,
+                paths are also computed inline so a replay stays deterministic.
+            session_seed: Seed of the session tokens, so a replay draws the
+                same ones (None: unpredictable tokens).
+            dictionary: Preset dictionary compressing the datagrams of the
+                clients that have the same one (None disables compression).
+            compress_threshold: Size in bytes from which a datagram is compressed.
+            relays: (ip, port) addresses of the relays allowed to serve
+                clients; relayed packets from any other address are dropped.
+            relay_clients: Clients one relay may serve at once.
+        """
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.client_timeout = client_timeout
+        self.expire_interval = expire_interval
+        self.stats_interval = stats_interval
+        self.client_budget = client_budget
+        self.interest_options = interest_options or {}
+        self.metrics_host = metrics_host
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        self.clock = clock
+        self.started = clock()  # origine du temps serveur envoyé aux clients
+        self.manual_tick = manual_tick
+        self.door_positions = door_positions
+
+        rng = random.Random(session_seed) if session_seed is not None else None
+        self.clients = ClientRegistry(client_timeout, expire_interval, rng)  # toutes salles confondues
+        self.rooms = {}  # { nom: Room }
+        self.quantizer = protocol.Quantizer(bounds)
+        self.stats = ServerStats()
+        self.framing_stats = FramingStats()
+        self.reassembler = Reassembler(self.framing_stats)
+        self.metrics = ServerMetrics()
+        self.recorder = PacketRecorder(record_path) if record_path else None
+        self.limiter = RateLimiter(rate_limit, rate_burst) if rate_limit else None
+        self._retired_ticks = {"ticks": 0, "overruns": 0, "skipped": 0}  # salles libérées
+        self.pfs_path = pfs_path
+        self.enemy_count = enemy_count if pfs_path else 0
+        self.ai_workers = ai_workers
+        self.navgraph = NavGraph(pfs_path) if self.enemy_count else None
+        self.pathfinder = None  # PathfinderPool, démarré par serve()
+        self.trusted_relays = frozenset(relays)  # seules adresses exemptées de la limite par adresse
+        self.relay_clients = relay_clients
+        self.relays = {}  # { adresse du relais: RelayLink }
+        self.compression_stats = CompressionStats()
+        self.compressor = (PacketCompressor(dictionary, compress_threshold, stats=self.compression_stats)
+                           if dictionary else None)
+        self.moves_clamped = 0  # déplacements de joueurs plus rapides que permis
+        self.corrections_sent = 0
+        self.transport = None
+
+    # ------------------------------------------------------------------
+    # RÉCEPTION
+    # ------------------------------------------------------------------
+    def handle_datagram(self, data, addr):
+        """
+        Unpack one received datagram and dispatch every message it carries.
+
+        Packets over the sender's rate limit are dropped here, before any
+        decoding. Trusted relays are limited per client instead, once
+        unwrapped; any other address claiming to be a relay is limited like
+        a client and its relayed packets are dropped.
+
+        Args:
+            data: The raw datagram, possibly a memoryview of the receive
+                buffer, only valid during the call.
+            addr: The sender address.
+        """
+        self.stats.packets_in += 1
+        self.stats.bytes_in += len(data)
+        if self.recorder is not None:
+            self.recorder.record(DIRECTION_IN, addr, data)
+        if (self.limiter is not None and addr not in self.trusted_relays
+                and not self.limiter.allow(addr, len(data), self.clock())):
+            return
+        for message in self.reassembler.feed(data, addr):
+            self._dispatch(message, addr)
+
+    def _dispatch(self, data, addr, relay=None):
+        if relay is not None and not protocol.is_binary(data):
+            return  # les relais ne servent que des clients binaires
+        try:
+            msg = protocol.decode(data, self.quantizer)
+        except protocol.ProtocolError:
+            print("⚠️ Paquet non valide reçu.")
+            return
+
+        msg_type = msg.get("type")
+        self.metrics.count_in(msg_type, len(data))
+        try:
+            if msg_type == "door_toggle":
+                self._on_door_toggle(msg, addr)
+            elif msg_type == "input" and protocol.is_binary(data):
+                self._on_input(msg, addr, relay)  # commandes numérotées : clients binaires seulement
+            elif msg_type == "pos":
+                self._on_pos(msg, addr, protocol.is_binary(data), relay)
+            elif msg_type == "remove_player":
+                self._on_remove_player(msg, addr)
+            elif msg_type == "join":
+                self._on_join(msg, addr, protocol.is_binary(data), relay)
+            elif msg_type == "connect":
+                self._on_connect(msg, addr, relay)
+            elif msg_type == "ping":
+                self._on_ping(msg, addr, relay)
+            elif msg_type == "reliable":
+                self._on_reliable(msg, addr)
+            elif msg_type == "ack":
+                self._on_reliable_ack(msg, addr)
+            elif msg_type == "relayed" and relay is None:
+                self._on_relayed(msg, addr)
+        except (KeyError, TypeError, ValueError, OverflowError, struct.error) as e:
+            print("Erreur réception:", e)
+
+    def handle_error(self, exc):
+        """
+        Handle a socket error reported by the transport.
+
+        Args:
+            exc: The OSError raised by the socket.
+        """
+        # Sous Windows, un ICMP "port unreachable" remonte en WSAECONNRESET (10054)
+        # sans adresse : le client fautif sera retiré par le timeout.
+        if getattr(exc, "winerror", None) == 10054 or isinstance(exc, ConnectionResetError):
+            return
+        print("Erreur socket:", exc)
+
+    def _on_door_toggle(self, msg, addr, age=0.0):
+        client = self.clients.get(addr)
+        if client is None:
+            return  # un client inconnu n'appartient à aucune salle
+        room = client.room
+        door_id = int(msg["door_id"])
+        if not 0 <= door_id <= 0xFFFF:
+            return  # hors du format binaire des portes : jamais stocké ni diffusé
+        if not room.can_reach_door(client, door_id, age):
+            print(f"🚫 Porte {door_id} hors de portée de {client.player}, refusée.")
+            if client.binary:
+                # Le client a déjà animé sa porte : on lui renvoie l'état réel
+                state = room.door_states.get(door_id, False)
+                client.reliable.send(protocol.encode_door(protocol.MSG_DOOR_SYNC, door_id, state),
+                                     room.door_changed.get(door_id))
+            return
+        room.set_door(door_id, bool(msg["state"]))
+
+    def _on_reliable(self, msg, addr):
+        client = self.clients.get(addr)
+        if client is None:
+            return  # pas d'ack : le client renverra une fois enregistré
+        for message, age in client.reliable.receive(msg["seq"], msg["age"], msg["message"], self.clock()):
+            try:
+                event = protocol.decode(message, self.quantizer)
+            except protocol.ProtocolError:
+                continue  # déjà acquitté : ne pas le redemander
+            event_type = event["type"]
+            if event_type == "door_toggle":
+                self._on_door_toggle(event, addr, age)
+            elif event_type == "remove_player":
+                self._on_remove_player(event, addr)
+            if addr not in self.clients:
+                break  # le client s'est retiré lui-même
+
+    def _on_reliable_ack(self, msg, addr):
+        client = self.clients.get(addr)
+        if client is not None:
+            client.reliable.on_ack(msg["ack"])
+
+    def _on_relayed(self, msg, relay):
+        if relay not in self.trusted_relays:
+            return  # relais non autorisé : un client ne doit pas pouvoir ouvrir des emplacements
+        addr = (relay[0], relay[1], msg["slot"])
+        if addr not in self.clients:
+            link = self.relays.get(relay)
+            if link is not None and len(link.clients) >= self.relay_clients:
+                return  # relais plein : pas de nouveau client
+        message = msg["message"]
+        if self.limiter is not None and not self.limiter.allow(addr, len(message), self.clock()):
+            return
+        self._dispatch(message, addr, relay)
+
+    def _on_pos(self, msg, addr, binary, relay=None):
+        if not all(math.isfinite(float(msg[axis])) for axis in ("x", "y", "z")):
+            return  # Infinity / NaN (JSON) : non quantifiable
+        client = self.clients.get(addr)
+        if client is None:
+            if binary:
+                self.send_message(protocol.encode_reconnect(), addr, relay)
+                return
+            client = self.add_client(addr, binary, protocol.DEFAULT_ROOM)
+        if binary:
+            self._move(client, msg, None, protocol.NO_SEQ)
+        else:
+            # Client JSON : sans correction possible, sa position est reprise telle quelle
+            client.x = float(msg["x"])
+            client.y = float(msg["y"])
+            client.z = float(msg["z"])
+            client.qpos = self.quantizer.quantize(client.x, client.y, client.z)
+            client.room.moved(client)
+        if "player" in msg:
+            self.clients.rename(client, str(msg["player"]))  # JSON : n'importe quel type
+        if "model" in msg:
+            client.model = str(msg["model"])
+        if binary:
+            self._on_ack(client, msg["ack"])
+        client.last_seen = self.clock()
+
+    def _on_input(self, msg, addr, relay=None):
+        client = self.clients.get(addr)
+        if client is None:
+            self.send_message(protocol.encode_reconnect(), addr, relay)
+            return
+        self._move(client, msg, msg["dt"], msg["seq"])
+        self._on_ack(client, msg["ack"])
+        client.last_seen = self.clock()
+
+    def _move(self, client, msg, dt, seq):
+        now = self.clock()
+        moved = client.movement.apply((client.x, client.y, client.z), (msg["x"], msg["y"], msg["z"]), now, dt, seq)
+        if moved is None:
+            return
+        (client.x, client.y, client.z), clamped = moved
+        client.qpos = self.quantizer.quantize(client.x, client.y, client.z)
+        client.room.moved(client)
+        if not clamped:
+            return
+        self.moves_clamped += 1
+        if client.movement.correction_due(now):
+            self.corrections_sent += 1
+            self.send_message(protocol.encode_correction(seq, client.qpos), client.addr, client.relay)
+
+    def _on_ack(self, client, seq):
+        history = client.snapshots
+        previous = history.acked
+        sent_at = history.ack(seq)
+        if sent_at is None:
+            return
+        # Le client acquitte à chaque envoi de position, plus souvent qu'une
+        # tick : un numéro sauté entre deux acquittements est un snapshot perdu.
+        gap = (seq - previous) % protocol.SEQ_MOD - 1 if previous != protocol.NO_SEQ else 0
+        client.link.on_ack(self.clock() - sent_at, gap)
+
+    def _on_join(self, msg, addr, binary, relay=None):
+        room_name = str(msg.get("room", protocol.DEFAULT_ROOM))
+        client = self.clients.get(addr)
+        if client is None:
+            if binary:
+                self.send_message(protocol.encode_reconnect(), addr, relay)
+                return
+            client = self.add_client(addr, binary, room_name)
+        else:
+            self._switch_room(client, room_name)
+        client.last_seen = self.clock()
+
+    def _on_connect(self, msg, addr, relay=None):
+        # Convertis avant toute inscription : un connect JSON peut porter n'importe quel type
+        player = str(msg["player"])
+        room_name = str(msg["room"])
+        client = self.clients.by_session(msg["token"])
+        if client is None:
+            client = self.clients.get(addr)  # connect répété avant d'avoir reçu l'accept
+        if client is None:
+            client = self.add_client(addr, True, room_name, relay)
+            print(f"🔌 Session ouverte pour {player} (id {client.entity_id}).")
+        else:
+            if client.addr != addr:
+                self._rebind(client, addr, relay)
+                print(f"🔁 Session de {client.player} reprise depuis une nouvelle adresse.")
+            self._switch_room(client, room_name)
+        self.clients.rename(client, player)
+        client.last_seen = self.clock()
+        # Compression seulement si le client a le même dictionnaire que nous
+        compressor = self.compressor
+        dictionary = compressor.dictionary_id if compressor is not None and msg["dictionary"] == compressor.dictionary_id else 0
+        client.compress = bool(dictionary)
+        self.send_message(protocol.encode_accept(client.token, client.entity_id, dictionary), client.addr, client.relay)
+
+    def _on_ping(self, msg, addr, relay=None):
+        client = self.clients.get(addr)
+        if client is None:
+            return  # pas de réponse plus grosse que la requête à une adresse inconnue
+        client.last_seen = self.clock()
+        # Réponse immédiate, hors tick : son délai fausserait le RTT mesuré par le client
+        self.send_message(protocol.encode_pong(msg["time"], self.server_time()), addr, relay)
+
+    def _on_remove_player(self, msg, addr):
+        client = self.clients.get(addr)
+        if client is None:
+            return
+        if "id" in msg:
+            targets = [self.clients.by_entity(msg["id"])]
+        else:
+            targets = self.clients.named(msg.get("player"))  # protocole JSON : par nom
+        for member in targets:
+            if member is not None and member.room is client.room:
+                self.remove_client(member.addr)
+                print(f"❌ Joueur {member.player} supprimé à la demande.")
+
+    # ------------------------------------------------------------------
+    # CLIENTS ET SALLES
+    # ------------------------------------------------------------------
+    def server_time(self, now=None):
+        """
+        Time sent to the clients for their clock synchronization.
+
+        Args:
+            now: Current server clock time, looked up if None.
+
+        Returns:
+            float: Seconds since the server started.
+        """
+        return (self.clock() if now is None else now) - self.started
+
+    def _room(self, name):
+        room = self.rooms.get(name)
+        if room is None:
+            room = self.rooms[name] = Room(self, name, self.tick_rate, self.interest_options, self.door_positions,
+                                           self._spawn_enemies(name))
+            if not self.manual_tick:
+                room.start()
+            print(f"🚪 Salle '{name}' créée.")
+        return room
+
+    def _spawn_enemies(self, room_name):
+        if not self.enemy_count:
+            return None
+        # Graine tirée du nom : une salle rejouée retrouve les mêmes ennemis
+        enemies = EnemySimulation(self.navgraph, self.pathfinder, seed=zlib.crc32(room_name.encode("utf-8")))
+        for _ in range(self.enemy_count):
+            enemies.spawn(self.clients.allocate_id())
+        return enemies
+
+    def _switch_room(self, client, room_name):
+        if client.room.name == room_name:
+            return
+        self._leave_room(client)
+        self._room(room_name).add(client)
+        client.snapshots = SnapshotHistory()  # nouvelle salle : snapshot complet
+        client.movement.reset()  # le joueur réapparaît : sa prochaine position est reprise telle quelle
+
+    def _leave_room(self, client):
+        room = client.room
+        room.remove(client)
+        if not room.members:
+            room.close()
+            del self.rooms[room.name]
+            if room.enemies is not None:
+                for enemy in room.enemies.enemies:
+                    self.clients.release_id(enemy.entity_id)
+            for key in self._retired_ticks:
+                self._retired_ticks[key] += getattr(room.tick_stats, key)
+            print(f"🚪 Salle '{room.name}' vide, libérée.")
+
+    def add_client(self, addr, binary, room_name, relay=None):
+        """
+        Register a new client, give it a free entity id and put it in a room.
+
+        Args:
+            addr: The client address.
+            binary: True if the client speaks the binary protocol.
+            room_name: Name of the room to join (created if needed).
+            relay: Address of the relay serving the client, or None.
+
+        Returns:
+            Client: The new client record.
+        """
+        budget = BandwidthBudget(self.client_budget, self.tick_rate)
+        token = self.clients.new_token() if binary else 0
+        client = Client(addr, self.clients.allocate_id(), binary, budget, PacketWriter(self.framing_stats), self.clock(),
+                        relay, token)
+        self._link_relay(client)
+        self.clients.add(client)
+        client.qpos = self.quantizer.quantize(client.x, client.y, client.z)
+        self._room(room_name).add(client)
+        return client
+
+    def remove_client(self, addr):
+        """
+        Forget a client, release its entity id and free its room if it empties.
+
+        Args:
+            addr: The client address.
+        """
+        client = self.clients.remove(addr)
+        if client is not None:
+            self._leave_room(client)
+            self._unlink_relay(client)
+
+    def _rebind(self, client, addr, relay):
+        stale = self.clients.get(addr)
+        if stale is not None:
+            # Adresse réattribuée (NAT) : son ancien client est parti sans le dire
+            print(f"⏱️ Client {stale.player} remplacé à son adresse, supprimé.")
+            self.remove_client(addr)
+        self._unlink_relay(client)
+        self.clients.rebind(client, addr)
+        client.relay = relay
+        client.slot = addr[2] if relay is not None else None
+        self._link_relay(client)
+
+    def _link_relay(self, client):
+        relay = client.relay
+        if relay is None:
+            return
+        link = self.relays.get(relay)
+        if link is None:
+            link = self.relays[relay] = RelayLink(PacketWriter(self.framing_stats))
+            print(f"🛰️ Relais {relay[0]}:{relay[1]} connecté.")
+        link.clients.add(client.addr)
+
+    def _unlink_relay(self, client):
+        relay = client.relay
+        if relay is None:
+            return
+        link = self.relays[relay]
+        link.clients.discard(client.addr)
+        if not link.clients:
+            del self.relays[relay]
+            print(f"🛰️ Relais {relay[0]}:{relay[1]} sans client, oublié.")
+
+    # ------------------------------------------------------------------
+    # ENVOI
+    # ------------------------------------------------------------------
+    def sendto(self, packet, addr):
+        """
+        Send a packet to one address without blocking.
+
+        Args:
+            packet: The bytes to send.
+            addr: The destination address.
+        """
+        if self.transport is None:
+            return
+        self.transport.sendto(packet, addr)
+        if self.recorder is not None:
+            self.recorder.record(DIRECTION_OUT, addr, packet)
+        self.stats.packets_out += 1
+        self.stats.bytes_out += len(packet)
+        self.metrics.count_out(packet)
+
+    def send_message(self, message, addr, relay=None):
+        """
+        Send one binary message right away, outside the tick, e.g. a
+        handshake answer.
+
+        Args:
+            message: The encoded message.
+            addr: The client address.
+            relay: Address of the relay serving the client, or None.
+        """
+        if relay is None:
+            self.sendto(message, addr)
+        elif relay in self.relays:
+            self.relays[relay].writer.queue(protocol.encode_relayed(addr[2], message))
+            self.flush_relay(relay)
+        else:
+            self.sendto(protocol.encode_relayed(addr[2], message), relay)
+
+    def flush(self, client):
+        """
+        Send the binary messages queued for a client, bundled or fragmented
+        to fit the datagram size, and compressed if the client negotiated it.
+
+        Args:
+            client: The Client whose writer is flushed.
+        """
+        if client.compress:
+            compress = self.compressor.compress
+            for datagram in client.writer.flush():
+                self.sendto(compress(datagram), client.addr)
+            return
+        for datagram in client.writer.flush():
+            self.sendto(datagram, client.addr)
+
+    def flush_relay(self, relay):
+        """
+        Send the messages queued for a relay: the room states and the
+        messages of its clients.
+
+        Args:
+            relay: The relay address.
+        """
+        for datagram in self.relays[relay].writer.flush():
+            self.sendto(datagram, relay)
+
+    # ------------------------------------------------------------------
+    # STATISTIQUES
+    # ------------------------------------------------------------------
+    def stats_summary(self):
+        """
+        Snapshot of the server counters, e.g. to aggregate several workers.
+
+        Returns:
+            dict: Client and room counts, packet/byte counters and tick
+            metrics summed over every room.
+        """
+        tick_stats = [room.tick_stats for room in self.rooms.values()]
+        ticks = sum(ts.ticks for ts in tick_stats)
+        return {
+            "clients": len(self.clients),
+            "rooms": len(self.rooms),
+            "packets_in": self.stats.packets_in,
+            "packets_out": self.stats.packets_out,
+            "bytes_in": self.stats.bytes_in,
+            "bytes_out": self.stats.bytes_out,
+            "ticks": ticks + self._retired_ticks["ticks"],
+            "overruns": sum(ts.overruns for ts in tick_stats) + self._retired_ticks["overruns"],
+            "skipped": sum(ts.skipped for ts in tick_stats) + self._retired_ticks["skipped"],
+            "tick_mean": sum(ts.total_duration for ts in tick_stats) / ticks if ticks else 0.0,
+            "tick_max": max((ts.max_duration for ts in tick_stats), default=0.0),
+            "dropped": self.limiter.dropped if self.limiter is not None else 0,
+            "fragmented": self.framing_stats.fragmented,
+            "fragmentation_rate": self.framing_stats.fragmentation_rate(),
+            "coalescing_ratio": self.framing_stats.coalescing_ratio(),
+            "compress_bytes_in": self.compression_stats.bytes_in,
+            "compress_bytes_out": self.compression_stats.bytes_out,
+            "compress_packets": self.compression_stats.packets,
+            "compress_seconds": self.compression_stats.seconds,
+        }
+
+    def budget_report(self):
+        """
+        Describe the bandwidth budget use of every binary client.
+
+        Returns:
+            list: One dict per client (player, room, budget in bytes/tick,
+            bytes used and entities deferred at the last tick, mean usage ratio).
+        """
+        return [{
+            "player": client.player,
+            "entity_id": client.entity_id,
+            "room": client.room.name,
+            "budget": client.budget.bytes_per_tick,
+            "used": client.budget.used,
+            "deferred": client.budget.deferred,
+            "usage": client.budget.usage(),
+        } for client in self.clients.values() if client.binary and client.relay is None]
+
+    # ------------------------------------------------------------------
+    # TÂCHES PÉRIODIQUES
+    # ------------------------------------------------------------------
+    def remove_inactive_clients(self):
+        """
+        Remove the clients silent for more than client_timeout seconds.
+
+        Each call advances the registry's expiry wheel by one slot, so it must
+        run every expire_interval seconds.
+        """
+        for client in self.clients.expired(self.clock()):
+            print(f"⏱️ Client {client.player} inactif, supprimé.")
+            self.remove_client(client.addr)
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(self.expire_interval)
+            try:
+                self.remove_inactive_clients()
+                self.reassembler.expire()
+                if self.limiter is not None:
+                    self.limiter.sweep(self.clock())
+                self.metrics.sample(self.stats)
+                if self.recorder is not None:
+                    self.recorder.flush()
+            except Exception as e:
+                # Une erreur ponctuelle ne doit pas arrêter les timeouts et l'entretien
+                print("Erreur maintenance:", e)
+
+    async def _metrics_dump_loop(self):
+        while True:
+            await asyncio.sleep(METRICS_DUMP_INTERVAL)
+            self.dump_metrics()
+
+    def dump_metrics(self):
+        """Write the metrics to metrics_file, if set."""
+        if self.metrics_file is None:
+            return
+        try:
+            self.metrics.dump(self, self.metrics_file)
+        except OSError as e:
+            print("Erreur écriture métriques:", e)
+
+    async def _stats_loop(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            pps_in, pps_out = self.stats.rates()
+            summary = self.stats_summary()
+            print(f"📊 {len(self.clients)} clients | {len(self.rooms)} salles | {pps_in:.0f} paquets/s reçus"
+                  f" | {pps_out:.0f} paquets/s envoyés")
+            if self.limiter is not None and self.limiter.dropped:
+                worst = ", ".join(f"{a[0]}:{a[1]} ({n})" for a, n in self.limiter.offenders(3))
+                print(f"🛑 {self.limiter.dropped} paquets ignorés (limite {self.limiter.rate:.0f}/s)"
+                      + (f" | pires : {worst}" if worst else ""))
+            print(f"⏲️ tick moy {summary['tick_mean'] * 1000:.2f} ms | max {summary['tick_max'] * 1000:.2f} ms"
+                  f" | {summary['overruns']} dépassements | {summary['skipped']} ticks sautées")
+            report = self.budget_report()
+            if report:
+                usage = [r["usage"] for r in report]
+                deferred = sum(r["deferred"] for r in report)
+                framing = self.framing_stats
+                print(f"📦 {framing.coalescing_ratio():.2f} messages/datagramme | {framing.fragmentation_rate():.1%} fragmentés"
+                      f" | {framing.reassembled} réassemblés | {framing.incomplete} incomplets | {framing.oversized} trop gros")
+                print(f"📶 budget {self.client_budget} o/s | moy {sum(usage) / len(usage):.0%} | max {max(usage):.0%}"
+                      f" | {deferred} entités repoussées")
+            compression = self.compression_stats
+            if compression.packets:
+                print(f"🗜️ compression {compression.ratio():.0%} de la taille | {compression.cost() * 1e6:.0f} µs/datagramme"
+                      f" | {compression.compressed}/{compression.packets} datagrammes réduits")
+
+    async def serve(self):
+        """Bind the socket and run the server until cancelled."""
+        transport = self.transport = DatagramSocket.bind(self.host, self.port, self.handle_datagram, self.handle_error)
+        transport.start()
+        if self.navgraph is not None and not self.manual_tick and self.ai_workers != 0:
+            self.pathfinder = PathfinderPool(self.pfs_path, self.ai_workers)
+            print(f"🤖 {self.enemy_count} ennemis par salle, chemins calculés par {self.pathfinder.workers} processus.")
+        tasks = [asyncio.create_task(self._expire_loop())]
+        if self.stats_interval > 0:
+            tasks.append(asyncio.create_task(self._stats_loop()))
+        if self.metrics_file is not None:
+            tasks.append(asyncio.create_task(self._metrics_dump_loop()))
+        http = None
+        if self.metrics_port is not None:
+            http = await start_http(lambda: self.metrics.render(self), self.metrics_host, self.metrics_port)
+            print(f"📈 Métriques sur http://{self.metrics_host}:{self.metrics_port}/")
+        try:
+            await asyncio.Future()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.dump_metrics()
+            if self.recorder is not None:
+                self.recorder.close()
+            if http is not None:
+                http.close()
+            if self.pathfinder is not None:
+                self.pathfinder.close()
+            for room in self.rooms.values():
+                room.close()
+            transport.close()
@@ -0,0 +1,168 @@
+"""
+Snapshot baselines for delta compression.
+
+The server keeps, for every client, the states it sent that have not been
+acknowledged yet; the client keeps the states it rebuilt. Both sides can then
+express a snapshot as the difference with the last acknowledged one.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import time
+
+from .protocol import NO_SEQ, FIELD_X, FIELD_Y, FIELD_Z, seq_newer
+
+SNAPSHOT_HISTORY = 32  # snapshots gardés en mémoire ; au-delà, on renvoie un snapshot complet
+
+EMPTY_STATE = ({}, {})
+
+
+class SnapshotHistory:
+    """
+    Server side: states sent to one client, indexed by snapshot number.
+    """
+
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        """
+        Initialize the history.
+
+        Args:
+            size: Maximum number of unacknowledged states kept.
+        """
+        self.size = size
+        self.states = {}  # { seq: (entities, doors) }, dans l'ordre d'envoi
+        self.sent_at = {}  # { seq: instant de l'envoi }
+        self.acked = NO_SEQ
+
+    def baseline(self):
+        """
+        Get the state to encode the next snapshot against.
+
+        Returns:
+            tuple: (baseline seq, (entities, doors)). The seq is NO_SEQ, with an
+            empty state, when a full snapshot must be sent (join or loss).
+        """
+        state = self.states.get(self.acked)
+        if state is None:
+            return NO_SEQ, EMPTY_STATE
+        return self.acked, state
+
+    def latest(self):
+        """
+        Get the last state sent to the client.
+
+        Returns:
+            tuple: The (entities, doors) state, or an empty state.
+        """
+        if not self.states:
+            return EMPTY_STATE
+        return self.states[next(reversed(self.states))]
+
+    def sent(self, seq, state, now=None):
+        """
+        Remember a state sent to the client.
+
+        Args:
+            seq: The snapshot number.
+            state: The (entities, doors) tuple; never mutated afterwards.
+            now: Send time on the server clock, time.monotonic() if None.
+        """
+        self.states[seq] = state
+        self.sent_at[seq] = time.monotonic() if now is None else now
+        if len(self.states) > self.size:
+            oldest = next(iter(self.states))
+            del self.states[oldest]
+            del self.sent_at[oldest]
+
+    def ack(self, seq):
+        """
+        Record a client acknowledgement and drop the older states.
+
+        Args:
+            seq: The snapshot number acknowledged by the client.
+
+        Returns:
+            float: The time at which the acknowledged snapshot was
+            sent, or None if the ack is stale, unknown or repeated.
+        """
+        if seq == NO_SEQ or seq not in self.states:
+            return None  # ack trop ancien ou inconnu
+        if self.acked != NO_SEQ and not seq_newer(seq, self.acked):
+            return None
+        self.acked = seq
+        for old in list(self.states):
+            if old == seq:
+                break
+            del self.states[old]
+            del self.sent_at[old]
+        return self.sent_at[seq]
+
+
+class SnapshotReceiver:
+    """
+    Client side: rebuilds full states from delta snapshots.
+    """
+
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        """
+        Initialize the receiver.
+
+        Args:
+            size: Maximum number of rebuilt states kept as possible baselines.
+        """
+        self.size = size
+        self.states = {}  # { seq: (entities, doors) }
+        self.ack = NO_SEQ  # dernier snapshot appliqué, renvoyé au serveur
+
+    def apply(self, msg):
+        """
+        Apply a decoded snapshot message.
+
+        Args:
+            msg: The dict returned by protocol.decode for a snapshot.
+
+        Returns:
+            tuple: The rebuilt (entities, doors) state, or None if the snapshot
+            is stale or its baseline is unknown.
+        """
+        seq = msg["seq"]
+        baseline = msg["baseline"]
+        if baseline != NO_SEQ and self.ack != NO_SEQ and not seq_newer(seq, self.ack):
+            return None  # arrivé dans le désordre
+        # Un snapshot complet est toujours accepté : le serveur repart de zéro
+        # (arrivée ou changement de salle), ses numéros peuvent recommencer.
+
+        if baseline == NO_SEQ:
+            base_entities, base_doors = EMPTY_STATE
+        else:
+            base = self.states.get(baseline)
+            if base is None:
+                return None
+            base_entities, base_doors = base
+
+        entities = dict(base_entities)
+        for entry in msg["changed"]:
+            eid, mask = entry[0], entry[1]
+            if mask == FIELD_X | FIELD_Y | FIELD_Z:
+                entities[eid] = entry[2:]
+                continue
+            values = iter(entry[2:])
+            old = entities.get(eid, (0, 0, 0))
+            entities[eid] = (
+                next(values) if mask & FIELD_X else old[0],
+                next(values) if mask & FIELD_Y else old[1],
+                next(values) if mask & FIELD_Z else old[2],
+            )
+        for eid in msg["removed"]:
+            entities.pop(eid, None)
+
+        doors = dict(base_doors)
+        doors.update(msg["doors"])
+
+        state = (entities, doors)
+        self.states[seq] = state
+        if len(self.states) > self.size:
+            del self.states[next(iter(self.states))]
+        self.ack = seq
+        return state
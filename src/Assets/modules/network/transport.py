@@ -0,0 +1,363 @@
+"""
+Datagram framing: coalescing of small messages and MTU-safe fragmentation.
+
+A PacketWriter packs the binary messages queued for one peer into as few
+datagrams as possible, each under the MTU; a message larger than the MTU is
+split into fragments. A Reassembler does the opposite on reception and drops
+the messages whose fragments did not all arrive in time.
+
+A DatagramSocket reads every datagram into the same preallocated buffer and
+hands it out as a memoryview, instead of one new bytes object per datagram;
+the Reassembler and the decoder work on the view and only copy what they keep.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import asyncio
+import math
+import socket
+import struct
+import time
+
+from . import protocol
+
+MAX_DATAGRAM = 1200  # sous le MTU courant (1500) moins IP/UDP et tunnels éventuels
+MAX_FRAGMENTS = 255
+FRAGMENT_TIMEOUT = 0.5  # secondes avant d'abandonner un message incomplet
+MAX_PENDING = 32  # messages en cours de réassemblage, tous émetteurs confondus
+RECV_BUFFER = 65535  # plus grand datagramme UDP : aucun n'est tronqué
+RECV_BATCH = 64  # datagrammes lus d'affilée avant de rendre la main à la boucle
+
+
+class FramingStats:
+    """
+    Counters shared by the writers of one side, to report fragmentation rates.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.messages = 0
+        self.datagrams = 0
+        self.bundled = 0  # messages envoyés à plusieurs dans un datagramme
+        self.fragmented = 0  # messages découpés
+        self.fragments = 0
+        self.oversized = 0  # messages trop gros même fragmentés, abandonnés
+        self.reassembled = 0
+        self.incomplete = 0  # messages abandonnés faute d'avoir tous leurs morceaux
+
+    def fragmentation_rate(self):
+        """float: Fraction of the sent messages that had to be fragmented."""
+        return self.fragmented / self.messages if self.messages else 0.0
+
+    def coalescing_ratio(self):
+        """float: Mean number of messages per datagram sent."""
+        return self.messages / self.datagrams if self.datagrams else 0.0
+
+
+class PacketWriter:
+    """
+    Outgoing message queue of one peer.
+    """
+
+    def __init__(self, stats=None, mtu=MAX_DATAGRAM):
+        """
+        Initialize the writer.
+
+        Args:
+            stats: FramingStats to update (a private one if None).
+            mtu: Maximum datagram size in bytes.
+        """
+        self.stats = stats or FramingStats()
+        self.mtu = mtu
+        self.pending = []
+        self._next_message_id = 0
+
+    def queue(self, message):
+        """
+        Queue a binary message for the next flush.
+
+        Args:
+            message: The encoded message.
+        """
+        self.pending.append(message)
+
+    def flush(self):
+        """
+        Turn the queued messages into datagrams.
+
+        Returns:
+            list: The datagrams to send, each at most mtu bytes.
+        """
+        if not self.pending:
+            return []
+        stats = self.stats
+        datagrams = []
+        bundle = []
+        bundle_size = protocol.HEADER.size
+        for message in self.pending:
+            stats.messages += 1
+            if len(message) > self.mtu:
+                datagrams.extend(self._fragment(message))
+                continue
+            entry_size = protocol.BUNDLE_ENTRY.size + len(message)
+            if bundle and bundle_size + entry_size > self.mtu:
+                datagrams.append(self._pack(bundle))
+                bundle = []
+                bundle_size = protocol.HEADER.size
+            bundle.append(message)
+            bundle_size += entry_size
+        if bundle:
+            datagrams.append(self._pack(bundle))
+        self.pending = []
+        stats.datagrams += len(datagrams)
+        return datagrams
+
+    def _pack(self, bundle):
+        if len(bundle) == 1:
+            return bundle[0]  # seul : envoyé tel quel, sans surcoût
+        self.stats.bundled += len(bundle)
+        return protocol.encode_bundle(bundle)
+
+    def _fragment(self, message):
+        chunk_size = self.mtu - protocol.HEADER.size - protocol.FRAGMENT_HEAD.size
+        count = math.ceil(len(message) / chunk_size)
+        if count > MAX_FRAGMENTS:
+            self.stats.oversized += 1
+            return []
+        message_id = self._next_message_id
+        self._next_message_id = (message_id + 1) & 0xFFFF
+        self.stats.fragmented += 1
+        self.stats.fragments += count
+        return [
+            protocol.encode_fragment(message_id, i, count, message[i * chunk_size:(i + 1) * chunk_size])
+            for i in range(count)
+        ]
+
+
+class _Partial:
+    """
+    Fragments received so far for one message.
+    """
+
+    __slots__ = ("chunks", "received", "started")
+
+    def __init__(self, count, now):
+        self.chunks = [None] * count
+        self.received = 0
+        self.started = now
+
+
+class Reassembler:
+    """
+    Decompresses datagrams, unpacks bundles and reassembles fragmented
+    messages, per sender.
+    """
+
+    def __init__(self, stats=None, timeout=FRAGMENT_TIMEOUT, decompressor=None):
+        """
+        Initialize the reassembler.
+
+        Args:
+            stats: FramingStats to update (a private one if None).
+            timeout: Seconds before an incomplete message is dropped.
+            decompressor: PacketDecompressor of the compressed datagrams
+                (None: they are dropped).
+        """
+        self.stats = stats or FramingStats()
+        self.timeout = timeout
+        self.decompressor = decompressor
+        self.partials = {}  # { (émetteur, id du message): _Partial }
+
+    def feed(self, data, sender=None):
+        """
+        Extract the complete messages carried by one datagram.
+
+        Args:
+            data: The raw datagram.
+            sender: Key of the sender (e.g. its address) to separate fragments.
+
+        Returns:
+            list: The complete messages (a legacy JSON datagram is returned as is).
+        """
+        if not protocol.is_binary(data):
+            return [data]
+        msg_type = data[2]
+        if msg_type == protocol.MSG_COMPRESSED:
+            if self.decompressor is None:
+                return []
+            try:
+                data = self.decompressor.decompress(data)
+            except protocol.ProtocolError:
+                return []
+            if not protocol.is_binary(data) or data[2] == protocol.MSG_COMPRESSED:
+                return []
+            msg_type = data[2]
+        if msg_type == protocol.MSG_BUNDLE:
+            return self._unbundle(data)
+        if msg_type == protocol.MSG_FRAGMENT:
+            message = self._add_fragment(data, sender)
+            return [] if message is None else [message]
+        return [data]
+
+    def _unbundle(self, data):
+        messages = []
+        offset = protocol.HEADER.size
+        end = len(data)
+        while offset + protocol.BUNDLE_ENTRY.size <= end:
+            (length,) = protocol.BUNDLE_ENTRY.unpack_from(data, offset)
+            offset += protocol.BUNDLE_ENTRY.size
+            if offset + length > end:
+                break  # bundle tronqué : on garde les messages complets
+            messages.append(data[offset:offset + length])
+            offset += length
+        return messages
+
+    def _add_fragment(self, data, sender):
+        try:
+            message_id, index, count = protocol.FRAGMENT_HEAD.unpack_from(data, protocol.HEADER.size)
+        except struct.error:
+            return None
+        if count == 0 or index >= count:
+            return None
+
+        now = time.monotonic()
+        key = (sender, message_id)
+        partial = self.partials.get(key)
+        if partial is None or len(partial.chunks) != count:
+            self.expire(now)
+            partial = self.partials[key] = _Partial(count, now)
+        if partial.chunks[index] is None:
+            # Copie : data peut être une vue du tampon de réception, réutilisé au datagramme suivant
+            partial.chunks[index] = bytes(data[protocol.HEADER.size + protocol.FRAGMENT_HEAD.size:])
+            partial.received += 1
+        if partial.received < count:
+            return None
+
+        del self.partials[key]
+        self.stats.reassembled += 1
+        return b"".join(partial.chunks)
+
+    def expire(self, now=None):
+        """
+        Drop the messages still incomplete after the timeout, and the oldest
+        ones when too many are pending.
+
+        Args:
+            now: Current time.monotonic(), looked up if None.
+        """
+        now = time.monotonic() if now is None else now
+        for key in [k for k, p in self.partials.items() if now - p.started > self.timeout]:
+            del self.partials[key]
+            self.stats.incomplete += 1
+        while len(self.partials) >= MAX_PENDING:
+            del self.partials[next(iter(self.partials))]
+            self.stats.incomplete += 1
+
+
+class DatagramSocket:
+    """
+    Non-blocking UDP socket read with recvfrom_into.
+
+    Stands in for an asyncio datagram transport (same sendto/close) without
+    its per-datagram allocation: the handler gets a memoryview of a buffer
+    allocated once, valid until it returns.
+    """
+
+    def __init__(self, sock, handler, error_handler=None, buffer_size=RECV_BUFFER):
+        """
+        Initialize the socket wrapper.
+
+        Args:
+            sock: A bound (or connected) UDP socket.
+            handler: Called with (memoryview, addr) for every datagram.
+            error_handler: Called with the OSError of a failed receive or
+                send (ignored if None).
+            buffer_size: Size of the receive buffer.
+        """
+        sock.setblocking(False)
+        self.sock = sock
+        self.handler = handler
+        self.error_handler = error_handler
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.dropped = 0  # datagrammes non envoyés, tampon d'émission du noyau plein
+        self._task = None
+
+    @classmethod
+    def bind(cls, host, port, handler, error_handler=None):
+        """
+        Open a UDP socket bound to an address.
+
+        Args:
+            host: Address to bind.
+            port: UDP port to bind.
+            handler: Called with (memoryview, addr) for every datagram.
+            error_handler: Called with the OSError of a failed receive or send.
+
+        Returns:
+            DatagramSocket: The socket, not reading yet (see start).
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        return cls(sock, handler, error_handler)
+
+    def start(self):
+        """Start reading on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._receive_loop())
+
+    async def _receive_loop(self):
+        loop = asyncio.get_running_loop()
+        sock = self.sock
+        buffer = self.buffer
+        view = self.view
+        handler = self.handler
+        try:
+            while True:
+                # Sans attente quand un datagramme est déjà là : on rend la main
+                # de temps en temps pour que les ticks passent même sous un flot continu.
+                for _ in range(RECV_BATCH):
+                    try:
+                        size, addr = await loop.sock_recvfrom_into(sock, buffer)
+                    except OSError as e:
+                        if sock.fileno() < 0:
+                            return  # socket fermée
+                        if self.error_handler is not None:
+                            self.error_handler(e)
+                        continue
+                    try:
+                        handler(view[:size], addr)
+                    except Exception as e:
+                        # Comme asyncio.DatagramProtocol : un paquet fautif ne ferme pas la socket
+                        print(f"⚠️ Datagramme de {addr[0]}:{addr[1]} non traité : {e!r}")
+                await asyncio.sleep(0)
+        finally:
+            sock.close()  # après le retrait du lecteur par l'annulation
+
+    def sendto(self, data, addr=None):
+        """
+        Send a datagram without blocking; it is dropped if the kernel buffer is full.
+
+        Args:
+            data: The bytes to send.
+            addr: The destination, None for a connected socket.
+        """
+        try:
+            if addr is None:
+                self.sock.send(data)
+            else:
+                self.sock.sendto(data, addr)
+        except BlockingIOError:
+            self.dropped += 1
+        except OSError as e:
+            if self.error_handler is not None:
+                self.error_handler(e)
+
+    def close(self):
+        """Stop reading and close the socket."""
+        if self._task is not None:
+            self._task.cancel()  # la tâche ferme la socket en se terminant
+            self._task = None
+        else:
+            self.sock.close()
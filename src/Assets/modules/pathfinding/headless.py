@@ -0,0 +1,271 @@
+"""
+Headless enemy simulation: the Ai logic (A* on the PFS navgraph, chase and
+wander) without Panda3D, so the server can run it once per match.
+
+Paths are computed in a pool of worker processes, each holding its own copy
+of the navgraph; agents keep moving along their previous path until the new
+one is ready, so a slow search never stalls a tick.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from . import profiler
+from .ai_utils import AiUtils
+from .astar import astar_hierarchical, build_neighbor_distances
+from .parser import PFSParser
+from .subarea_graph import build_subarea_graph, precompute_gateways
+
+ENEMY_SPEED = 5.0  # m/s, comme Ai.speed
+CHASE_RADIUS = 30.0  # mètres ; au-delà, l'ennemi erre
+WANDER_RADIUS = 50.0  # comme Ai.wander_radius
+REPATH_INTERVAL = 0.5  # secondes minimum entre deux recherches de chemin d'un ennemi
+REPATH_DISTANCE = 0.5  # mètres de déplacement de la cible avant de recalculer, comme Ai.follow
+WAYPOINT_REACHED = 0.5  # mètres, comme Ai.move_along_path
+
+
+class NavGraph:
+    """
+    A PFS navgraph loaded with everything A* needs, without rendering.
+    """
+
+    def __init__(self, pfs_path):
+        """
+        Load and precompute the navgraph.
+
+        Args:
+            pfs_path: Path of the level's .pfs file.
+        """
+        profiler.pathfinding_profiling_enable = False  # un print par A* : trop bavard côté serveur
+        self.areas, self.points, self.graph = PFSParser(pfs_path).load()
+        if not self.points:
+            raise ValueError(f"{pfs_path}: aucun point de navigation")
+        self.neighbor_distances = build_neighbor_distances(self.graph, self.points)
+        self.point_to_subarea = {pid: data['subarea'] for pid, data in self.points.items()}
+        self.subarea_graph = build_subarea_graph(self.points, self.areas, self.graph)
+        self.gateways = precompute_gateways(self.points, self.graph, self.point_to_subarea)
+        self.positions = {pid: np.array(data['pos'], dtype=np.float32) for pid, data in self.points.items()}
+        self.point_ids = list(self.points)
+        self.kdtree = KDTree(np.array([self.points[pid]['pos'] for pid in self.point_ids], dtype=np.float32))
+
+    def snap(self, pos):
+        """Return the id of the navgraph point nearest to a position."""
+        _, index = self.kdtree.query(pos)
+        return self.point_ids[index]
+
+    def position(self, pid):
+        """Return the (x, y, z) of a navgraph point."""
+        return self.points[pid]['pos']
+
+    def find_path(self, start, goal):
+        """
+        Run the hierarchical A* between two points.
+
+        Returns:
+            list: The point ids of the path, or None if there is none.
+        """
+        return astar_hierarchical(
+            start, goal, self.points, self.graph, self.neighbor_distances, self.areas,
+            self.point_to_subarea, subarea_graph=self.subarea_graph, gateways=self.gateways,
+            positions=self.positions,
+        )
+
+
+_worker_graph = None  # navgraph d'un processus du pool
+
+
+def _init_worker(pfs_path):
+    global _worker_graph
+    _worker_graph = NavGraph(pfs_path)
+
+
+def _find_path(start, goal):
+    return _worker_graph.find_path(start, goal)
+
+
+class PathfinderPool:
+    """
+    Worker processes computing A* paths on their own copy of a navgraph.
+    """
+
+    def __init__(self, pfs_path, workers=None):
+        """
+        Start the workers.
+
+        Args:
+            pfs_path: Path of the level's .pfs file, loaded by every worker.
+            workers: Number of processes (os.cpu_count() if None).
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(pfs_path,))
+
+    def submit(self, start, goal):
+        """
+        Queue a path search.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the path (or None).
+        """
+        return self.executor.submit(_find_path, start, goal)
+
+    def close(self):
+        """Stop the workers once the running searches end, dropping the others."""
+        self.executor.shutdown(cancel_futures=True)
+
+
+class Enemy:
+    """
+    State of one simulated enemy.
+    """
+
+    __slots__ = ("entity_id", "x", "y", "z", "qpos", "path", "target_index", "goal_id",
+                 "pending", "last_request", "chasing", "target_pos")
+
+    def __init__(self, entity_id, pos):
+        self.entity_id = entity_id
+        self.x, self.y, self.z = pos
+        self.qpos = (0, 0, 0)  # renseignée par la salle à chaque tick
+        self.path = []
+        self.target_index = 0
+        self.goal_id = None
+        self.pending = None  # Future du chemin en cours de calcul
+        self.last_request = -math.inf
+        self.chasing = False
+        self.target_pos = None
+
+
+class EnemySimulation:
+    """
+    Enemies of one room: target choice, path requests and movement.
+    """
+
+    def __init__(self, navgraph, pool=None, seed=0, speed=ENEMY_SPEED, chase_radius=CHASE_RADIUS,
+                 wander_radius=WANDER_RADIUS, repath_interval=REPATH_INTERVAL):
+        """
+        Initialize the simulation.
+
+        Args:
+            navgraph: The level's NavGraph.
+            pool: PathfinderPool for the searches; None computes them inline
+                (deterministic, used by replays and tests).
+            seed: Seed of the spawn points and wander targets.
+            speed: Enemy speed in m/s.
+            chase_radius: Distance under which an enemy chases the nearest player.
+            wander_radius: Maximum distance of a wander target.
+            repath_interval: Minimum seconds between two searches of an enemy.
+        """
+        self.navgraph = navgraph
+        self.pool = pool
+        self.rng = random.Random(seed)
+        self.speed = speed
+        self.chase_radius = chase_radius
+        self.wander_radius = wander_radius
+        self.repath_interval = repath_interval
+        self.enemies = []
+        self.searches = 0
+
+    def spawn(self, entity_id):
+        """
+        Add an enemy at a random navgraph point.
+
+        Args:
+            entity_id: The entity id given to the enemy.
+
+        Returns:
+            Enemy: The new enemy.
+        """
+        pid = self.rng.choice(self.navgraph.point_ids)
+        enemy = Enemy(entity_id, self.navgraph.position(pid))
+        self.enemies.append(enemy)
+        return enemy
+
+    def step(self, dt, now, players):
+        """
+        Advance every enemy by one tick.
+
+        Args:
+            dt: Tick duration in seconds.
+            now: Current time (server clock).
+            players: List of (x, y, z) positions of the room's players.
+        """
+        for enemy in self.enemies:
+            self._collect(enemy)
+            self._think(enemy, now, players)
+            self._move(enemy, dt)
+
+    def _collect(self, enemy):
+        future = enemy.pending
+        if future is None or not future.done():
+            return
+        enemy.pending = None
+        try:
+            path = future.result()
+        except Exception as e:
+            print(f"[AI] Erreur de pathfinding: {e}")
+            return
+        if path:
+            enemy.path = path
+            enemy.target_index = 0
+
+    def _think(self, enemy, now, players):
+        if enemy.pending is not None or now - enemy.last_request < self.repath_interval:
+            return
+        pos = (enemy.x, enemy.y, enemy.z)
+        nearest = min(players, key=lambda p: AiUtils.fast_dist(pos, p), default=None)
+        if nearest is not None and AiUtils.fast_dist(pos, nearest) <= self.chase_radius:
+            # Poursuite : nouveau chemin quand le joueur s'est assez déplacé
+            if (enemy.chasing and enemy.path and enemy.target_pos is not None
+                    and AiUtils.fast_dist(nearest, enemy.target_pos) <= REPATH_DISTANCE):
+                return
+            enemy.chasing = True
+            enemy.target_pos = nearest
+            goal = self.navgraph.snap(nearest)
+        else:
+            if not enemy.chasing and enemy.target_index < len(enemy.path):
+                return  # errance en cours
+            enemy.chasing = False
+            enemy.target_pos = None
+            angle = self.rng.uniform(0, 2 * math.pi)
+            radius = self.rng.uniform(0, self.wander_radius)
+            goal = self.navgraph.snap((enemy.x + math.cos(angle) * radius, enemy.y + math.sin(angle) * radius, enemy.z))
+        self._request(enemy, self.navgraph.snap(pos), goal, now)
+
+    def _request(self, enemy, start, goal, now):
+        enemy.goal_id = goal
+        enemy.last_request = now
+        self.searches += 1
+        if self.pool is None:
+            path = self.navgraph.find_path(start, goal)
+            if path:
+                enemy.path = path
+                enemy.target_index = 0
+        else:
+            enemy.pending = self.pool.submit(start, goal)
+
+    def _move(self, enemy, dt):
+        remaining = self.speed * dt
+        path = enemy.path
+        while remaining > 0 and enemy.target_index < len(path):
+            tx, ty, tz = self.navgraph.position(path[enemy.target_index])
+            dx, dy, dz = tx - enemy.x, ty - enemy.y, tz - enemy.z
+            dist = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if dist <= remaining:
+                enemy.x, enemy.y, enemy.z = tx, ty, tz
+                remaining -= dist
+                enemy.target_index += 1
+                continue
+            ratio = remaining / dist
+            enemy.x += dx * ratio
+            enemy.y += dy * ratio
+            enemy.z += dz * ratio
+            if dist - remaining < WAYPOINT_REACHED:
+                enemy.target_index += 1
+            break
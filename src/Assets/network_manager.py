@@ -5,12 +5,48 @@ Network manager for multiplayer functionality.
 __license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
 __author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
 
+import selectors
 import socket
 import threading
-import json
 from queue import Queue, Empty
-from panda3d.core import Vec3, ClockObject
-from Assets.utils import profile, get_local_ip
+import numpy as np
+from panda3d.core import ClockObject
+from Assets.utils import profile
+from Assets.modules.network import protocol
+from Assets.modules.network.snapshot import SnapshotReceiver
+from Assets.modules.network.transport import Reassembler, RECV_BUFFER
+from Assets.modules.network.reliable import ReliableChannel
+from Assets.modules.network.clock import ClockSync
+from Assets.modules.network.compression import PacketDecompressor, load_dictionary
+from Assets.modules.network.interpolation import JitterBuffer, INTERPOLATION_DELAY
+from Assets.modules.network.movement import InputHistory
+
+LISTEN_TIMEOUT = 0.1  # secondes d'attente maximale du thread réseau, pour voir la demande d'arrêt
+
+
+class SnapshotState:
+    """
+    Full state rebuilt by the listener thread from one delta snapshot.
+    """
+
+    __slots__ = ("tick", "time", "you", "players", "doors")
+
+    def __init__(self, tick, time, you, players, doors):
+        """
+        Initialize the state.
+
+        Args:
+            tick: Server tick of the snapshot.
+            time: Server time of the snapshot, in seconds.
+            you: Entity id of the local player.
+            players: List of {"id", "x", "y", "z"} dicts, positions dequantized.
+            doors: { door id: state } changed since the baseline.
+        """
+        self.tick = tick
+        self.time = time
+        self.you = you
+        self.players = players
+        self.doors = doors
 
 
 class NetworkManager:
@@ -19,9 +55,15 @@ class NetworkManager:
     """
 
     CLIENT_TIMEOUT = 3.0  # seconds before considering a remote player disconnected
+    CONNECT_RETRY = 1.0  # seconds between two connect requests until the server accepts
+    MODELS = {
+        protocol.KIND_PLAYER: "Assets/player/models/playertest.egg",
+        protocol.KIND_ENEMY: "Assets/player/models/partypooper.bam",
+    }
 
     @profile
-    def __init__(self, parent, server_ip="192.168.1.155", server_port=5000):
+    def __init__(self, parent, server_ip="192.168.1.155", server_port=5000, room=protocol.DEFAULT_ROOM,
+                 player_name="Player", compression=True):
         """
         Initialize the network manager.
 
@@ -29,50 +71,133 @@ class NetworkManager:
             parent: The parent application instance.
             server_ip: Server IP address.
             server_port: Server port.
+            room: Game room to join on the server.
+            player_name: Name shown to the other players.
+            compression: Ask the server to compress its datagrams, if the
+                compression dictionary is installed.
         """
         self.parent = parent
         self.server_addr = (server_ip, server_port)
+        self.room = room
+        self.player_name = player_name
 
         # Socket setup
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.bind(("", 0))
         self.sock.setblocking(False)
 
-        # Client identification
-        self.local_ip = get_local_ip()
-        self.local_port = self.sock.getsockname()[1]
-        self.local_id = f"{self.local_ip}:{self.local_port}"
-
-        print(f"[NET] Local ID = {self.local_id}")
+        # Client identification: given by the server on connect, so it survives NAT
+        self.local_id = None  # id d'entité
+        self.session_token = 0  # présenté à chaque connect pour reprendre la session
+        self.connected = False
+
+        # Binary protocol (positions quantized within the level bounds)
+        self.quantizer = protocol.Quantizer(protocol.DEFAULT_BOUNDS)
+        self.snapshots = SnapshotReceiver()
+        dictionary = load_dictionary() if compression else None
+        self.decompressor = PacketDecompressor(dictionary) if dictionary else None
+        self.compressed = False  # le serveur a accepté de compresser
+        self.reassembler = Reassembler(decompressor=self.decompressor)  # bundles, fragments et compression du serveur
+        self.reliable = ReliableChannel()  # portes et retraits, renvoyés jusqu'à acquittement
+        self.clock = ClockSync()  # offset et RTT vers le serveur, mesurés par ping/pong
+        self.inputs = InputHistory()  # commandes du joueur local pas encore confirmées, pour le rejeu
+        self._last_input = None
+        self.server_tick = None  # tick et temps serveur du dernier snapshot appliqué
+        self.snapshot_time = None
+        self._last_connect = None
 
         # Threading and queues
         self.net_queue = Queue()
+        self._snapshot_lock = threading.Lock()
+        self._latest_snapshot = None  # seul le plus récent attend le thread principal
+        self.coalesced_snapshots = 0  # snapshots remplacés avant d'avoir été affichés
+        self._stopping = threading.Event()
         self.remote_players = {}
+        self.jitter = JitterBuffer()  # positions horodatées des joueurs distants, par case
+        self._free_slots = []  # cases du tampon libérées par les joueurs partis
+        self._next_slot = 0
+        self.entity_kinds = {}  # { id d'entité: protocol.KIND_* }, annoncé par le serveur (joueur par défaut)
 
         # Start network listener thread
-        threading.Thread(target=self._network_listener, daemon=True).start()
+        self._listener = threading.Thread(target=self._network_listener, daemon=True)
+        self._listener.start()
 
         # Start network update task
         self.parent.taskMgr.doMethodLater(0.01, self._network_update, "network_update")
 
     def _network_listener(self):
         """
-        Network listener thread that receives messages and puts them in the queue.
+        Network listener thread that receives and decodes messages.
+
+        The thread sleeps in select() until a datagram arrives, then drains
+        the socket. Datagrams are read into one preallocated buffer and
+        decoded from a memoryview; the decoded messages copy what they keep.
+        Snapshots are rebuilt here and only the newest one is kept for the
+        main thread; every other message goes through the queue.
         """
-        while True:
-            try:
-                data, addr = self.sock.recvfrom(4096)
-                msg = json.loads(data.decode())
-                self.net_queue.put(msg)
-            except BlockingIOError:
-                # Normal when no data available
-                import time
-                time.sleep(0.001)
+        buffer = bytearray(RECV_BUFFER)
+        view = memoryview(buffer)
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_READ)
+            while not self._stopping.is_set():
+                if not selector.select(LISTEN_TIMEOUT):
+                    continue
+                while True:
+                    try:
+                        size, addr = self.sock.recvfrom_into(buffer)
+                    except BlockingIOError:
+                        break  # socket vidée, retour dans select()
+                    except OSError as e:
+                        print(f"[NET] Listener error: {e}")
+                        break
+                    try:
+                        self._receive(view[:size], addr)
+                    except Exception as e:
+                        print(f"[NET] Listener error: {e}")
+
+    def _receive(self, datagram, addr):
+        """
+        Decode one datagram in the listener thread.
+
+        Args:
+            datagram: The received datagram (memoryview of the receive buffer).
+            addr: The sender address.
+        """
+        received = ClockObject.getGlobalClock().getRealTime()
+        for message in self.reassembler.feed(datagram, addr):
+            msg = protocol.decode(message, self.quantizer)
+            msg_type = msg.get("type")
+            if msg_type == "snapshot":
+                self._rebuild_snapshot(msg)
                 continue
-            except Exception as e:
-                print(f"[NET] Listener error: {e}")
-                import time
-                time.sleep(0.01)
+            if msg_type == "pong":
+                msg["received"] = received  # l'attente dans la file fausserait le RTT
+            self.net_queue.put(msg)
+
+    def _rebuild_snapshot(self, msg):
+        """
+        Apply a delta snapshot and publish the rebuilt state, replacing the
+        one the main thread has not taken yet.
+
+        Args:
+            msg: The decoded snapshot message.
+        """
+        state = self.snapshots.apply(msg)
+        if state is None:
+            return
+        entities, _ = state
+        players = []
+        for eid, q in entities.items():
+            x, y, z = self.quantizer.dequantize(*q)
+            players.append({"id": eid, "x": x, "y": y, "z": z})
+        doors = msg["doors"]
+        with self._snapshot_lock:
+            stale = self._latest_snapshot
+            if stale is not None:
+                # Les portes modifiées par le snapshot remplacé ne doivent pas être perdues
+                doors = {**stale.doors, **doors}
+                self.coalesced_snapshots += 1
+            self._latest_snapshot = SnapshotState(msg["tick"], msg["time"], msg["you"], players, doors)
 
     def _network_update(self, task):
         """
@@ -86,23 +211,45 @@ class NetworkManager:
         """
         now = ClockObject.getGlobalClock().getRealTime()
 
-        # Send local position
-        if hasattr(self.parent, "player"):
+        # Connect (or resume the session) until the server accepts
+        if not self.connected and (self._last_connect is None or now - self._last_connect > self.CONNECT_RETRY):
+            self._last_connect = now
+            try:
+                dictionary = self.decompressor.dictionary_id if self.decompressor is not None else 0
+                packet = protocol.encode_connect(self.room, self.player_name, self.session_token, dictionary)
+                self.sock.sendto(packet, self.server_addr)
+            except Exception as e:
+                print(f"[NET] Send connect error: {e}")
+
+        # Send the local movement as a numbered input command (already applied locally)
+        if self.connected and hasattr(self.parent, "player"):
             try:
                 pos = self.parent.player.controller_np.getPos()
-                packet = json.dumps({
-                    "type": "pos",
-                    "id": self.local_id,
-                    "x": pos.x,
-                    "y": pos.y,
-                    "z": pos.z
-                }).encode()
+                dt = 0.0 if self._last_input is None else now - self._last_input
+                self._last_input = now
+                seq = self.inputs.record(pos.x, pos.y, pos.z)
+                packet = protocol.encode_input(self.quantizer, seq, dt, pos.x, pos.y, pos.z, self.snapshots.ack)
                 self.sock.sendto(packet, self.server_addr)
             except Exception as e:
                 print(f"[NET] Send error: {e}")
 
-        # Process received messages
+        # Clock synchronization
+        if self.connected and self.clock.ping_due(now):
+            try:
+                self.sock.sendto(protocol.encode_ping(now), self.server_addr)
+            except Exception as e:
+                print(f"[NET] Send ping error: {e}")
+
+        # Send reliable events, resends and acks
+        try:
+            for packet in self.reliable.poll():
+                self.sock.sendto(packet, self.server_addr)
+        except Exception as e:
+            print(f"[NET] Send reliable error: {e}")
+
+        # Process received messages, then the newest snapshot
         self._process_messages(now)
+        self._apply_latest_snapshot(now)
 
         # Interpolate remote players and clean up inactive ones
         self._update_remote_players(now)
@@ -128,16 +275,113 @@ class NetworkManager:
                 self._handle_players_list(msg, now)
             elif msg_type in ("door_toggle", "door_sync"):
                 self._handle_door_sync(msg)
+            elif msg_type == "reliable":
+                self._handle_reliable(msg)
+            elif msg_type == "ack":
+                self.reliable.on_ack(msg["ack"])
+            elif msg_type == "correction":
+                self._handle_correction(msg)
+            elif msg_type == "pong":
+                self.clock.on_pong(msg["time"], msg["server_time"], msg.get("received", now))
+            elif msg_type == "accept":
+                self._handle_accept(msg)
+            elif msg_type == "reconnect" and self.connected:
+                # Le serveur ne reconnaît plus notre adresse : reprise de session tout de suite
+                self.connected = False
+                self._last_connect = None
+
+    def _handle_accept(self, msg):
+        """
+        Store the session given by the server.
+
+        Args:
+            msg: The decoded accept message.
+        """
+        if not self.connected:
+            print(f"[NET] Connected, entity id = {msg['id']}" + (", compressed" if msg["dictionary"] else ""))
+            self.jitter.clear()  # l'horloge du serveur a pu repartir de zéro
+        self.connected = True
+        self.compressed = bool(msg["dictionary"])
+        self.session_token = msg["token"]
+        self.local_id = msg["id"]
+
+    def _handle_correction(self, msg):
+        """
+        Move the local player back to the position kept by the server, then
+        replay the input commands the server has not applied yet.
+
+        Args:
+            msg: The decoded correction message.
+        """
+        position = self.inputs.reconcile(msg["seq"], msg["x"], msg["y"], msg["z"])
+        if position is not None and hasattr(self.parent, "player"):
+            self.parent.player.controller_np.setPos(*position)
 
-    def _handle_players_list(self, msg, now):
+    def _handle_reliable(self, msg):
+        """
+        Deliver the reliable events now in order.
+
+        Args:
+            msg: The decoded reliable message.
+        """
+        for message, elapsed in self.reliable.receive(msg["seq"], msg["age"], msg["message"]):
+            try:
+                event = protocol.decode(message, self.quantizer)
+            except protocol.ProtocolError as e:
+                print(f"[NET] Invalid reliable event: {e}")
+                continue
+            if event["type"] == "door_sync":
+                self._handle_door_sync(event, elapsed)
+            elif event["type"] == "entity_kind":
+                self._handle_entity_kind(event)
+
+    def _handle_entity_kind(self, msg):
+        """
+        Record the kind of an entity, e.g. an enemy simulated by the server.
+
+        Args:
+            msg: The decoded entity_kind message.
+        """
+        eid = msg["id"]
+        if self.entity_kinds.get(eid, protocol.KIND_PLAYER) == msg["kind"]:
+            return
+        self.entity_kinds[eid] = msg["kind"]
+        if eid in self.remote_players:
+            self._remove_remote(eid)  # recréé avec le bon modèle au prochain snapshot
+
+    def _apply_latest_snapshot(self, now):
+        """
+        Apply the newest snapshot rebuilt by the listener thread, if any.
+
+        Args:
+            now: Current time.
+        """
+        with self._snapshot_lock:
+            state, self._latest_snapshot = self._latest_snapshot, None
+        if state is None:
+            return
+        self.server_tick = state.tick
+        self.snapshot_time = state.time
+
+        # Seules les portes modifiées depuis la baseline sont resynchronisées
+        self._handle_players_list({"you": state.you, "players": state.players, "doors": state.doors}, now, state.time)
+
+    def _handle_players_list(self, msg, now, sample_time=None):
         """
         Handle the players list message.
 
         Args:
             msg: The message containing player data.
             now: Current time.
+            sample_time: Server time of the positions; the local time for the
+                legacy JSON list, which has none.
         """
         server_players = set()
+        slots = []
+        coords = []
+
+        if msg.get("you") is not None:
+            self.local_id = msg["you"]
 
         for p in msg["players"]:
             pid = p["id"]
@@ -150,28 +394,37 @@ class NetworkManager:
 
             if pid not in self.remote_players:
                 # New player
-                print(f"[NET] New player connected: {pid}")
-                model = self.parent.loader.loadModel("Assets/player/models/playertest.egg")
+                kind = self.entity_kinds.get(pid, protocol.KIND_PLAYER)
+                if kind == protocol.KIND_PLAYER:
+                    print(f"[NET] New player connected: {pid}")
+                model = self.parent.loader.loadModel(self.MODELS.get(kind, self.MODELS[protocol.KIND_PLAYER]))
                 model.reparentTo(self.parent.render)
                 model.setPos(x, y, z)
                 model.setScale(1)
 
+                if self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    slot = self._next_slot
+                    self._next_slot += 1
                 self.remote_players[pid] = {
                     "node": model,
-                    "target_pos": Vec3(x, y, z),
+                    "slot": slot,
                     "last_update": now
                 }
             else:
                 # Update existing player
-                self.remote_players[pid]["target_pos"] = Vec3(x, y, z)
                 self.remote_players[pid]["last_update"] = now
+            slots.append(self.remote_players[pid]["slot"])
+            coords.append((x, y, z))
+
+        self.jitter.push(now if sample_time is None else sample_time, slots, coords)
 
         # Remove disconnected players
         for pid in list(self.remote_players.keys()):
             if pid not in server_players:
                 print(f"[NET] Player disconnected: {pid}")
-                self.remote_players[pid]["node"].removeNode()
-                del self.remote_players[pid]
+                self._remove_remote(pid)
 
         # Handle door states
         doors = msg.get("doors", {})
@@ -181,28 +434,31 @@ class NetworkManager:
             except Exception as e:
                 print(f"[NET] Door sync error {door_id_str}: {e}")
 
-    def _handle_door_sync(self, msg):
+    def _handle_door_sync(self, msg, elapsed=0.0):
         """
         Handle door synchronization message.
 
         Args:
             msg: The door sync message.
+            elapsed: Seconds since the server changed the door.
         """
         door_id = msg.get("door_id")
         state = msg.get("state")
         if door_id is not None and state is not None:
             try:
-                self._sync_door(door_id, state)
+                self._sync_door(door_id, state, elapsed)
             except Exception as e:
                 print(f"[NET] Door sync error {door_id}: {e}")
 
-    def _sync_door(self, door_id, state):
+    def _sync_door(self, door_id, state, elapsed=0.0):
         """
         Synchronize door state with the server.
 
         Args:
             door_id: The door ID.
             state: The door state (True for open, False for closed).
+            elapsed: Seconds since the server changed the door; the animation
+                starts that far in, so every client shows the same angle.
         """
         if not hasattr(self.parent, "terrain"):
             return
@@ -223,31 +479,50 @@ class NetworkManager:
             return
 
         if state and not porte_obj.is_open:
-            porte_obj.ouvrir()
+            porte_obj.ouvrir(elapsed)
         elif not state and porte_obj.is_open:
-            porte_obj.fermer()
+            porte_obj.fermer(elapsed)
+
+    def _remove_remote(self, pid):
+        """
+        Remove the node of a remote player and free its buffer slot.
+
+        Args:
+            pid: The remote player's id.
+        """
+        data = self.remote_players.pop(pid)
+        data["node"].removeNode()
+        self.jitter.remove(data["slot"])
+        self._free_slots.append(data["slot"])
 
     def _update_remote_players(self, now):
         """
         Update remote player positions and remove inactive ones.
 
+        Every remote player is drawn INTERPOLATION_DELAY behind the estimated
+        server time, between the two snapshots around that time, so the
+        motion does not depend on the frame rate nor on the snapshot jitter.
+
         Args:
             now: Current time.
         """
-        for pid, data in list(self.remote_players.items()):
-            node = data["node"]
-            target = data.get("target_pos", node.getPos())
-            cur = node.getPos()
+        if not self.remote_players:
+            return
+        render_time = self.clock.server_time(now)
+        if render_time is None:
+            # Pas encore de pong : temps du dernier snapshot, ou temps local pour la liste JSON
+            render_time = self.snapshot_time if self.snapshot_time is not None else now
+        remotes = list(self.remote_players.items())
+        slots = np.fromiter((data["slot"] for _, data in remotes), dtype=np.intp, count=len(remotes))
+        positions = self.jitter.sample(render_time - INTERPOLATION_DELAY, slots).tolist()
 
-            # Interpolate position
-            node.setPos(cur + (target - cur) * 0.25)
+        for (pid, data), (x, y, z) in zip(remotes, positions):
+            data["node"].setPos(x, y, z)
 
             # Remove inactive players
-            last_update = data.get("last_update", now)
-            if now - last_update > self.CLIENT_TIMEOUT:
+            if now - data["last_update"] > self.CLIENT_TIMEOUT:
                 print(f"[NET] Player timed out: {pid}")
-                node.removeNode()
-                del self.remote_players[pid]
+                self._remove_remote(pid)
 
     def send_door_toggle(self, door_id, state):
         """
@@ -257,17 +532,29 @@ class NetworkManager:
             door_id: The door ID.
             state: The new door state.
         """
-        try:
-            msg = json.dumps({
-                "type": "door_toggle",
-                "door_id": door_id,
-                "state": state
-            }).encode()
-            self.sock.sendto(msg, self.server_addr)
-        except Exception as e:
-            print(f"[NET] Send door toggle error: {e}")
+        self.reliable.send(protocol.encode_door(protocol.MSG_DOOR_TOGGLE, door_id, state))
+
+    def send_remove_player(self, entity_id):
+        """
+        Ask the server to remove a player from the room.
+
+        Args:
+            entity_id: The player's entity id.
+        """
+        self.reliable.send(protocol.encode_remove_player(entity_id))
+
+    def server_time(self):
+        """
+        Estimate the current server time, synchronized by ping/pong.
+
+        Returns:
+            float: Seconds on the server clock, or None until the first pong.
+        """
+        return self.clock.server_time(ClockObject.getGlobalClock().getRealTime())
 
     def cleanup(self):
         """Clean up network resources."""
+        self._stopping.set()
+        self._listener.join(LISTEN_TIMEOUT * 2)
         if self.sock:
             self.sock.close()
\ No newline at end of file
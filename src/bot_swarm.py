@@ -0,0 +1,410 @@
+"""
+Load generator: hundreds of headless bots speaking the client protocol.
+
+Bots are spread over a few processes, each running its bots on one asyncio
+loop. Every bot joins a room, follows a scripted path, sends it as input
+commands like NetworkManager does, toggles doors now and then, and records
+the snapshot rate, the latency between a position and the first snapshot
+that shows it, its ping to the server and the corrections the server sent.
+Bots faster than the server allows (--speed) exercise the corrections.
+
+Exemple : python bot_swarm.py --port 9999 --bots 400 --processes 4 --duration 60
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from Assets.modules.network import protocol
+from Assets.modules.network.snapshot import SnapshotReceiver
+from Assets.modules.network.transport import Reassembler
+from Assets.modules.network.reliable import ReliableChannel
+from Assets.modules.network.clock import ClockSync
+from Assets.modules.network.compression import PacketDecompressor, load_dictionary
+from Assets.modules.network.movement import InputHistory, MAX_SPEED
+
+SEND_RATE = 30  # positions envoyées par seconde et par bot
+DOOR_INTERVAL = 5.0  # secondes moyennes entre deux ouvertures/fermetures de porte
+DOORS = 8  # identifiants de porte utilisés par les bots
+CONNECT_RETRY = 1.0  # comme NetworkManager
+MAX_PENDING_POSITIONS = 64  # positions envoyées en attente d'apparaître dans un snapshot
+SPAWN_EXTENT = 100.0  # les bots démarrent dans [-SPAWN_EXTENT, SPAWN_EXTENT]²
+PATTERNS = ("circle", "line", "wander")
+
+
+class BotStats:
+    """
+    Measurements of one process, merged by the parent.
+    """
+
+    def __init__(self):
+        """Initialize the measurements."""
+        self.bots = 0
+        self.joined = 0
+        self.snapshots = 0
+        self.stale = 0  # snapshots rejetés (désordre ou baseline inconnue)
+        self.datagrams_in = 0
+        self.bytes_in = 0
+        self.compressed_in = 0  # datagrammes reçus compressés
+        self.datagrams_out = 0
+        self.latencies = []  # secondes entre une position et le snapshot qui la montre
+        self.door_latencies = []  # secondes entre un door_toggle et son door_sync
+        self.join_times = []  # secondes entre le premier join et le premier snapshot
+        self.ping_rtts = []  # secondes entre un ping et son pong
+        self.corrections = 0  # positions imposées par le serveur
+        self.snapshot_delays = []  # âge des snapshots à réception, sur l'horloge serveur estimée
+        self.duration = 0.0
+
+    def merge(self, other):
+        """Add the measurements of another process."""
+        for key, value in vars(other).items():
+            if key == "duration":
+                self.duration = max(self.duration, value)
+            else:
+                setattr(self, key, getattr(self, key) + value)
+
+
+class Bot(asyncio.DatagramProtocol):
+    """
+    One simulated client on its own UDP socket.
+    """
+
+    def __init__(self, index, room, pattern, rng, stats, dictionary=None, max_speed=MAX_SPEED):
+        """
+        Initialize the bot.
+
+        Args:
+            index: Bot number, used to pick its doors.
+            room: The room to join.
+            pattern: Movement script, one of PATTERNS.
+            rng: random.Random of the process.
+            stats: The BotStats of the process.
+            dictionary: Compression dictionary offered to the server (None:
+                uncompressed datagrams).
+            max_speed: Upper bound of the bot's speed, in m/s.
+        """
+        self.index = index
+        self.room = room
+        self.pattern = pattern
+        self.rng = rng
+        self.stats = stats
+        self.quantizer = protocol.Quantizer(protocol.DEFAULT_BOUNDS)
+        self.snapshots = SnapshotReceiver()
+        self.decompressor = PacketDecompressor(dictionary) if dictionary else None
+        self.reassembler = Reassembler(decompressor=self.decompressor)
+        self.reliable = ReliableChannel()
+        self.clock = ClockSync()
+        self.inputs = InputHistory()
+        self.transport = None
+        self.connected = False
+        self.token = 0
+        self.entity_id = None
+        self.sent_positions = {}  # { position quantifiée: instant d'envoi }
+        self.door_toggles = {}  # { (door_id, état): instant d'envoi }
+        self.first_join = None
+
+        self.center = (rng.uniform(-SPAWN_EXTENT, SPAWN_EXTENT), rng.uniform(-SPAWN_EXTENT, SPAWN_EXTENT))
+        self.radius = rng.uniform(3.0, 20.0)
+        self.speed = rng.uniform(1.0, max_speed)  # m/s
+        self.heading = rng.uniform(0.0, 2 * math.pi)
+        self.position = (self.center[0], self.center[1], 0.0)
+
+    # ------------------------------------------------------------------
+    # RÉSEAU
+    # ------------------------------------------------------------------
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        now = time.monotonic()
+        self.stats.datagrams_in += 1
+        self.stats.bytes_in += len(data)
+        if protocol.is_binary(data) and data[2] == protocol.MSG_COMPRESSED:
+            self.stats.compressed_in += 1
+        for message in self.reassembler.feed(data, addr):
+            try:
+                msg = protocol.decode(message, self.quantizer)
+            except protocol.ProtocolError:
+                continue
+            if msg["type"] == "snapshot":
+                self._on_snapshot(msg, now)
+            elif msg["type"] == "reliable":
+                for event, _ in self.reliable.receive(msg["seq"], msg["age"], msg["message"], now):
+                    self._on_event(event, now)
+            elif msg["type"] == "ack":
+                self.reliable.on_ack(msg["ack"])
+            elif msg["type"] == "pong":
+                self.stats.ping_rtts.append(now - msg["time"])
+                self.clock.on_pong(msg["time"], msg["server_time"], now)
+            elif msg["type"] == "correction":
+                self._on_correction(msg)
+            elif msg["type"] == "accept":
+                self.connected = True
+                self.token = msg["token"]
+            elif msg["type"] == "reconnect":
+                self.connected = False
+
+    def _on_event(self, message, now):
+        try:
+            event = protocol.decode(message, self.quantizer)
+        except protocol.ProtocolError:
+            return
+        if event["type"] == "door_sync":
+            sent = self.door_toggles.pop((event["door_id"], event["state"]), None)
+            if sent is not None:
+                self.stats.door_latencies.append(now - sent)
+
+    def _on_correction(self, msg):
+        position = self.inputs.reconcile(msg["seq"], msg["x"], msg["y"], msg["z"])
+        if position is None:
+            return
+        self.stats.corrections += 1
+        if self.pattern == "wander":
+            self.position = position  # les autres trajets sont calculés à partir du temps
+
+    def error_received(self, exc):
+        pass  # serveur injoignable : les snapshots manquants le montreront
+
+    def _on_snapshot(self, msg, now):
+        state = self.snapshots.apply(msg)
+        if state is None:
+            self.stats.stale += 1
+            return
+        self.stats.snapshots += 1
+        if self.clock.synced:
+            self.stats.snapshot_delays.append(self.clock.server_time(now) - msg["time"])
+        if self.entity_id is None:
+            self.entity_id = msg["you"]
+            self.stats.joined += 1
+            self.stats.join_times.append(now - self.first_join)
+        own = state[0].get(self.entity_id)
+        sent = self.sent_positions.get(own)
+        if sent is None:
+            return
+        self.stats.latencies.append(now - sent)
+        # Les positions plus anciennes ne seront plus montrées.
+        for qpos in list(self.sent_positions):
+            del self.sent_positions[qpos]
+            if qpos == own:
+                break
+
+    def send(self, packet):
+        """Send one packet to the server."""
+        self.transport.sendto(packet)
+        self.stats.datagrams_out += 1
+
+    # ------------------------------------------------------------------
+    # SCRIPT
+    # ------------------------------------------------------------------
+    def move(self, t, dt):
+        """
+        Advance the scripted movement.
+
+        Args:
+            t: Seconds since the bot started.
+            dt: Seconds since the previous step.
+        """
+        cx, cy = self.center
+        if self.pattern == "circle":
+            angle = self.heading + t * self.speed / self.radius
+            self.position = (cx + self.radius * math.cos(angle), cy + self.radius * math.sin(angle), 0.0)
+        elif self.pattern == "line":
+            offset = self.radius * math.sin(t * self.speed / self.radius)
+            self.position = (cx + offset * math.cos(self.heading), cy + offset * math.sin(self.heading), 0.0)
+        else:
+            self.heading += self.rng.uniform(-1.0, 1.0) * dt
+            x = self.position[0] + math.cos(self.heading) * self.speed * dt
+            y = self.position[1] + math.sin(self.heading) * self.speed * dt
+            # Rebond au bord de la zone de départ
+            if abs(x) > SPAWN_EXTENT or abs(y) > SPAWN_EXTENT:
+                self.heading += math.pi
+                x, y = self.position[0], self.position[1]
+            self.position = (x, y, 0.0)
+
+    def toggle_door(self, now):
+        """Open or close one of the bot's doors."""
+        door_id = (self.index + self.rng.randrange(2)) % DOORS
+        state = self.rng.random() < 0.5
+        self.door_toggles[(door_id, state)] = now
+        self.reliable.send(protocol.encode_door(protocol.MSG_DOOR_TOGGLE, door_id, state), now)
+
+    async def run(self, duration, send_rate):
+        """
+        Play the bot's script.
+
+        Args:
+            duration: Seconds to play.
+            send_rate: Positions sent per second.
+        """
+        interval = 1.0 / send_rate
+        start = time.monotonic()
+        self.first_join = start
+        last_connect = None
+        next_door = start + self.rng.expovariate(1.0 / DOOR_INTERVAL)
+        previous = start
+        previous_input = start
+        while True:
+            now = time.monotonic()
+            if now - start >= duration:
+                break
+            if not self.connected and (last_connect is None or now - last_connect > CONNECT_RETRY):
+                last_connect = now
+                dictionary = self.decompressor.dictionary_id if self.decompressor is not None else 0
+                self.send(protocol.encode_connect(self.room, f"bot-{self.index}", self.token, dictionary))
+
+            self.move(now - start, now - previous)
+            previous = now
+            if not self.connected:
+                await asyncio.sleep(interval)
+                continue
+            seq = self.inputs.record(*self.position)
+            packet = protocol.encode_input(self.quantizer, seq, now - previous_input, *self.position, self.snapshots.ack)
+            previous_input = now
+            qpos = self.quantizer.quantize(*self.position)
+            self.sent_positions.pop(qpos, None)
+            self.sent_positions[qpos] = now
+            if len(self.sent_positions) > MAX_PENDING_POSITIONS:
+                del self.sent_positions[next(iter(self.sent_positions))]
+            self.send(packet)
+
+            if self.entity_id is not None and now >= next_door:
+                next_door = now + self.rng.expovariate(1.0 / DOOR_INTERVAL)
+                self.toggle_door(now)
+            for packet in self.reliable.poll(now):
+                self.send(packet)
+            if self.clock.ping_due(now):
+                self.send(protocol.encode_ping(now))
+
+            await asyncio.sleep(interval - (time.monotonic() - now) % interval)
+
+
+async def run_bots(host, port, indices, rooms, duration, send_rate, ramp, seed, dictionary=None, max_speed=MAX_SPEED):
+    """
+    Run a group of bots on the current event loop.
+
+    Args:
+        host: Server address.
+        port: Server UDP port.
+        indices: Numbers of the bots of this group.
+        rooms: Number of rooms the bots are spread over.
+        duration: Seconds each bot plays.
+        send_rate: Positions sent per second by each bot.
+        ramp: Seconds over which the bots start, to avoid a join burst.
+        seed: Seed of the group's random generator.
+        dictionary: Compression dictionary offered to the server, or None.
+        max_speed: Upper bound of the bots' speeds, in m/s.
+
+    Returns:
+        BotStats: The group's measurements.
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    stats = BotStats()
+    bots = []
+    for i in indices:
+        room = protocol.DEFAULT_ROOM if rooms <= 1 else f"bench-{i % rooms}"
+        bot = Bot(i, room, PATTERNS[i % len(PATTERNS)], rng, stats, dictionary, max_speed)
+        await loop.create_datagram_endpoint(lambda b=bot: b, remote_addr=(host, port))
+        bots.append(bot)
+    stats.bots = len(bots)
+
+    async def delayed(bot, delay):
+        await asyncio.sleep(delay)
+        await bot.run(duration, send_rate)
+
+    start = time.monotonic()
+    await asyncio.gather(*(delayed(bot, ramp * n / max(1, len(bots))) for n, bot in enumerate(bots)))
+    stats.duration = time.monotonic() - start
+
+    # Chaque bot se retire lui-même, par son id d'entité
+    for bot in bots:
+        if bot.entity_id is not None:
+            bot.reliable.send(protocol.encode_remove_player(bot.entity_id))
+            for packet in bot.reliable.poll():
+                bot.send(packet)
+    await asyncio.sleep(0.1)
+    for bot in bots:
+        bot.transport.close()
+    return stats
+
+
+def _process_main(host, port, indices, rooms, duration, send_rate, ramp, seed, dictionary, max_speed, results):
+    stats = asyncio.run(run_bots(host, port, indices, rooms, duration, send_rate, ramp, seed, dictionary, max_speed))
+    results.put(stats)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_report(stats, send_rate):
+    """Print the merged measurements of every process."""
+    elapsed = max(stats.duration, 1e-6)
+    print(f"🤖 {stats.bots} bots | {stats.joined} connectés | {stats.duration:.1f} s")
+    print(f"📤 {stats.datagrams_out / elapsed:.0f} paquets/s envoyés (cible {stats.bots * send_rate})")
+    print(f"📥 {stats.datagrams_in / elapsed:.0f} paquets/s reçus | {stats.bytes_in / elapsed / 1024:.1f} Kio/s"
+          f" | {stats.snapshots / elapsed / max(1, stats.joined):.1f} snapshots/s par bot | {stats.stale} rejetés")
+    if stats.compressed_in:
+        print(f"🗜️ {stats.compressed_in / max(1, stats.datagrams_in):.0%} des datagrammes reçus compressés")
+    print(f"🧭 {stats.corrections} corrections de position par le serveur")
+    for label, values in (("position → snapshot", stats.latencies),
+                          ("door_toggle → door_sync", stats.door_latencies),
+                          ("join → premier snapshot", stats.join_times),
+                          ("ping → pong", stats.ping_rtts),
+                          ("tick serveur → snapshot reçu", stats.snapshot_delays)):
+        print(f"⏱️ {label} : p50 {_percentile(values, 0.50) * 1000:.1f} ms | p95 {_percentile(values, 0.95) * 1000:.1f} ms"
+              f" | p99 {_percentile(values, 0.99) * 1000:.1f} ms | {len(values)} mesures")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Générateur de charge : bots sans affichage")
+    parser.add_argument("--host", default="127.0.0.1", help="adresse du serveur (défaut : 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9999, help="port UDP du serveur (défaut : 9999)")
+    parser.add_argument("--bots", type=int, default=100, help="nombre de bots (défaut : 100)")
+    parser.add_argument("--processes", type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                        help="processus générateurs (défaut : moitié des cœurs)")
+    parser.add_argument("--rooms", type=int, default=1, help="salles sur lesquelles répartir les bots (défaut : 1)")
+    parser.add_argument("--duration", type=float, default=30.0, help="durée du test en secondes (défaut : 30)")
+    parser.add_argument("--send-rate", type=int, default=SEND_RATE, help=f"positions/s par bot (défaut : {SEND_RATE})")
+    parser.add_argument("--ramp", type=float, default=2.0, help="secondes pour démarrer tous les bots (défaut : 2)")
+    parser.add_argument("--seed", type=int, default=0, help="graine des trajectoires (défaut : 0)")
+    parser.add_argument("--speed", type=float, default=MAX_SPEED,
+                        help=f"vitesse maximale des bots en m/s, corrigée par le serveur au-delà de {MAX_SPEED} (défaut : {MAX_SPEED})")
+    parser.add_argument("--compress", action="store_true", help="demande la compression des datagrammes au serveur")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    processes = max(1, min(args.processes, args.bots))
+    results = multiprocessing.Queue()
+    dictionary = load_dictionary() if args.compress else None
+    if args.compress and not dictionary:
+        print("⚠️ Dictionnaire de compression introuvable : datagrammes non compressés.")
+    workers = [
+        multiprocessing.Process(target=_process_main, args=(
+            args.host, args.port, range(p, args.bots, processes), args.rooms,
+            args.duration, args.send_rate, args.ramp, args.seed + p, dictionary, args.speed, results,
+        ))
+        for p in range(processes)
+    ]
+    print(f"🚀 {args.bots} bots sur {processes} processus vers {args.host}:{args.port}")
+    for worker in workers:
+        worker.start()
+    total = BotStats()
+    for _ in workers:
+        total.merge(results.get())
+    for worker in workers:
+        worker.join()
+    print_report(total, args.send_rate)
@@ -0,0 +1,57 @@
+"""
+Relay process: serves part of the clients of a serveur.py instance and builds
+their snapshots, so the fan-out of a big session is split across processes or
+machines. Clients connect to a relay exactly as they would to the server.
+
+The server only accepts the relays it is told about: each relay talks to it
+from a fixed --upstream-port, and that address is given to serveur.py --relay.
+
+Exemple (deux relais locaux devant un serveur sur le port 9999) :
+    python serveur.py --port 9999 --relay 127.0.0.1:9201 --relay 127.0.0.1:9202
+    python relay.py --server 127.0.0.1:9999 --port 9101 --upstream-port 9201
+    python relay.py --server 127.0.0.1:9999 --port 9102 --upstream-port 9202
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import argparse
+import asyncio
+import sys
+
+from serveur import HOST, TICK_RATE, CLIENT_TIMEOUT, STATS_INTERVAL
+from Assets.modules.network.relay import Relay
+from Assets.modules.network.ratelimit import DEFAULT_RATE
+from Assets.modules.network.compression import DICTIONARY_PATH, COMPRESS_THRESHOLD, load_dictionary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Relais de snapshots devant un serveur de Partypooper's missions")
+    parser.add_argument("--server", metavar="IP:PORT", required=True, help="serveur autoritaire à relayer")
+    parser.add_argument("--port", type=int, required=True, help="port UDP ouvert aux clients")
+    parser.add_argument("--upstream-port", type=int, required=True,
+                        help="port UDP d'où le relais parle au serveur (à autoriser avec serveur.py --relay)")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help=f"tick rate du serveur (défaut : {TICK_RATE})")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE,
+                        help=f"paquets/s acceptés par client, 0 pour désactiver (défaut : {DEFAULT_RATE:.0f})")
+    parser.add_argument("--dictionary", metavar="FICHIER", default=DICTIONARY_PATH,
+                        help="dictionnaire de compression, le même que celui du serveur")
+    parser.add_argument("--no-compression", action="store_true", help="n'envoie jamais de datagramme compressé")
+    parser.add_argument("--compress-threshold", type=int, default=COMPRESS_THRESHOLD,
+                        help=f"taille en octets à partir de laquelle un datagramme est compressé (défaut : {COMPRESS_THRESHOLD})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    host, port = args.server.rsplit(":", 1)
+    dictionary = None if args.no_compression else load_dictionary(args.dictionary)
+    relay = Relay(HOST, args.port, (host, int(port)), tick_rate=args.tick_rate, client_timeout=CLIENT_TIMEOUT,
+                  stats_interval=STATS_INTERVAL, rate_limit=args.rate_limit, dictionary=dictionary,
+                  compress_threshold=args.compress_threshold, upstream_port=args.upstream_port)
+    print(f"🛰️ Relais sur le port {args.port} vers {host}:{port}. Ctrl+C pour quitter.")
+    try:
+        asyncio.run(relay.serve())
+    except KeyboardInterrupt:
+        print("🔴 Relais arrêté.")
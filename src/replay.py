@@ -0,0 +1,283 @@
+"""
+Replays a packet log recorded with serveur.py --record, faster than real time.
+
+server : the datagrams received by the server are fed to an in-process
+GameServer running on a virtual clock; each room ticks at the recorded tick
+rate between two packets, so a run is deterministic and its output digest
+can be compared between two versions of the server.
+
+client : the datagrams sent to one client are fed to a headless client
+(reassembly, delta snapshots, reliable channel) to benchmark or debug the
+client side of the snapshot and door paths.
+
+Exemple : python replay.py server session.log
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import argparse
+import collections
+import hashlib
+import sys
+import time
+
+from serveur import TICK_RATE, CLIENT_TIMEOUT, PFS_PATH, relay_address
+from Assets.modules.network import protocol
+from Assets.modules.network.compression import DICTIONARY_PATH, PacketDecompressor, load_dictionary
+from Assets.modules.network.server import GameServer
+from Assets.modules.network.recorder import read_records, DIRECTION_OUT
+from Assets.modules.network.reliable import ReliableChannel
+from Assets.modules.network.snapshot import SnapshotReceiver
+from Assets.modules.network.transport import Reassembler
+
+EXPIRE_INTERVAL = 1.0  # comme GameServer
+
+
+class VirtualClock:
+    """
+    Clock of the replayed server, moved forward by the replay loop.
+    """
+
+    def __init__(self):
+        """Start the clock at 0."""
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CaptureTransport:
+    """
+    Stands for the server socket: counts and digests what would be sent.
+    """
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.packets = 0
+        self.bytes = 0
+        self.digest = hashlib.sha256()
+        self.dropped = 0  # comme DatagramSocket
+
+    def sendto(self, packet, addr):
+        self.packets += 1
+        self.bytes += len(packet)
+        self.digest.update(f"{addr[0]}:{addr[1]}|{len(packet)}|".encode("ascii"))
+        self.digest.update(packet)
+
+
+def replay_server(records, tick_rate, pfs_path=None, enemy_count=0, dictionary=None, relays=()):
+    """
+    Feed the received datagrams of a log to a GameServer on a virtual clock.
+
+    Args:
+        records: The (time, direction, addr, payload) records of the log.
+        tick_rate: Tick rate of the recorded server.
+        pfs_path: Navgraph of the recorded server's enemies.
+        enemy_count: Enemies per room of the recorded server.
+        dictionary: Compression dictionary of the recorded server, or None.
+        relays: Relay addresses the recorded server allowed.
+
+    Returns:
+        dict: Counters of the replay.
+    """
+    clock = VirtualClock()
+    server = GameServer(tick_rate=tick_rate, client_timeout=CLIENT_TIMEOUT, expire_interval=EXPIRE_INTERVAL,
+                        stats_interval=0, clock=clock, manual_tick=True, pfs_path=pfs_path, enemy_count=enemy_count,
+                        session_seed=0, dictionary=dictionary, relays=relays)
+    server.transport = capture = CaptureTransport()
+    interval = 1.0 / tick_rate
+    next_ticks = {}  # { Room: prochaine tick }
+    next_expire = EXPIRE_INTERVAL
+    tick_durations = []
+    recorded_out = [0, 0]
+    duration = 0.0
+
+    def run_until(t):
+        nonlocal next_expire
+        while True:
+            room, next_tick = min(next_ticks.items(), key=lambda item: item[1], default=(None, float("inf")))
+            if min(next_tick, next_expire) > t:
+                return
+            if next_expire <= next_tick:
+                clock.now = next_expire
+                server.remove_inactive_clients()
+                server.reassembler.expire(clock.now)
+                next_expire += EXPIRE_INTERVAL
+            else:
+                clock.now = next_tick
+                start = time.perf_counter()
+                room.tick()
+                elapsed = time.perf_counter() - start
+                room.tick_stats.record(elapsed)
+                tick_durations.append(elapsed)
+                next_ticks[room] = next_tick + interval
+            # Les salles libérées ne tickent plus
+            for gone in [r for r in next_ticks if server.rooms.get(r.name) is not r]:
+                del next_ticks[gone]
+
+    start = time.perf_counter()
+    for t, direction, addr, data in records:
+        duration = t
+        if direction == DIRECTION_OUT:
+            recorded_out[0] += 1
+            recorded_out[1] += len(data)
+            continue
+        run_until(t)
+        clock.now = t
+        server.handle_datagram(data, addr)
+        # Une salle créée par ce paquet fait sa première tick tout de suite, comme en direct
+        for room in server.rooms.values():
+            next_ticks.setdefault(room, t)
+    run_until(duration)
+    wall = time.perf_counter() - start
+
+    ticks = len(tick_durations)
+    return {
+        "duration": duration,
+        "wall": wall,
+        "packets_in": server.stats.packets_in,
+        "packets_out": capture.packets,
+        "bytes_out": capture.bytes,
+        "recorded_packets_out": recorded_out[0],
+        "recorded_bytes_out": recorded_out[1],
+        "ticks": ticks,
+        "tick_mean": sum(tick_durations) / ticks if ticks else 0.0,
+        "tick_max": max(tick_durations, default=0.0),
+        "digest": capture.digest.hexdigest(),
+    }
+
+
+class HeadlessClient:
+    """
+    Client-side decoding path of NetworkManager, without Panda3D.
+    """
+
+    def __init__(self, dictionary=None):
+        """
+        Initialize the client state.
+
+        Args:
+            dictionary: Compression dictionary, or None if the client did not
+                ask for compression.
+        """
+        self.quantizer = protocol.Quantizer(protocol.DEFAULT_BOUNDS)
+        self.reassembler = Reassembler(decompressor=PacketDecompressor(dictionary) if dictionary else None)
+        self.snapshots = SnapshotReceiver()
+        self.reliable = ReliableChannel()
+        self.counts = collections.Counter()
+        self.doors = {}
+        self.max_entities = 0
+
+    def feed(self, data, addr, now):
+        """
+        Process one datagram received from the server.
+
+        Args:
+            data: The raw datagram.
+            addr: The server address.
+            now: Time of reception.
+        """
+        for message in self.reassembler.feed(data, addr):
+            try:
+                msg = protocol.decode(message, self.quantizer)
+            except protocol.ProtocolError:
+                self.counts["invalid"] += 1
+                continue
+            msg_type = msg.get("type")
+            self.counts[msg_type] += 1
+            if msg_type == "snapshot":
+                state = self.snapshots.apply(msg)
+                if state is None:
+                    self.counts["snapshot_rejected"] += 1
+                else:
+                    self.max_entities = max(self.max_entities, len(state[0]))
+            elif msg_type == "reliable":
+                for payload, _ in self.reliable.receive(msg["seq"], msg["age"], msg["message"], now):
+                    event = protocol.decode(payload, self.quantizer)
+                    self.counts[f"reliable_{event['type']}"] += 1
+                    if event["type"] == "door_sync":
+                        self.doors[event["door_id"]] = event["state"]
+
+
+def replay_client(records, client_addr, dictionary=None):
+    """
+    Feed the datagrams sent to one client to a HeadlessClient.
+
+    Args:
+        records: The (time, direction, addr, payload) records of the log.
+        client_addr: The (ip, port) of the client to replay, or None for the
+            one that received the most datagrams.
+        dictionary: Compression dictionary of the recorded server, or None.
+
+    Returns:
+        dict: Counters of the replay.
+    """
+    records = list(records)
+    if client_addr is None:
+        destinations = collections.Counter(addr for _, direction, addr, _ in records if direction == DIRECTION_OUT)
+        if not destinations:
+            raise ValueError("aucun paquet envoyé dans le journal")
+        client_addr = destinations.most_common(1)[0][0]
+
+    client = HeadlessClient(dictionary)
+    datagrams = 0
+    size = 0
+    duration = records[-1][0] if records else 0.0
+    start = time.perf_counter()
+    for t, direction, addr, data in records:
+        if direction == DIRECTION_OUT and addr == client_addr:
+            client.feed(data, addr, t)
+            datagrams += 1
+            size += len(data)
+    wall = time.perf_counter() - start
+    return {
+        "client": client_addr,
+        "duration": duration,
+        "wall": wall,
+        "datagrams": datagrams,
+        "bytes": size,
+        "messages": dict(client.counts),
+        "max_entities": client.max_entities,
+        "doors": client.doors,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rejoue un journal de paquets enregistré par serveur.py --record")
+    parser.add_argument("mode", choices=("server", "client"), help="rejouer côté serveur ou côté client")
+    parser.add_argument("log", help="fichier enregistré")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help=f"tick rate du serveur enregistré (défaut : {TICK_RATE})")
+    parser.add_argument("--pfs", metavar="FICHIER", default=PFS_PATH, help=f"graphe de navigation des ennemis (défaut : {PFS_PATH})")
+    parser.add_argument("--enemies", type=int, default=0, help="ennemis par salle du serveur enregistré (défaut : 0)")
+    parser.add_argument("--dictionary", metavar="FICHIER", default=DICTIONARY_PATH,
+                        help=f"dictionnaire de compression du serveur enregistré (défaut : {DICTIONARY_PATH})")
+    parser.add_argument("--no-compression", action="store_true", help="le serveur enregistré ne compressait pas")
+    parser.add_argument("--client", metavar="IP:PORT", help="client à rejouer (défaut : celui qui a reçu le plus de paquets)")
+    parser.add_argument("--relay", metavar="IP:PORT", type=relay_address, action="append", default=[],
+                        help="relais autorisé par le serveur enregistré (répétable)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    records = read_records(args.log)
+    dictionary = None if args.no_compression else load_dictionary(args.dictionary)
+    if args.mode == "server":
+        r = replay_server(records, args.tick_rate, args.pfs, max(0, args.enemies), dictionary, args.relay)
+        print(f"⏩ {r['duration']:.1f} s rejouées en {r['wall']:.2f} s (x{r['duration'] / max(r['wall'], 1e-9):.0f})")
+        print(f"📥 {r['packets_in']} paquets reçus | 📤 {r['packets_out']} paquets, {r['bytes_out']} octets envoyés"
+              f" (enregistrés : {r['recorded_packets_out']} paquets, {r['recorded_bytes_out']} octets)")
+        print(f"⏲️ {r['ticks']} ticks | moy {r['tick_mean'] * 1000:.3f} ms | max {r['tick_max'] * 1000:.3f} ms")
+        print(f"🔑 empreinte des envois : {r['digest']}")
+    else:
+        client_addr = None
+        if args.client:
+            host, port = args.client.rsplit(":", 1)
+            client_addr = (host, int(port))
+        r = replay_client(records, client_addr, dictionary)
+        print(f"⏩ client {r['client'][0]}:{r['client'][1]} | {r['datagrams']} datagrammes, {r['bytes']} octets"
+              f" | {r['duration']:.1f} s rejouées en {r['wall']:.3f} s")
+        print(f"📨 {r['messages']}")
+        print(f"👥 {r['max_entities']} entités visibles au maximum | 🚪 portes : {r['doors']}")
@@ -1,144 +1,98 @@
 __license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet. (exception unique de ce fichier : seule la distribution non commerciale dans le domaine public est autorisée)"
 __author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
 
+import argparse
+import asyncio
 import socket
-import threading
-import json
-import time
 import sys
-sys.stdout.reconfigure(encoding='utf-8')
 
 from Assets.utils import get_local_ip
+from Assets.modules.network.server import GameServer
+from Assets.modules.network.cluster import run_cluster
+from Assets.modules.network.ratelimit import DEFAULT_RATE
+from Assets.modules.network.compression import DICTIONARY_PATH, COMPRESS_THRESHOLD, load_dictionary
 
 HOST = "0.0.0.0"
-PORT = int(input("Entrez le port du serveur entre 3000 et 9999 (ex: 9999): ") or "9999")
-
-clients = {}  # { (ip, port): {"x": , "y": , "z": , "player": str, "model": str, "last_seen": timestamp} }
-door_states = {}  # { door_id: True/False }
+TICK_RATE = 30  # snapshots par seconde envoyés à chaque client (20, 30 ou 60)
 CLIENT_TIMEOUT = 10  # secondes avant qu’un client soit considéré inactif
-PING_INTERVAL = 10    # fréquence de ping automatique
-
-
-def remove_inactive_clients():
-    now = time.time()
-    inactive = [c for c, d in clients.items() if now - d["last_seen"] > CLIENT_TIMEOUT]
-    for c in inactive:
-        print(f"⏱️ Client {clients[c].get('player', c)} inactif, supprimé.")
-        del clients[c]
-
-def broadcast_packet(sock, packet):
-    """Envoi le packet à tous les clients, gestion des clients déco"""
-    for c_addr in list(clients.keys()):
-        try:
-            sock.sendto(packet, c_addr)
-        except OSError as e:
-            if e.errno == 10054:
-                print(f"⚠️ Client injoignable: {c_addr}, supprimé.")
-                clients.pop(c_addr, None)
-            else:
-                print("Erreur envoi:", e)
-
-def handle_clients(sock):
-    print(f"✅ Serveur prêt sur {HOST}:{PORT}")
-    while True:
-        try:
-            data, addr = sock.recvfrom(2048)
-            msg = json.loads(data.decode())
-
-            # --- MESSAGE PORTE ---
-            if msg.get("type") == "door_toggle":
-                door_id = msg["door_id"]
-                state = msg["state"]
-                door_states[door_id] = state
-
-                packet = json.dumps({
-                    "type": "door_sync",
-                    "door_id": door_id,
-                    "state": state
-                }).encode()
-
-                broadcast_packet(sock, packet)
-                continue
-
-            # --- MESSAGE POSITIONS ---
-            if msg.get("type") == "pos":
-                clients[addr] = {
-                    "x": msg["x"],
-                    "y": msg["y"],
-                    "z": msg["z"],
-                    "player": msg.get("player", "Player"),
-                    "model": msg.get("model", "default"),
-                    "last_seen": time.time()
-                }
-
-
-            # --- MESSAGE DEMANDE SUPPRESSION ---
-            if msg.get("type") == "remove_player":
-                target_player = msg.get("player")
-                removed = False
-                for c, data in list(clients.items()):
-                    if data.get("player") == target_player:
-                        del clients[c]
-                        removed = True
-                        print(f"❌ Joueur {target_player} supprimé à la demande.")
-                if removed:
-                    continue
+STATS_INTERVAL = 10  # fréquence d'affichage des paquets/s
+PFS_PATH = "Assets/levels/terrain/files/pfs/ter.pfs"  # graphe de navigation du niveau
 
-            # Nettoyer les clients inactifs
-            remove_inactive_clients()
-
-            # Préparer la liste des autres joueurs
-            others = []
-            for c_addr, c_data in clients.items():
-                others.append({
-                    "id": f"{c_addr[0]}:{c_addr[1]}",
-                    "player": c_data["player"],
-                    "model": c_data["model"],
-                    "x": c_data["x"],
-                    "y": c_data["y"],
-                    "z": c_data["z"]
-                })
-
-            # Envoyer la liste à tous les clients
-            # Envoyer la liste à tous les clients, inclure l'état des portes
-            packet = json.dumps({
-                "type": "players",
-                "players": others,
-                "doors": door_states  # dictionnaire { door_id: True/False }
-            }).encode()
-            broadcast_packet(sock, packet)
-
-
-            broadcast_packet(sock, packet)
-
-        except json.JSONDecodeError:
-            print("⚠️ Paquet non valide reçu.")
-        except Exception as e:
-            print("Erreur réception:", e)
-
-def ping_clients(sock):
-    """Ping régulier pour détecter clients inactifs"""
-    while True:
-        time.sleep(PING_INTERVAL)
-        now = time.time()
-        for c_addr in list(clients.keys()):
-            if now - clients[c_addr]["last_seen"] > CLIENT_TIMEOUT:
-                print(f"⏱️ Client {clients[c_addr].get('player')} timeout, supprimé.")
-                clients.pop(c_addr, None)
-
-def start_server():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((HOST, PORT))
 
+def start_server(port, workers=1, tick_rate=TICK_RATE, metrics_port=None, metrics_file=None, record_path=None,
+                 rate_limit=DEFAULT_RATE, pfs_path=None, enemy_count=0, ai_workers=None, dictionary_path=DICTIONARY_PATH,
+                 compress_threshold=COMPRESS_THRESHOLD, relays=()):
     local_ip = get_local_ip()
-    print(f"✅ Serveur prêt sur {local_ip}:{PORT} (IP locale)")
-
-    threading.Thread(target=handle_clients, args=(sock,), daemon=True).start()
-    threading.Thread(target=ping_clients, args=(sock,), daemon=True).start()
-
+    print(f"✅ Serveur prêt sur {local_ip}:{port} (IP locale)")
     print("🟢 Serveur démarré. Ctrl+C pour quitter.")
-    while True:
-        time.sleep(1)
+
+    dictionary = load_dictionary(dictionary_path) if dictionary_path else None
+    if dictionary:
+        print(f"🗜️ Compression proposée aux clients au-delà de {compress_threshold} octets ({dictionary_path})")
+    elif dictionary_path:
+        print(f"⚠️ Dictionnaire {dictionary_path} introuvable : pas de compression.")
+
+    options = {"tick_rate": tick_rate, "client_timeout": CLIENT_TIMEOUT,
+               "metrics_port": metrics_port, "metrics_file": metrics_file, "record_path": record_path,
+               "rate_limit": rate_limit, "pfs_path": pfs_path, "enemy_count": enemy_count, "ai_workers": ai_workers,
+               "dictionary": dictionary, "compress_threshold": compress_threshold, "relays": relays}
+    for relay_host, relay_port in relays:
+        print(f"🛰️ Relais autorisé depuis {relay_host}:{relay_port}")
+    if record_path:
+        print(f"⏺️ Paquets enregistrés dans {record_path}" + (" (.0, .1, … par worker)" if workers > 1 else ""))
+    try:
+        if workers > 1:
+            # Un processus par cœur ; chaque salle est routée vers un seul worker
+            print(f"🧩 {workers} workers sur les ports {port + 1} à {port + workers} (loopback)")
+            run_cluster(HOST, port, workers, server_options=options, stats_interval=STATS_INTERVAL)
+        else:
+            server = GameServer(HOST, port, stats_interval=STATS_INTERVAL, **options)
+            asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("🔴 Serveur arrêté.")
+
+
+def relay_address(text):
+    # Le serveur compare l'adresse source des datagrammes : le nom est résolu une fois ici
+    host, _, port = text.rpartition(":")
+    try:
+        return socket.gethostbyname(host), int(port)
+    except (OSError, ValueError):
+        raise argparse.ArgumentTypeError(f"adresse de relais invalide : {text!r} (attendu IP:PORT)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serveur multijoueur de Partypooper's missions")
+    parser.add_argument("--port", type=int, help="port UDP du serveur (demandé si absent)")
+    parser.add_argument("--workers", type=int, default=1, help="nombre de processus serveur (défaut : 1)")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help=f"snapshots par seconde (défaut : {TICK_RATE})")
+    parser.add_argument("--metrics-port", type=int, help="port HTTP local des métriques (un par worker à partir de celui-ci)")
+    parser.add_argument("--metrics-file", help="fichier où écrire les métriques toutes les 10 s et à l'arrêt")
+    parser.add_argument("--record", metavar="FICHIER", help="enregistre tous les paquets reçus et envoyés (rejouables avec replay.py)")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE,
+                        help=f"paquets/s acceptés par adresse, 0 pour désactiver (défaut : {DEFAULT_RATE:.0f})")
+    parser.add_argument("--pfs", metavar="FICHIER", default=PFS_PATH, help=f"graphe de navigation des ennemis (défaut : {PFS_PATH})")
+    parser.add_argument("--enemies", type=int, default=0, help="ennemis simulés par le serveur dans chaque salle (défaut : 0)")
+    parser.add_argument("--ai-workers", type=int, help="processus de calcul des chemins des ennemis (défaut : un par cœur)")
+    parser.add_argument("--dictionary", metavar="FICHIER", default=DICTIONARY_PATH,
+                        help="dictionnaire de compression des datagrammes (voir train_dictionary.py)")
+    parser.add_argument("--no-compression", action="store_true", help="n'accepte pas la compression demandée par les clients")
+    parser.add_argument("--compress-threshold", type=int, default=COMPRESS_THRESHOLD,
+                        help=f"taille en octets à partir de laquelle un datagramme est compressé (défaut : {COMPRESS_THRESHOLD})")
+    parser.add_argument("--relay", metavar="IP:PORT", type=relay_address, action="append", default=[],
+                        help="relais autorisé, depuis son --upstream-port (répétable ; pas avec --workers)")
+    args = parser.parse_args()
+    if args.relay and args.workers > 1:
+        # Le routeur ne voit que le relais, pas les salles de ses clients : elles seraient coupées en deux
+        parser.error("--relay ne fonctionne pas avec --workers : lancez un serveur à un seul processus")
+    return args
 
 if __name__ == "__main__":
-    start_server()
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    PORT = args.port or int(input("Entrez le port du serveur entre 3000 et 9999 (ex: 9999): ") or "9999")
+    start_server(PORT, workers=max(1, args.workers), tick_rate=args.tick_rate,
+                 metrics_port=args.metrics_port, metrics_file=args.metrics_file, record_path=args.record,
+                 rate_limit=args.rate_limit, pfs_path=args.pfs, enemy_count=max(0, args.enemies),
+                 ai_workers=args.ai_workers, dictionary_path=None if args.no_compression else args.dictionary,
+                 compress_threshold=args.compress_threshold, relays=args.relay)
@@ -23,6 +23,7 @@ setup(
                 "Assets/player/**/*",
                 "Assets/player/**/**/*",
                 "Assets/modules/pathfinding/*",
+                "Assets/modules/network/*",
                 "Assets/main_ui/*",
                 "Assets/shader/VHS/*",
                 "Assets/music/*.mp3",
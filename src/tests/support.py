@@ -0,0 +1,55 @@
+"""
+Shared fixtures of the server tests: a GameServer on a virtual clock, without a socket.
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+from Assets.modules.network.server import GameServer
+
+
+class VirtualClock:
+    """
+    Server clock moved forward by the test.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SentTransport:
+    """
+    Stands for the server socket: keeps every packet sent.
+    """
+
+    def __init__(self):
+        self.sent = []  # [(paquet, adresse)]
+
+    def sendto(self, packet, addr):
+        self.sent.append((bytes(packet), addr))
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def take(self, addr=None):
+        """Return and forget the packets sent (to one address if given)."""
+        taken = [packet for packet, to in self.sent if addr is None or to == addr]
+        self.sent = [(packet, to) for packet, to in self.sent if addr is not None and to != addr]
+        return taken
+
+
+def make_server(**options):
+    """
+    Build a GameServer ticked by hand on a virtual clock.
+
+    Returns:
+        tuple: (server, clock, transport).
+    """
+    clock = VirtualClock()
+    options.setdefault("client_timeout", 10.0)
+    server = GameServer(tick_rate=30, stats_interval=0, clock=clock, manual_tick=True, session_seed=0, **options)
+    server.transport = SentTransport()
+    return server, clock, server.transport
@@ -0,0 +1,109 @@
+"""
+Tests of the connect/accept handshake: session tokens, resumes and relayed clients.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.transport import Reassembler
+from tests.support import make_server
+
+A = ("10.0.0.1", 1000)
+B = ("10.0.0.2", 2000)
+RELAY = ("10.0.0.9", 7000)
+
+
+class HandshakeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.clock, self.transport = make_server(relays=(RELAY,))
+        self.quantizer = protocol.Quantizer()
+
+    def received(self, addr):
+        """Decoded messages sent to an address since the last call."""
+        reassembler = Reassembler()
+        return [protocol.decode(m, self.quantizer) for p in self.transport.take(addr) for m in reassembler.feed(p, addr)]
+
+    def connect(self, addr, token=0, player="bob", room="r"):
+        self.server.handle_datagram(protocol.encode_connect(room, player, token), addr)
+        (accept,) = self.received(addr)
+        self.assertEqual(accept["type"], "accept")
+        return accept
+
+    def test_connect_opens_a_session(self):
+        accept = self.connect(A)
+        client = self.server.clients.get(A)
+        self.assertNotEqual(accept["token"], 0)
+        self.assertEqual((accept["token"], accept["id"]), (client.token, client.entity_id))
+        self.assertEqual((client.player, client.room.name), ("bob", "r"))
+        self.assertEqual(accept["dictionary"], 0)  # pas de compression sans dictionnaire
+
+    def test_repeated_connect_gets_the_same_session(self):
+        first = self.connect(A)
+        self.assertEqual(self.connect(A), first)  # accept perdu, connect renvoyé
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_token_resumes_from_a_new_address(self):
+        first = self.connect(A)
+        self.clock.now += 3.0
+        resumed = self.connect(B, token=first["token"], room="s")
+        self.assertEqual(resumed, first)
+        client = self.server.clients.get(B)
+        self.assertNotIn(A, self.server.clients)
+        self.assertEqual((client.addr, client.room.name, client.last_seen), (B, "s", 3.0))
+        self.assertNotIn("r", self.server.rooms)
+
+    def test_unknown_token_opens_a_new_session(self):
+        first = self.connect(A)
+        for token in (0, first["token"] ^ 1):
+            with self.subTest(token=token):
+                other = self.connect(B, token=token)
+                self.assertNotEqual(other["id"], first["id"])
+                self.assertNotEqual(other["token"], first["token"])
+                self.server.remove_client(B)
+        self.assertIs(self.server.clients.by_session(first["token"]).addr, A)
+
+    def test_resume_onto_a_taken_address_drops_its_stale_owner(self):
+        first = self.connect(A)
+        stale = self.connect(B, player="alice")
+        self.connect(B, token=first["token"])
+        self.assertEqual(len(self.server.clients), 1)
+        self.assertEqual(self.server.clients.get(B).entity_id, first["id"])
+        self.assertIsNone(self.server.clients.by_session(stale["token"]))
+        self.assertEqual(self.server.clients.named("alice"), [])
+
+    def test_unknown_binary_client_is_asked_to_reconnect(self):
+        messages = (
+            protocol.encode_pos(self.quantizer, 1, 2, 3),
+            protocol.encode_input(self.quantizer, 1, 0.03, 1, 2, 3),
+            protocol.encode_join("r"),
+        )
+        for message in messages:
+            with self.subTest(type=message[2]):
+                self.server.handle_datagram(message, A)
+                self.assertEqual(self.received(A), [{"type": "reconnect"}])
+        self.server.handle_datagram(protocol.encode_ping(1.0), A)
+        self.assertEqual(self.received(A), [])  # pas de réponse à une adresse inconnue
+        self.assertEqual(len(self.server.clients), 0)
+
+    def test_relayed_connect(self):
+        self.server.handle_datagram(protocol.encode_relayed(3, protocol.encode_connect("r", "bob")), RELAY)
+        (wrapper,) = self.received(RELAY)
+        self.assertEqual((wrapper["type"], wrapper["slot"]), ("relayed", 3))
+        accept = protocol.decode(wrapper["message"], self.quantizer)
+        client = self.server.clients.by_session(accept["token"])
+        self.assertEqual((client.addr, client.relay, client.slot), (RELAY + (3,), RELAY, 3))
+
+    def test_untrusted_relay_is_ignored(self):
+        self.server.handle_datagram(protocol.encode_relayed(3, protocol.encode_connect("r", "bob")), B)
+        self.assertEqual(self.received(B), [])
+        self.assertEqual(len(self.server.clients), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests of the client jitter buffer: interpolation, capped extrapolation and sample filtering.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+import numpy as np
+
+from Assets.modules.network.interpolation import JitterBuffer
+
+
+class JitterBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = JitterBuffer(samples=4, capacity=4, max_extrapolation=0.25, repeat_interval=0.2)
+
+    def push(self, time, positions):
+        """Push a snapshot given as { entity_id: (x, y, z) }."""
+        self.buffer.push(time, list(positions), list(positions.values()))
+
+    def assertSampled(self, time, expected):
+        ids = list(expected)
+        np.testing.assert_allclose(self.buffer.sample(time, ids), list(expected.values()), atol=1e-5)
+
+    def test_interpolates_between_samples(self):
+        self.push(0.0, {0: (0, 0, 0), 1: (5, 5, 5)})
+        self.push(1.0, {0: (10, 0, -2), 1: (5, 5, 6)})
+        self.assertSampled(0.5, {0: (5, 0, -1), 1: (5, 5, 5.5)})
+        self.assertSampled(1.0, {0: (10, 0, -2), 1: (5, 5, 6)})
+
+    def test_holds_before_the_oldest_sample(self):
+        self.push(1.0, {0: (1, 0, 0)})
+        self.assertSampled(0.0, {0: (1, 0, 0)})  # un seul échantillon
+        self.push(2.0, {0: (2, 0, 0)})
+        self.assertSampled(0.5, {0: (1, 0, 0)})
+
+    def test_extrapolation_is_capped(self):
+        self.push(0.0, {0: (0, 0, 0)})
+        self.push(0.1, {0: (1, 0, 0)})
+        self.assertSampled(0.2, {0: (2, 0, 0)})
+        self.assertSampled(5.0, {0: (3.5, 0, 0)})  # 0,25 s au-delà du dernier
+
+    def test_out_of_order_snapshot_is_ignored(self):
+        self.push(1.0, {0: (1, 0, 0)})
+        self.push(2.0, {0: (2, 0, 0)})
+        self.push(1.5, {0: (9, 9, 9)})
+        self.push(2.0, {0: (9, 9, 9)})
+        self.assertSampled(1.5, {0: (1.5, 0, 0)})
+
+    def test_unchanged_position_waits_for_repeat_interval(self):
+        self.push(0.0, {0: (0, 0, 0)})
+        self.push(0.1, {0: (1, 0, 0)})
+        self.push(0.2, {0: (1, 0, 0)})  # répétée par une entité lointaine : ignorée
+        self.assertSampled(0.2, {0: (2, 0, 0)})
+        self.push(0.35, {0: (1, 0, 0)})  # immobile depuis plus de 0,2 s : enregistrée
+        self.assertSampled(0.35, {0: (1, 0, 0)})
+        self.assertSampled(0.5, {0: (1, 0, 0)})
+
+    def test_oldest_samples_are_dropped(self):
+        for n in range(6):
+            self.push(float(n), {0: (n, 0, 0)})
+        np.testing.assert_array_equal(self.buffer.times[0], [2.0, 3.0, 4.0, 5.0])
+        self.assertSampled(0.0, {0: (2, 0, 0)})
+
+    def test_capacity_grows_with_ids(self):
+        self.push(0.0, {1: (1, 1, 1)})
+        self.push(0.0, {100: (2, 2, 2)})
+        self.assertEqual(self.buffer.capacity, 128)
+        self.assertSampled(0.0, {1: (1, 1, 1), 100: (2, 2, 2)})
+
+    def test_remove_and_clear(self):
+        self.push(0.0, {0: (1, 0, 0), 1: (2, 0, 0)})
+        self.buffer.remove(0)
+        self.buffer.remove(1000)  # id jamais vu
+        self.assertTrue(np.isneginf(self.buffer.times[0]).all())
+        self.push(0.0, {0: (3, 0, 0)})  # nouvelle entité au même id
+        self.assertSampled(0.0, {0: (3, 0, 0), 1: (2, 0, 0)})
+        self.buffer.clear()
+        self.assertTrue(np.isneginf(self.buffer.times).all())
+
+    def test_empty_push(self):
+        self.buffer.push(0.0, [], np.zeros((0, 3)))
+        self.assertTrue(np.isneginf(self.buffer.times).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests of the server-side movement check and of the client-side reconciliation.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.movement import (
+    CORRECTION_INTERVAL, MAX_FALL_SPEED, MAX_MOVE_CREDIT, SPEED_TOLERANCE, STEP_HEIGHT, InputHistory, MoveCheck,
+)
+from tests.support import make_server
+
+SPEED = 3.0 * SPEED_TOLERANCE  # vitesse au sol admise
+
+
+class MoveCheckTest(unittest.TestCase):
+
+    def setUp(self):
+        self.check = MoveCheck(max_speed=3.0)
+        self.assertEqual(self.check.apply((0, 0, 0), (5, 5, 5), now=0.0), ((5, 5, 5), False))  # apparition
+
+    def assertMove(self, position, target, now, expected, clamped, dt=None, seq=protocol.NO_SEQ):
+        moved, was_clamped = self.check.apply(position, target, now, dt, seq)
+        for value, wanted in zip(moved, expected):
+            self.assertAlmostEqual(value, wanted)
+        self.assertEqual(was_clamped, clamped)
+
+    def test_legal_move_is_kept(self):
+        self.assertMove((5, 5, 5), (5 + SPEED * 0.1, 5, 5), 0.1, (5 + SPEED * 0.1, 5, 5), False, dt=0.1)
+
+    def test_speeding_is_clamped_on_the_ground_plane(self):
+        self.assertMove((0, 0, 0), (3, 4, 0), 0.1, (0.6 * SPEED * 0.1, 0.8 * SPEED * 0.1, 0), True, dt=0.1)
+
+    def test_inflated_dt_gets_only_the_elapsed_time(self):
+        self.assertMove((0, 0, 0), (SPEED, 0, 0), 0.1, (SPEED * 0.1, 0, 0), True, dt=1.0)
+
+    def test_time_credit_is_capped(self):
+        self.assertMove((0, 0, 0), (100, 0, 0), 60.0, (SPEED * MAX_MOVE_CREDIT, 0, 0), True)
+
+    def test_jump_and_step_are_allowed(self):
+        z = 0.0
+        self.assertMove((0, 0, z), (0, 0, STEP_HEIGHT), 0.01, (0, 0, STEP_HEIGHT), False, dt=0.01)
+        z = STEP_HEIGHT
+        for frame in range(2, 30):  # saut à 4 m/s, 100 images par seconde
+            self.assertMove((0, 0, z), (0, 0, z + 0.04), frame / 100, (0, 0, z + 0.04), False, dt=0.01)
+            z += 0.04
+
+    def test_teleport_up_is_clamped(self):
+        self.assertMove((0, 0, 0), (0, 0, 5), 0.1, (0, 0, STEP_HEIGHT), True, dt=0.1)
+        self.assertMove((0, 0, STEP_HEIGHT), (0, 0, 5), 0.11, (0, 0, STEP_HEIGHT + 0.05), True, dt=0.01)
+
+    def test_fall_speed_is_limited(self):
+        fall = MAX_FALL_SPEED * SPEED_TOLERANCE * 0.1
+        self.assertMove((0, 0, 100), (0, 0, 100 - fall), 0.1, (0, 0, 100 - fall), False, dt=0.1)
+        self.assertMove((0, 0, 100), (0, 0, 0), 0.2, (0, 0, 100 - fall), True, dt=0.1)
+
+    def test_stale_command_is_rejected(self):
+        self.check.apply((0, 0, 0), (0, 0, 0), 0.1, 0.1, seq=5)
+        self.assertIsNone(self.check.apply((0, 0, 0), (0, 0, 0), 0.2, 0.1, seq=5))
+        self.assertIsNone(self.check.apply((0, 0, 0), (0, 0, 0), 0.2, 0.1, seq=4))
+        self.check.apply((0, 0, 0), (0, 0, 0), 0.3)  # position sans numéro : seq gardé
+        self.assertIsNone(self.check.apply((0, 0, 0), (0, 0, 0), 0.4, 0.1, seq=5))
+        self.assertIsNotNone(self.check.apply((0, 0, 0), (0, 0, 0), 0.5, 0.1, seq=6))
+
+    def test_sequence_wraps(self):
+        self.check.apply((0, 0, 0), (0, 0, 0), 0.1, 0.1, seq=protocol.SEQ_MOD - 1)
+        self.assertIsNotNone(self.check.apply((0, 0, 0), (0, 0, 0), 0.2, 0.1, seq=0))
+
+    def test_reset_accepts_the_next_position(self):
+        self.check.apply((0, 0, 0), (0, 0, 0), 0.1, 0.1, seq=5)
+        self.check.reset()
+        self.assertMove((0, 0, 0), (50, 50, 50), 0.2, (50, 50, 50), False, dt=0.1, seq=2)
+
+    def test_corrections_are_rate_limited(self):
+        self.assertTrue(self.check.correction_due(1.0))
+        self.assertFalse(self.check.correction_due(1.0 + CORRECTION_INTERVAL / 2))
+        self.assertTrue(self.check.correction_due(1.0 + CORRECTION_INTERVAL))
+
+
+class InputHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = InputHistory()
+        self.seqs = [self.history.record(x, 0, 0) for x in range(4)]
+
+    def test_correction_replays_pending_commands(self):
+        self.assertEqual(self.seqs, [0, 1, 2, 3])
+        self.assertEqual(self.history.reconcile(1, 0.5, 0, 1), (2.5, 0, 1))
+        self.assertEqual([c[0] for c in self.history.pending], [2, 3])
+        self.history.record(3.5, 0, 1)
+        self.assertEqual(self.history.pending[-1], (4, 1.0, 0, 0))  # depuis la position corrigée
+
+    def test_old_correction_is_ignored(self):
+        self.history.reconcile(2, 2, 0, 0)
+        self.assertIsNone(self.history.reconcile(1, 0, 0, 0))
+        self.assertIsNone(self.history.reconcile(2, 0, 0, 0))
+
+    def test_correction_without_command_drops_the_history(self):
+        self.assertEqual(self.history.reconcile(protocol.NO_SEQ, 7, 7, 7), (7, 7, 7))
+        self.assertEqual(len(self.history.pending), 0)
+
+
+class ServerCorrectionTest(unittest.TestCase):
+
+    def test_speeding_input_is_corrected(self):
+        server, clock, transport = make_server()
+        quantizer = protocol.Quantizer()
+        addr = ("10.0.0.1", 1000)
+        server.handle_datagram(protocol.encode_connect("r", "bob"), addr)
+        server.handle_datagram(protocol.encode_input(quantizer, 0, 0.0, 0, 0, 0), addr)
+        transport.take()
+        clock.now += 0.1
+        server.handle_datagram(protocol.encode_input(quantizer, 1, 0.1, 10, 0, 0), addr)
+        clock.now += 0.01
+        server.handle_datagram(protocol.encode_input(quantizer, 2, 0.01, 20, 0, 0), addr)
+        (correction,) = [protocol.decode(p, quantizer) for p in transport.take(addr)]  # une par intervalle
+        self.assertEqual((correction["type"], correction["seq"]), ("correction", 1))
+        self.assertAlmostEqual(correction["x"], SPEED * 0.1, delta=quantizer.steps[0])
+        self.assertEqual((server.moves_clamped, server.corrections_sent), (2, 1))
+        client = server.clients.get(addr)
+        self.assertAlmostEqual(client.x, SPEED * 0.11, delta=quantizer.steps[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Tests of the binary wire protocol: encode/decode round-trips and malformed packets.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import json
+import unittest
+
+from Assets.modules.network import protocol
+
+
+class QuantizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quantizer = protocol.Quantizer()
+
+    def test_round_trip_within_one_step(self):
+        steps = self.quantizer.steps
+        for position in ((0.0, 0.0, 0.0), (-255.9, 12.25, 31.5), (100.123, -42.5, -7.75)):
+            restored = self.quantizer.dequantize(*self.quantizer.quantize(*position))
+            for value, back, step in zip(position, restored, steps):
+                self.assertLessEqual(abs(value - back), step / 2 + 1e-9)
+
+    def test_clamped_to_bounds(self):
+        self.assertEqual(self.quantizer.quantize(-1e6, -1e6, -1e6), (0, 0, 0))
+        self.assertEqual(self.quantizer.quantize(1e6, 1e6, 1e6), (65535, 65535, 65535))
+
+
+class SeqTest(unittest.TestCase):
+
+    def test_seq_newer_wraps(self):
+        self.assertTrue(protocol.seq_newer(1, 0))
+        self.assertFalse(protocol.seq_newer(0, 1))
+        self.assertFalse(protocol.seq_newer(5, 5))
+        self.assertTrue(protocol.seq_newer(2, protocol.SEQ_MOD - 3))
+        self.assertFalse(protocol.seq_newer(protocol.SEQ_MOD - 3, 2))
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quantizer = protocol.Quantizer()
+
+    def decode(self, data):
+        return protocol.decode(data, self.quantizer)
+
+    def test_pos(self):
+        qpos = self.quantizer.quantize(1.5, -2.0, 3.25)
+        msg = self.decode(protocol.encode_pos(self.quantizer, 1.5, -2.0, 3.25, ack=42))
+        self.assertEqual(msg["type"], "pos")
+        self.assertEqual(msg["ack"], 42)
+        self.assertEqual(self.quantizer.quantize(msg["x"], msg["y"], msg["z"]), qpos)
+
+    def test_input(self):
+        msg = self.decode(protocol.encode_input(self.quantizer, 7, 0.016, 4.0, 5.0, 0.5, ack=3))
+        self.assertEqual((msg["type"], msg["seq"], msg["ack"], msg["dt"]), ("input", 7, 3, 0.016))
+        self.assertAlmostEqual(msg["x"], 4.0, delta=self.quantizer.steps[0])
+
+    def test_correction(self):
+        msg = self.decode(protocol.encode_correction(9, (10, 20, 30)))
+        self.assertEqual((msg["type"], msg["seq"]), ("correction", 9))
+        self.assertEqual(self.quantizer.quantize(msg["x"], msg["y"], msg["z"]), (10, 20, 30))
+
+    def test_doors(self):
+        msg = self.decode(protocol.encode_door(protocol.MSG_DOOR_TOGGLE, 513, True))
+        self.assertEqual(msg, {"type": "door_toggle", "door_id": 513, "state": True})
+        msg = self.decode(protocol.encode_door(protocol.MSG_DOOR_SYNC, 0, False))
+        self.assertEqual(msg, {"type": "door_sync", "door_id": 0, "state": False})
+
+    def test_names(self):
+        self.assertEqual(self.decode(protocol.encode_join("salle é")), {"type": "join", "room": "salle é"})
+        self.assertEqual(self.decode(protocol.encode_remove_player(12)), {"type": "remove_player", "id": 12})
+
+    def test_connect_accept(self):
+        msg = self.decode(protocol.encode_connect("r1", "bob", token=2 ** 63 + 5, dictionary=3))
+        self.assertEqual(msg, {"type": "connect", "token": 2 ** 63 + 5, "dictionary": 3, "room": "r1", "player": "bob"})
+        msg = self.decode(protocol.encode_accept(77, 4, 3))
+        self.assertEqual(msg, {"type": "accept", "token": 77, "id": 4, "dictionary": 3})
+        self.assertEqual(self.decode(protocol.encode_reconnect()), {"type": "reconnect"})
+
+    def test_ping_pong(self):
+        self.assertEqual(self.decode(protocol.encode_ping(1.25)), {"type": "ping", "time": 1.25})
+        self.assertEqual(self.decode(protocol.encode_pong(1.25, 9.5)), {"type": "pong", "time": 1.25, "server_time": 9.5})
+
+    def test_reliable_ack(self):
+        door = protocol.encode_door(protocol.MSG_DOOR_SYNC, 3, True)
+        msg = self.decode(protocol.encode_reliable(5, 250, door))
+        self.assertEqual((msg["type"], msg["seq"], msg["age"], msg["message"]), ("reliable", 5, 0.25, door))
+        self.assertEqual(self.decode(protocol.encode_ack(5)), {"type": "ack", "ack": 5})
+
+    def test_relayed(self):
+        inner = protocol.encode_ping(2.0)
+        msg = self.decode(protocol.encode_relayed(6, inner))
+        self.assertEqual((msg["type"], msg["slot"], msg["message"]), ("relayed", 6, inner))
+
+    def test_state(self):
+        clock = protocol.encode_server_clock(12, 3.5)
+        entities = protocol.encode_state_entities({1: (1, 2, 3), 4: (5, 6, 7)})
+        msg = self.decode(protocol.encode_state("r", 8, clock, entities, [(0, 1), (2, 4)]))
+        self.assertEqual((msg["room"], msg["seq"], msg["tick"], msg["time"], msg["clock"]), ("r", 8, 12, 3.5, clock))
+        self.assertEqual(msg["entities"], {1: (1, 2, 3), 4: (5, 6, 7)})
+        self.assertEqual(msg["bindings"], [(0, 1), (2, 4)])
+
+    def test_decode_memoryview(self):
+        buffer = bytearray(protocol.encode_join("vue"))
+        msg = self.decode(memoryview(buffer))
+        buffer[:] = bytes(len(buffer))
+        self.assertEqual(msg["room"], "vue")
+
+    def test_peek_room(self):
+        self.assertEqual(protocol.peek_room(protocol.encode_join("a")), "a")
+        self.assertEqual(protocol.peek_room(protocol.encode_connect("b", "bob")), "b")
+        self.assertEqual(protocol.peek_room(json.dumps({"type": "join", "room": "c"}).encode()), "c")
+        self.assertIsNone(protocol.peek_room(protocol.encode_pos(self.quantizer, 0, 0, 0)))
+        self.assertIsNone(protocol.peek_room(protocol.encode_connect("b", "bob")[:-5]))
+
+    def test_legacy_json(self):
+        msg = self.decode(json.dumps({"type": "pos", "x": 1, "y": 2, "z": 3}).encode())
+        self.assertEqual(msg["type"], "pos")
+
+
+class MalformedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quantizer = protocol.Quantizer()
+
+    def messages(self):
+        q = self.quantizer
+        return [
+            protocol.encode_pos(q, 1, 2, 3, ack=5),
+            protocol.encode_input(q, 4, 0.033, 1, 2, 3, ack=2),
+            protocol.encode_correction(3, (1, 2, 3)),
+            protocol.encode_door(protocol.MSG_DOOR_SYNC, 5, True),
+            protocol.encode_remove_player(3),
+            protocol.encode_join("salle"),
+            protocol.encode_connect("r", "bob", 7, 1),
+            protocol.encode_accept(9, 3, 1),
+            protocol.encode_ping(1.0),
+            protocol.encode_pong(1.0, 2.0),
+            protocol.encode_ack(3),
+            protocol.encode_entity_kind(3, protocol.KIND_ENEMY),
+            protocol.encode_state("r", 3, protocol.encode_server_clock(1, 1.0),
+                                  protocol.encode_state_entities({1: (1, 2, 3)}), [(0, 1)]),
+        ]
+
+    def test_every_truncation_is_rejected(self):
+        for data in self.messages():
+            for size in range(protocol.HEADER.size, len(data)):
+                with self.subTest(type=data[2], size=size):
+                    with self.assertRaises(protocol.ProtocolError):
+                        protocol.decode(data[:size], self.quantizer)
+
+    def test_wrong_version(self):
+        data = bytearray(protocol.encode_ack(1))
+        data[1] = protocol.PROTOCOL_VERSION - 1
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode(bytes(data), self.quantizer)
+
+    def test_unknown_type(self):
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode(bytes((protocol.MAGIC, protocol.PROTOCOL_VERSION, 250)), self.quantizer)
+
+    def test_invalid_json(self):
+        for data in (b"{not json", b"[1, 2]", b"\xff\xfe"):
+            with self.assertRaises(protocol.ProtocolError):
+                protocol.decode(data, self.quantizer)
+
+    def test_nested_wrappers_are_rejected(self):
+        reliable = protocol.encode_reliable(1, 0, protocol.encode_ack(1))
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode(protocol.encode_reliable(2, 0, reliable), self.quantizer)
+        relayed = protocol.encode_relayed(1, protocol.encode_ack(1))
+        with self.assertRaises(protocol.ProtocolError):
+            protocol.decode(protocol.encode_relayed(2, relayed), self.quantizer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests of the per-address token buckets, alone and in front of the server.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.ratelimit import RateLimiter
+from tests.support import make_server
+
+A = ("10.0.0.1", 1000)
+B = ("10.0.0.2", 1000)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(rate=10.0, burst=5.0)
+
+    def allowed(self, addr, count, now, size=100):
+        return sum(self.limiter.allow(addr, size, now) for _ in range(count))
+
+    def test_burst_then_rate(self):
+        self.assertEqual(self.allowed(A, 8, now=0.0), 5)
+        self.assertEqual(self.allowed(A, 8, now=0.35), 3)  # 3,5 jetons rendus
+        self.assertEqual(self.allowed(A, 8, now=10.0), 5)  # plafonné au burst
+
+    def test_addresses_are_independent(self):
+        self.allowed(A, 10, now=0.0)
+        self.assertEqual(self.allowed(B, 5, now=0.0), 5)
+
+    def test_dropped_counters_and_offenders(self):
+        self.allowed(A, 9, now=0.0, size=40)
+        self.allowed(B, 6, now=0.0, size=10)
+        self.allowed(("10.0.0.3", 1), 1, now=0.0)
+        self.assertEqual(self.limiter.dropped, 5)
+        self.assertEqual(self.limiter.dropped_bytes, 4 * 40 + 10)
+        self.assertEqual(self.limiter.offenders(), [(A, 4), (B, 1)])
+        self.assertEqual(self.limiter.offenders(count=1), [(A, 4)])
+
+    def test_sweep_forgets_full_buckets(self):
+        self.allowed(A, 5, now=0.0)
+        self.allowed(B, 5, now=0.4)
+        self.limiter.sweep(0.5)  # le seau de A est plein après 0,5 s
+        self.assertEqual(list(self.limiter.buckets), [B])
+        self.assertEqual(self.allowed(A, 8, now=0.5), 5)
+
+
+class ServerRateLimitTest(unittest.TestCase):
+
+    def test_flood_is_dropped_before_decoding(self):
+        server, clock, transport = make_server(rate_limit=10.0, rate_burst=5.0)
+        server.handle_datagram(protocol.encode_connect("r", "bob"), A)
+        transport.take()
+        for _ in range(20):
+            server.handle_datagram(protocol.encode_ping(1.0), A)
+        self.assertEqual(len(transport.take(A)), 4)  # un jeton pris par le connect
+        clock.now += 1.0
+        server.handle_datagram(protocol.encode_ping(2.0), A)
+        self.assertEqual(len(transport.take(A)), 1)
+        self.assertEqual(server.limiter.dropped, 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
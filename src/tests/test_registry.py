@@ -0,0 +1,155 @@
+"""
+Tests of the client registry and of its timing wheel.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import json
+import random
+import unittest
+
+from Assets.modules.network.registry import ClientRegistry, TimingWheel
+from Assets.modules.network.server import Client
+from tests.support import make_server
+
+
+class TimingWheelTest(unittest.TestCase):
+
+    def advance(self, wheel, steps):
+        due = set()
+        for _ in range(steps):
+            due |= wheel.advance()
+        return due
+
+    def test_key_comes_up_after_its_delay(self):
+        wheel = TimingWheel(resolution=0.5, slots=8)
+        wheel.schedule("a", 1.2)  # arrondi à 3 slots
+        self.assertEqual(self.advance(wheel, 2), set())
+        self.assertEqual(wheel.advance(), {"a"})
+        self.assertEqual(self.advance(wheel, 8), set())
+
+    def test_reschedule_and_cancel(self):
+        wheel = TimingWheel(resolution=1.0, slots=8)
+        wheel.schedule("a", 1)
+        wheel.schedule("a", 3)  # remplace la première échéance
+        wheel.schedule("b", 2)
+        wheel.cancel("b")
+        wheel.cancel("inconnu")
+        self.assertEqual(self.advance(wheel, 2), set())
+        self.assertEqual(wheel.advance(), {"a"})
+
+    def test_long_delays_are_capped(self):
+        wheel = TimingWheel(resolution=1.0, slots=4)
+        wheel.schedule("a", 100)
+        self.assertEqual(self.advance(wheel, 3), {"a"})
+        wheel.schedule("b", 0)  # au moins un slot
+        self.assertEqual(wheel.advance(), {"b"})
+
+
+class ClientRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ClientRegistry(timeout=2.0, resolution=0.5, rng=random.Random(1))
+        self.now = 0.0
+
+    def add(self, port, player="Player", now=0.0):
+        client = Client(("10.0.0.1", port), self.registry.allocate_id(), True, None, None, now,
+                        token=self.registry.new_token())
+        client.player = player
+        self.registry.add(client)
+        return client
+
+    def expire(self, duration):
+        """Advance the wheel one step per resolution, as the expiry loop does."""
+        timed_out = []
+        for _ in range(round(duration / self.registry.wheel.resolution)):
+            self.now += self.registry.wheel.resolution
+            timed_out += self.registry.expired(self.now)
+        return timed_out
+
+    def test_indexes(self):
+        a = self.add(1, "bob")
+        b = self.add(2, "bob")
+        self.assertIs(self.registry.get(("10.0.0.1", 1)), a)
+        self.assertIs(self.registry.by_entity(b.entity_id), b)
+        self.assertIs(self.registry.by_session(a.token), a)
+        self.assertIsNone(self.registry.by_session(0))
+        self.assertCountEqual(self.registry.named("bob"), [a, b])
+
+    def test_removed_ids_are_reused(self):
+        a = self.add(1)
+        self.add(2)
+        self.assertIs(self.registry.remove(a.addr), a)
+        self.assertIsNone(self.registry.remove(a.addr))
+        self.assertEqual(self.registry.allocate_id(), a.entity_id)
+
+    def test_silent_client_expires(self):
+        a = self.add(1)
+        self.assertEqual(self.expire(1.5), [])
+        self.assertEqual(self.expire(2.5), [a])
+
+    def test_seen_client_is_rescheduled(self):
+        a = self.add(1)
+        a.last_seen = 1.5
+        self.assertEqual(self.expire(2.0), [])  # replanifié pour 1,5 s
+        self.assertEqual(self.expire(1.5), [a])
+        self.registry.remove(a.addr)
+        self.assertEqual(self.expire(5.0), [])
+
+    def test_rename_keeps_name_index(self):
+        a = self.add(1, "bob")
+        self.registry.rename(a, "alice")
+        self.assertEqual(self.registry.named("bob"), [])
+        self.assertEqual(self.registry.named("alice"), [a])
+        self.registry.remove(a.addr)
+        self.assertEqual(self.registry.by_name, {})
+
+    def test_rename_refuses_non_strings(self):
+        a = self.add(1, "bob")
+        for player in ([1, 2], {"nom": "x"}, None, 3):
+            with self.subTest(player=player):
+                with self.assertRaises(TypeError):
+                    self.registry.rename(a, player)
+                self.assertEqual(a.player, "bob")
+                self.assertEqual(self.registry.by_name, {"bob": {a.entity_id}})
+
+    def test_rebind(self):
+        a = self.add(1)
+        b = self.add(2)
+        self.registry.rebind(a, ("10.0.0.2", 1))
+        self.assertIsNone(self.registry.get(("10.0.0.1", 1)))
+        self.assertIs(self.registry.get(("10.0.0.2", 1)), a)
+        with self.assertRaises(ValueError):
+            self.registry.rebind(a, b.addr)
+        self.assertEqual(a.addr, ("10.0.0.2", 1))
+
+
+class JsonPlayerNameTest(unittest.TestCase):
+    """
+    Regression: a JSON pos carrying a non-string player name used to corrupt
+    the name index, and the client could then never be removed.
+    """
+
+    def test_any_json_name_is_coerced(self):
+        server, clock, _ = make_server(client_timeout=2.0)
+        addr = ("10.0.0.1", 4000)
+        for player in ([1, 2], {"nom": "x"}, 3, None):
+            with self.subTest(player=player):
+                pos = {"type": "pos", "x": 1, "y": 2, "z": 3, "player": player}
+                server.handle_datagram(json.dumps(pos).encode(), addr)
+                client = server.clients.get(addr)
+                self.assertEqual(client.player, str(player))
+                self.assertEqual(server.clients.by_name, {str(player): {client.entity_id}})
+        while server.clients:
+            clock.now += server.expire_interval
+            server.remove_inactive_clients()
+        self.assertEqual(server.clients.by_name, {})
+        self.assertEqual(server.clients.by_id, {})
+        self.assertEqual(server.rooms, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
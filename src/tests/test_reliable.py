@@ -0,0 +1,107 @@
+"""
+Tests of the reliable ordered channel: delivery order, acknowledgements and resends.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.reliable import RESEND_MIN, ReliableChannel
+
+
+def event(n):
+    return protocol.encode_door(protocol.MSG_DOOR_SYNC, n, True)
+
+
+class ReliableChannelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quantizer = protocol.Quantizer()
+        self.sender = ReliableChannel()
+        self.receiver = ReliableChannel()
+
+    def packets(self, now, rtt=None):
+        """Decoded reliable messages polled from the sender."""
+        return [protocol.decode(p, self.quantizer) for p in self.sender.poll(now, rtt)]
+
+    def deliver(self, msg, now):
+        return self.receiver.receive(msg["seq"], msg["age"], msg["message"], now)
+
+    def acknowledge(self):
+        """Send the receiver's pending ack back to the sender."""
+        acks = [protocol.decode(p, self.quantizer) for p in self.receiver.poll()]
+        self.assertEqual([a["type"] for a in acks], ["ack"])
+        self.sender.on_ack(acks[0]["ack"])
+
+    def test_in_order_delivery(self):
+        for n in range(3):
+            self.sender.send(event(n), created=0.0)
+        delivered = []
+        for msg in self.packets(now=0.0):
+            delivered += self.deliver(msg, now=0.0)
+        self.assertEqual([m for m, _ in delivered], [event(0), event(1), event(2)])
+        self.acknowledge()
+        self.assertEqual(self.sender.in_flight, 0)
+
+    def test_out_of_order_messages_wait_for_the_gap(self):
+        for n in range(3):
+            self.sender.send(event(n), created=0.0)
+        first, second, third = self.packets(now=1.0)
+        self.assertEqual(self.deliver(third, now=1.0), [])
+        self.assertEqual(self.deliver(second, now=1.0), [])
+        delivered = self.deliver(first, now=1.5)
+        self.assertEqual([m for m, _ in delivered], [event(0), event(1), event(2)])
+        # L'âge compte depuis l'événement, attente comprise
+        self.assertEqual([round(age, 3) for _, age in delivered], [1.0, 1.5, 1.5])
+
+    def test_duplicates_are_dropped_and_reacked(self):
+        self.sender.send(event(0), created=0.0)
+        (msg,) = self.packets(now=0.0)
+        self.assertEqual(len(self.deliver(msg, now=0.0)), 1)
+        self.receiver.poll()
+        self.assertEqual(self.deliver(msg, now=0.1), [])
+        self.assertTrue(self.receiver.ack_due)
+        self.acknowledge()
+
+    def test_unacked_messages_are_resent_after_the_timeout(self):
+        self.sender.send(event(0), created=0.0)
+        self.assertEqual(len(self.packets(now=0.0, rtt=0.05)), 1)
+        self.assertEqual(self.packets(now=RESEND_MIN / 2, rtt=0.05), [])
+        (resent,) = self.packets(now=RESEND_MIN, rtt=0.05)
+        self.assertEqual(resent["seq"], 0)
+        self.assertAlmostEqual(resent["age"], RESEND_MIN, places=3)
+        self.assertEqual(self.packets(now=0.3, rtt=0.2), [])  # 2 RTT
+        self.assertEqual(len(self.packets(now=0.5, rtt=0.2)), 1)
+        self.assertEqual((self.sender.sent, self.sender.resends), (1, 2))
+        self.sender.on_ack(0)
+        self.assertEqual(self.packets(now=5.0), [])
+
+    def test_ack_is_cumulative(self):
+        for n in range(4):
+            self.sender.send(event(n), created=0.0)
+        self.packets(now=0.0)
+        self.sender.on_ack(protocol.NO_SEQ)
+        self.assertEqual(self.sender.in_flight, 4)
+        self.sender.on_ack(2)
+        self.assertEqual(list(self.sender.unacked), [3])
+
+    def test_sequence_wraps(self):
+        self.sender.next_seq = protocol.SEQ_MOD - 2
+        self.receiver.received = protocol.SEQ_MOD - 3
+        for n in range(4):
+            self.sender.send(event(n), created=0.0)
+        messages = self.packets(now=0.0)
+        self.assertEqual([m["seq"] for m in messages], [protocol.SEQ_MOD - 2, protocol.SEQ_MOD - 1, 0, 1])
+        delivered = self.deliver(messages[2], 0.0) + self.deliver(messages[0], 0.0)
+        delivered += self.deliver(messages[3], 0.0) + self.deliver(messages[1], 0.0)
+        self.assertEqual([m for m, _ in delivered], [event(n) for n in range(4)])
+        self.acknowledge()
+        self.assertEqual(self.sender.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests of the delta snapshots: SnapshotHistory on the server, SnapshotReceiver on the client.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.snapshot import SnapshotHistory, SnapshotReceiver
+
+CLOCK = protocol.encode_server_clock(0, 0.0)
+
+
+class DeltaLink:
+    """
+    Server history and client receiver of one client, linked without a socket.
+    """
+
+    def __init__(self, size=32):
+        self.history = SnapshotHistory(size)
+        self.receiver = SnapshotReceiver(size)
+        self.quantizer = protocol.Quantizer()
+        self.seq = 0
+
+    def send(self, entities, doors):
+        """Encode a snapshot against the acked baseline, as Room.tick does."""
+        baseline, (base_entities, base_doors) = self.history.baseline()
+        body = protocol.encode_snapshot_body(entities, doors, base_entities, base_doors)
+        packet = protocol.encode_snapshot(self.seq, baseline, 1, body, CLOCK)
+        self.history.sent(self.seq, (dict(entities), dict(doors)), now=float(self.seq))
+        self.seq = (self.seq + 1) % protocol.SEQ_MOD
+        return packet
+
+    def receive(self, packet):
+        """Decode and apply a snapshot on the client side, then ack it."""
+        state = self.receiver.apply(protocol.decode(packet, self.quantizer))
+        if state is not None:
+            self.history.ack(self.receiver.ack)
+        return state
+
+
+class DeltaSnapshotTest(unittest.TestCase):
+
+    def test_first_snapshot_is_full(self):
+        link = DeltaLink()
+        packet = link.send({1: (1, 2, 3)}, {4: True})
+        self.assertEqual(protocol.decode(packet, link.quantizer)["baseline"], protocol.NO_SEQ)
+        self.assertEqual(link.receive(packet), ({1: (1, 2, 3)}, {4: True}))
+
+    def test_delta_only_carries_changes(self):
+        link = DeltaLink()
+        entities = {eid: (eid, eid, eid) for eid in range(50)}
+        full = link.send(entities, {})
+        link.receive(full)
+        entities[7] = (7, 8, 7)  # un seul champ modifié
+        del entities[9]
+        delta = link.send(entities, {2: False})
+        msg = protocol.decode(delta, link.quantizer)
+        self.assertEqual(msg["baseline"], 0)
+        self.assertEqual(msg["changed"], [(7, protocol.FIELD_Y, 8)])
+        self.assertEqual(msg["removed"], [9])
+        self.assertLess(len(delta), len(full) // 10)
+        self.assertEqual(link.receive(delta), (entities, {2: False}))
+
+    def test_lost_snapshots_keep_the_acked_baseline(self):
+        link = DeltaLink()
+        link.receive(link.send({1: (0, 0, 0)}, {}))
+        link.send({1: (1, 0, 0)}, {})  # perdu
+        link.send({1: (2, 0, 0)}, {})  # perdu
+        packet = link.send({1: (3, 0, 0)}, {})
+        self.assertEqual(protocol.decode(packet, link.quantizer)["baseline"], 0)
+        self.assertEqual(link.receive(packet), ({1: (3, 0, 0)}, {}))
+
+    def test_stale_and_unknown_baselines_are_rejected(self):
+        link = DeltaLink()
+        link.receive(link.send({1: (0, 0, 0)}, {}))
+        late = link.send({1: (1, 0, 0)}, {})
+        link.receive(link.send({1: (2, 0, 0)}, {}))
+        self.assertIsNone(link.receiver.apply(protocol.decode(late, link.quantizer)))  # arrivé dans le désordre
+        other = DeltaLink()
+        other.seq = 5
+        other.history.sent(4, ({1: (9, 9, 9)}, {}), now=0.0)
+        other.history.ack(4)
+        self.assertIsNone(link.receiver.apply(protocol.decode(other.send({1: (9, 9, 8)}, {}), link.quantizer)))
+
+    def test_history_overflow_falls_back_to_full(self):
+        link = DeltaLink(size=4)
+        link.receive(link.send({1: (0, 0, 0)}, {}))
+        for x in range(1, 6):
+            link.send({1: (x, 0, 0)}, {})  # aucun acquitté : la baseline sort de l'historique
+        packet = link.send({1: (9, 0, 0)}, {})
+        self.assertEqual(protocol.decode(packet, link.quantizer)["baseline"], protocol.NO_SEQ)
+        self.assertEqual(link.receive(packet), ({1: (9, 0, 0)}, {}))
+
+    def test_ack_reports_send_time_once(self):
+        history = SnapshotHistory()
+        history.sent(0, ({}, {}), now=1.0)
+        history.sent(1, ({}, {}), now=2.0)
+        self.assertEqual(history.ack(1), 2.0)
+        self.assertIsNone(history.ack(1))
+        self.assertIsNone(history.ack(0))
+        self.assertEqual(list(history.states), [1])
+
+    def test_sequence_wraps(self):
+        link = DeltaLink()
+        link.seq = protocol.SEQ_MOD - 2
+        for x in range(4):
+            self.assertEqual(link.receive(link.send({1: (x, 0, 0)}, {})), ({1: (x, 0, 0)}, {}))
+        self.assertEqual(link.history.acked, 1)
+
+    def test_truncated_snapshot_is_rejected(self):
+        link = DeltaLink()
+        link.receive(link.send({1: (0, 0, 0), 2: (0, 0, 0)}, {}))
+        packet = link.send({1: (1, 1, 1)}, {5: True, 6: False})  # 2 supprimé
+        for size in range(protocol.HEADER.size, len(packet)):
+            with self.subTest(size=size):
+                with self.assertRaises(protocol.ProtocolError):
+                    protocol.decode(packet[:size], link.quantizer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Tests of the datagram framing: PacketWriter bundles and fragments, Reassembler rebuilds.
+
+Run from src/ : python -m pytest tests
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import json
+import time
+import unittest
+
+from Assets.modules.network import protocol
+from Assets.modules.network.transport import MAX_FRAGMENTS, MAX_PENDING, FramingStats, PacketWriter, Reassembler
+
+
+def message(size, fill=0):
+    """A binary message of exactly size bytes; its content does not matter to the framing."""
+    head = bytes((protocol.MAGIC, protocol.PROTOCOL_VERSION, protocol.MSG_JOIN))
+    return head + bytes((fill,)) * (size - len(head))
+
+
+class PacketWriterTest(unittest.TestCase):
+
+    def test_small_messages_are_bundled_under_the_mtu(self):
+        writer = PacketWriter(mtu=200)
+        messages = [message(30, i) for i in range(20)]
+        for m in messages:
+            writer.queue(m)
+        datagrams = writer.flush()
+        self.assertGreater(len(datagrams), 1)
+        self.assertTrue(all(len(d) <= 200 for d in datagrams))
+        reassembler = Reassembler()
+        received = [m for d in datagrams for m in reassembler.feed(d, "a")]
+        self.assertEqual(received, messages)
+        self.assertEqual(writer.flush(), [])
+        self.assertAlmostEqual(writer.stats.coalescing_ratio(), 20 / len(datagrams))
+
+    def test_single_message_is_sent_as_is(self):
+        writer = PacketWriter()
+        writer.queue(protocol.encode_ack(4))
+        self.assertEqual(writer.flush(), [protocol.encode_ack(4)])
+        self.assertEqual(writer.stats.bundled, 0)
+
+    def test_large_message_is_fragmented(self):
+        writer = PacketWriter(mtu=100)
+        big = message(1000, 7)
+        writer.queue(protocol.encode_ack(1))
+        writer.queue(big)
+        datagrams = writer.flush()
+        self.assertTrue(all(len(d) <= 100 for d in datagrams))
+        self.assertEqual(writer.stats.fragmented, 1)
+        self.assertAlmostEqual(writer.stats.fragmentation_rate(), 0.5)
+        reassembler = Reassembler()
+        received = [m for d in datagrams for m in reassembler.feed(d, "a")]
+        self.assertCountEqual(received, [protocol.encode_ack(1), big])
+        self.assertEqual(reassembler.stats.reassembled, 1)
+
+    def test_oversized_message_is_dropped(self):
+        writer = PacketWriter(mtu=20)
+        chunk = 20 - protocol.HEADER.size - protocol.FRAGMENT_HEAD.size
+        writer.queue(message(chunk * MAX_FRAGMENTS + 1))
+        writer.queue(message(chunk * MAX_FRAGMENTS))
+        datagrams = writer.flush()
+        self.assertEqual(writer.stats.oversized, 1)
+        self.assertEqual(len(datagrams), MAX_FRAGMENTS)
+
+
+class ReassemblerTest(unittest.TestCase):
+
+    def fragments(self, big, mtu=100):
+        writer = PacketWriter(mtu=mtu)
+        writer.queue(big)
+        return writer.flush()
+
+    def test_out_of_order_and_duplicated_fragments(self):
+        big = message(500, 3)
+        datagrams = self.fragments(big)
+        reassembler = Reassembler()
+        shuffled = datagrams[:0:-1] + datagrams[-1:] + datagrams[:1]
+        received = [m for d in shuffled for m in reassembler.feed(d, "a")]
+        self.assertEqual(received, [big])
+        self.assertEqual(reassembler.partials, {})
+
+    def test_fragments_are_kept_per_sender(self):
+        a, b = message(300, 1), message(300, 2)
+        from_a, from_b = self.fragments(a), self.fragments(b)  # même id de message
+        reassembler = Reassembler()
+        received = []
+        for da, db in zip(from_a, from_b):
+            received += reassembler.feed(db, "b")
+            received += reassembler.feed(da, "a")
+        self.assertCountEqual(received, [a, b])
+
+    def test_fragments_of_a_memoryview_are_copied(self):
+        big = message(300, 5)
+        reassembler = Reassembler()
+        buffer = bytearray(2048)
+        received = []
+        for datagram in self.fragments(big):
+            buffer[:len(datagram)] = datagram
+            received += reassembler.feed(memoryview(buffer)[:len(datagram)], "a")
+            buffer[:] = bytes(len(buffer))  # tampon réutilisé
+        self.assertEqual(received, [big])
+
+    def test_incomplete_message_expires(self):
+        stats = FramingStats()
+        reassembler = Reassembler(stats, timeout=0.5)
+        datagrams = self.fragments(message(500))
+        for datagram in datagrams[:-1]:
+            self.assertEqual(reassembler.feed(datagram, "a"), [])
+        reassembler.expire(time.monotonic())
+        self.assertEqual(len(reassembler.partials), 1)
+        reassembler.expire(time.monotonic() + 1)
+        self.assertEqual(reassembler.partials, {})
+        self.assertEqual(stats.incomplete, 1)
+        self.assertEqual(reassembler.feed(datagrams[-1], "a"), [])  # morceau orphelin
+
+    def test_pending_messages_are_bounded(self):
+        reassembler = Reassembler()
+        for sender in range(MAX_PENDING + 10):
+            reassembler.feed(self.fragments(message(300))[0], sender)
+        self.assertLessEqual(len(reassembler.partials), MAX_PENDING)
+        self.assertEqual(reassembler.stats.incomplete, 10)
+
+    def test_truncated_bundle_keeps_complete_messages(self):
+        messages = [protocol.encode_ack(i) for i in range(3)]
+        bundle = protocol.encode_bundle(messages)
+        self.assertEqual(Reassembler().feed(bundle[:-1], "a"), messages[:2])
+
+    def test_malformed_fragments_are_ignored(self):
+        reassembler = Reassembler()
+        for index, count in ((0, 0), (3, 3)):
+            self.assertEqual(reassembler.feed(protocol.encode_fragment(1, index, count, b"x"), "a"), [])
+        self.assertEqual(reassembler.feed(protocol.encode_fragment(1, 0, 2, b"")[:-2], "a"), [])
+        self.assertEqual(reassembler.partials, {})
+
+    def test_json_and_compressed_datagrams(self):
+        legacy = json.dumps({"type": "ping", "time": 1}).encode()
+        self.assertEqual(Reassembler().feed(legacy, "a"), [legacy])
+        compressed = bytes((protocol.MAGIC, protocol.PROTOCOL_VERSION, protocol.MSG_COMPRESSED)) + b"zz"
+        self.assertEqual(Reassembler().feed(compressed, "a"), [])  # sans dictionnaire
+
+
+if __name__ == "__main__":
+    unittest.main()
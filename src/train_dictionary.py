@@ -0,0 +1,93 @@
+"""
+Trains the preset compression dictionary on datagrams recorded by the server
+(serveur.py --record), then measures the compression it gives on them.
+
+The server, the relays and the clients must use the same dictionary: after
+training a new one, ship it with the game.
+
+Exemple :
+    python serveur.py --port 9999 --record session.log --no-compression
+    python bot_swarm.py --port 9999 --bots 100 --duration 60
+    python train_dictionary.py session.log
+"""
+
+__license__ = "Regarder le fichier LICENSE.txt dans le répertoire racine du projet."
+__author__ = "PFLIEGER-CHAKMA Nathan alias J0ytheC0de"
+
+import argparse
+import random
+import sys
+
+from Assets.modules.network import protocol
+from Assets.modules.network.recorder import read_records, DIRECTION_OUT
+from Assets.modules.network.compression import (
+    DICTIONARY_PATH, DICTIONARY_SIZE, COMPRESS_THRESHOLD, PacketCompressor, train_dictionary,
+)
+
+MAX_SAMPLES = 5000  # datagrammes tirés au hasard pour l'entraînement
+SKIPPED_TYPES = (protocol.MSG_STATE, protocol.MSG_RELAYED, protocol.MSG_COMPRESSED)  # jamais compressés par le dictionnaire
+
+
+def collect_samples(paths, threshold):
+    """
+    Read the datagrams the server would compress from packet logs.
+
+    Args:
+        paths: The log files.
+        threshold: Minimum datagram size.
+
+    Returns:
+        list: The datagrams (bytes).
+    """
+    samples = []
+    for path in paths:
+        for _, direction, _, data in read_records(path):
+            if (direction == DIRECTION_OUT and len(data) >= threshold and protocol.is_binary(data)
+                    and data[2] not in SKIPPED_TYPES):
+                samples.append(data)
+    return samples
+
+
+def measure(samples, zdict, threshold):
+    """
+    Compress samples against a dictionary.
+
+    Returns:
+        CompressionStats: The size and time counters.
+    """
+    compressor = PacketCompressor(zdict, threshold)
+    for sample in samples:
+        compressor.compress(sample)
+    return compressor.stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Entraîne le dictionnaire de compression des datagrammes")
+    parser.add_argument("logs", nargs="+", help="journaux de paquets enregistrés par serveur.py --record")
+    parser.add_argument("-o", "--output", default=DICTIONARY_PATH, help=f"fichier produit (défaut : {DICTIONARY_PATH})")
+    parser.add_argument("--size", type=int, default=DICTIONARY_SIZE, help=f"taille en octets (défaut : {DICTIONARY_SIZE})")
+    parser.add_argument("--threshold", type=int, default=COMPRESS_THRESHOLD,
+                        help=f"taille minimale des datagrammes retenus (défaut : {COMPRESS_THRESHOLD})")
+    parser.add_argument("--seed", type=int, default=0, help="graine du tirage des échantillons (défaut : 0)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    samples = collect_samples(args.logs, args.threshold)
+    if not samples:
+        sys.exit(f"❌ Aucun datagramme d'au moins {args.threshold} octets dans les journaux.")
+    rng = random.Random(args.seed)
+    rng.shuffle(samples)
+    # Mesure sur des datagrammes que l'entraînement n'a pas vus
+    held_out = samples[:len(samples) // 10]
+    training = samples[len(held_out):][:MAX_SAMPLES]
+    zdict = train_dictionary(training, args.size)
+    with open(args.output, "wb") as f:
+        f.write(zdict)
+    print(f"📚 {len(zdict)} octets appris sur {len(training)} datagrammes → {args.output}")
+    for label, stats in (("sans dictionnaire", measure(held_out, b"", args.threshold)),
+                         ("avec dictionnaire", measure(held_out, zdict, args.threshold))):
+        print(f"🗜️ {label} : {stats.ratio():.0%} de la taille | {stats.cost() * 1e6:.0f} µs/datagramme"
+              f" | {stats.compressed}/{stats.packets} datagrammes réduits")